@@ -0,0 +1,337 @@
+import os
+import re
+import time
+import uuid
+import atexit
+import shutil
+import argparse
+import datetime
+import threading
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from utils import COMPETENCIES
+
+# Configuration
+ANALYTICS_PATH = os.environ.get("ANALYTICS_PATH", "analytics")
+EVENT_BATCH_SIZE = 200         # flush once this many events are pending
+EVENT_FLUSH_INTERVAL = 5.0     # ...or after this many seconds
+MAX_LEVEL = 5
+PRIOR_WEIGHT = 4               # graded answers needed before results outweigh the self-assessed level
+
+# Fallback tagging for questions and scenarios the model did not tag with a competency
+COMPETENCY_KEYWORDS = {
+    "Data Literacy": ["data", "dashboard", "kpi", "analytics", "statistic", "sql", "visuali", "report"],
+    "Logistics Ops": ["route", "routing", "warehouse", "inventory", "shipment", "transport", "amhs", "wms", "logistic"],
+    "AI Strategy": ["machine learning", "model", "strategy", "digital twin", "governance", "forecast", "algorithm"],
+    "Safety": ["safety", "hazard", "cleanroom", "esd", "compliance", "contamination", "chemical", "incident"],
+    "Procurement": ["supplier", "procure", "sourcing", "contract", "vendor", "purchase", "negotiat"],
+}
+DEFAULT_COMPETENCY = "AI Strategy"
+
+SCHEMA = pa.schema([
+    ("ts", pa.timestamp("s")),
+    ("date", pa.string()),         # partition
+    ("role", pa.string()),         # partition
+    ("user_id", pa.string()),
+    ("level", pa.int8()),
+    ("source", pa.string()),       # "quiz" or "scenario"
+    ("competency", pa.string()),
+    ("correct", pa.float32()),     # 1.0 right/Pass, 0.0 wrong/Fail
+])
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string()), ("role", pa.string())]), flavor="hive")
+
+def tag_competency(text, default=DEFAULT_COMPETENCY):
+    """
+    Competency whose keywords occur most often in the text.
+    """
+    text = text.lower()
+    hits = {c: sum(text.count(k) for k in words) for c, words in COMPETENCY_KEYWORDS.items()}
+    best = max(COMPETENCIES, key=lambda c: hits.get(c, 0))
+    return best if hits.get(best) else default
+
+def parse_grade(feedback):
+    """
+    1.0 for Pass, 0.0 for Fail, None when the feedback states neither.
+    """
+    match = re.search(r"\b(pass|fail)(ed|s)?\b", feedback or "", re.IGNORECASE)
+    if not match:
+        return None
+    return 1.0 if match.group(1).lower() == "pass" else 0.0
+
+def competency_levels(correct, counts, prior):
+    """
+    Vectorized 0-5 levels: observed accuracy shrunk towards the prior level,
+    so a learner with few graded answers stays near their self-assessment.
+    correct/counts are [learners, competencies]; prior is [learners] or a scalar.
+    """
+    prior = np.asarray(prior, dtype=np.float64)
+    if prior.ndim:
+        prior = prior[:, None]
+    return (PRIOR_WEIGHT * prior + MAX_LEVEL * correct) / (PRIOR_WEIGHT + counts)
+
+def weakest_competency(vector):
+    """
+    The lowest-scoring competency (ties go to the earlier axis).
+    """
+    return min(COMPETENCIES, key=lambda c: vector.get(c, 0))
+
+class AnalyticsStore:
+    """
+    Append-only quiz answers and scenario grades in Parquet, partitioned by date and role.
+    Events are buffered and written as one file per flush; reads flush first.
+    Aggregations run on Arrow/NumPy arrays and are cached until the next write.
+    """
+
+    def __init__(self, path=ANALYTICS_PATH, batch_size=EVENT_BATCH_SIZE, flush_interval=EVENT_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._pending = []
+        self._batch_id = None          # file name stem of a batch whose write failed, reused on retry
+        self._last_flush = time.monotonic()
+        self._version = 0
+        self._cache = {}
+        self.stats = {"events": 0, "files": 0, "failed_flushes": 0}
+        self._closed = threading.Event()
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+        atexit.register(self.close)
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+                    self._try_flush()
+
+    def _try_flush(self):
+        try:
+            self.flush()
+        except Exception as e:
+            # The events stay queued; the next event or the flush loop retries them
+            self.stats["failed_flushes"] += 1
+            print(f"Analytics store: flush of {len(self._pending)} events failed, will retry: {e}")
+
+    def _record(self, user_id, role, level, source, competency, correct):
+        now = datetime.datetime.now().replace(microsecond=0)
+        with self._lock:
+            self._pending.append({"ts": now, "date": now.date().isoformat(), "role": role, "user_id": user_id,
+                                  "level": int(level), "source": source, "competency": competency,
+                                  "correct": float(correct)})
+            self.stats["events"] += 1
+            if len(self._pending) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._try_flush()
+
+    def flush(self):
+        """
+        Write all pending events as new Parquet files (one per date/role partition).
+        On failure the events stay queued. The retry reuses the file names, so
+        partitions that were already written are overwritten, not duplicated.
+        """
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            self._batch_id = self._batch_id or uuid.uuid4().hex
+            try:
+                pq.write_to_dataset(pa.Table.from_pylist(pending, schema=SCHEMA), self.path, partitioning=PARTITIONING,
+                                    basename_template=f"part-{self._batch_id}-{{i}}.parquet")
+            except Exception:
+                self._pending = pending + self._pending
+                raise
+            self._batch_id = None
+            self.stats["files"] += 1
+            self._version += 1
+            self._cache.clear()
+
+    def record_quiz(self, user_id, role, level, questions, answers):
+        """
+        One event per question; unanswered questions count as wrong.
+        answers: the chosen option index (or None) per question.
+        """
+        for question, answer in zip(questions, answers):
+            competency = question.get("competency")
+            if competency not in COMPETENCIES:
+                competency = tag_competency(question.get("question", ""))
+            self._record(user_id, role, level, "quiz", competency, answer == question.get("correct_answer"))
+
+    def record_scenario(self, user_id, role, level, scenario, feedback):
+        """
+        One event for a graded scenario; returns False when no Pass/Fail could be read.
+        """
+        grade = parse_grade(feedback)
+        if grade is None:
+            return False
+        competency = scenario.get("competency")
+        if competency not in COMPETENCIES:
+            competency = tag_competency(f"{scenario.get('scenario', '')} {scenario.get('question', '')}")
+        self._record(user_id, role, level, "scenario", competency, grade)
+        return True
+
+    def _table(self, role=None, user_id=None, since=None):
+        self.flush()
+        if not os.path.isdir(self.path):
+            return SCHEMA.empty_table()
+        dataset = ds.dataset(self.path, format="parquet", partitioning=PARTITIONING)
+        expr = None
+        for clause in (ds.field("role") == role if role else None,
+                       ds.field("user_id") == user_id if user_id else None,
+                       ds.field("date") >= since if since else None):
+            if clause is not None:
+                expr = clause if expr is None else expr & clause
+        return dataset.to_table(columns=["user_id", "level", "competency", "correct"], filter=expr)
+
+    def competency_matrix(self, role=None, user_id=None, since=None):
+        """
+        (user_ids, correct, counts, latest level): correct/counts are [learners, competencies]
+        arrays ordered like COMPETENCIES.
+        """
+        table = self._table(role, user_id, since)
+        if not table.num_rows:
+            empty = np.zeros((0, len(COMPETENCIES)))
+            return [], empty, empty.copy(), np.zeros(0)
+        grouped = table.group_by(["user_id", "competency"]).aggregate([("correct", "sum"), ("correct", "count")])
+        users = pc.unique(table["user_id"])
+        rows = pc.index_in(grouped["user_id"], value_set=users).to_numpy()
+        cols = pc.fill_null(pc.index_in(grouped["competency"], value_set=pa.array(COMPETENCIES)), -1).to_numpy()
+        known = cols >= 0   # events tagged with a competency that has since been renamed are ignored
+        rows, cols = rows[known], cols[known]
+
+        correct = np.zeros((len(users), len(COMPETENCIES)))
+        counts = np.zeros_like(correct)
+        np.add.at(correct, (rows, cols), grouped["correct_sum"].to_numpy(zero_copy_only=False)[known])
+        np.add.at(counts, (rows, cols), grouped["correct_count"].to_numpy(zero_copy_only=False)[known])
+
+        levels = table.group_by("user_id").aggregate([("level", "max")])
+        level_rows = pc.index_in(levels["user_id"], value_set=users).to_numpy()
+        prior = np.zeros(len(users))
+        prior[level_rows] = levels["level_max"].to_numpy()
+        return users.to_pylist(), correct, counts, prior
+
+    def user_vector(self, user_id, prior_level):
+        """
+        {competency: 0-5 level} for one learner, from all their graded answers.
+        With no answers every axis equals prior_level (the self-assessed AI literacy).
+        """
+        self.flush()   # pending events bump the version, so a cached result never misses them
+        key = ("user", user_id, prior_level, self._version)
+        if key not in self._cache:
+            _, correct, counts, _ = self.competency_matrix(user_id=user_id)
+            if not len(counts):
+                correct = counts = np.zeros((1, len(COMPETENCIES)))
+            levels = competency_levels(correct[:1], counts[:1], prior_level)[0]
+            self._cache[key] = {
+                "levels": {c: round(float(min(v, MAX_LEVEL)), 1) for c, v in zip(COMPETENCIES, levels)},
+                "answers": {c: int(n) for c, n in zip(COMPETENCIES, counts[0])},
+            }
+        return self._cache[key]
+
+    def cohort_summary(self, role=None, since=None):
+        """
+        Mean competency levels over all learners (optionally one role, since a date).
+        """
+        self.flush()   # as in user_vector
+        key = ("cohort", role, since, self._version)
+        if key not in self._cache:
+            users, correct, counts, prior = self.competency_matrix(role=role, since=since)
+            levels = competency_levels(correct, counts, prior) if users else np.zeros((0, len(COMPETENCIES)))
+            mean = levels.mean(axis=0) if users else np.zeros(len(COMPETENCIES))
+            self._cache[key] = {
+                "learners": len(users),
+                "mean": {c: round(float(v), 2) for c, v in zip(COMPETENCIES, mean)},
+                "answers": {c: int(n) for c, n in zip(COMPETENCIES, counts.sum(axis=0))},
+                "accuracy": {c: round(float(a), 3) for c, a in
+                             zip(COMPETENCIES, correct.sum(axis=0) / np.maximum(counts.sum(axis=0), 1))},
+            }
+        return self._cache[key]
+
+    def compact(self):
+        """
+        Merge each partition's small files into one. Returns (files before, files after).
+        """
+        self.flush()
+        before = after = 0
+        with self._lock:
+            for root, _, names in os.walk(self.path):
+                parts = sorted(n for n in names if n.endswith(".parquet"))
+                before += len(parts)
+                if len(parts) < 2:
+                    after += len(parts)
+                    continue
+                table = pa.concat_tables([pq.read_table(os.path.join(root, n)) for n in parts])
+                tmp = os.path.join(root, f"compact-{uuid.uuid4().hex}.tmp")
+                pq.write_table(table, tmp)
+                os.replace(tmp, os.path.join(root, f"part-{uuid.uuid4().hex}-0.parquet"))
+                for name in parts:
+                    os.remove(os.path.join(root, name))
+                after += 1
+            self._version += 1
+            self._cache.clear()
+        return before, after
+
+    def close(self):
+        self._closed.set()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Analytics store: {len(self._pending)} events not saved at shutdown: {e}")
+
+def synthetic_events(store, learners, answers_per_learner, roles, seed=0):
+    """
+    Fill a store with random but skill-dependent answers, for benchmarking.
+    """
+    rng = np.random.default_rng(seed)
+    skill = rng.uniform(0.2, 0.95, size=(learners, len(COMPETENCIES)))
+    for user in range(learners):
+        role, level = roles[user % len(roles)], int(rng.integers(1, 6))
+        comps = rng.integers(0, len(COMPETENCIES), size=answers_per_learner)
+        for c in comps:
+            store._record(f"learner-{user}", role, level, "quiz", COMPETENCIES[c], rng.random() < skill[user, c])
+    store.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Cohort competency analytics over the quiz/scenario event store.")
+    parser.add_argument("command", choices=["summary", "compact", "bench"])
+    parser.add_argument("--role", default=None)
+    parser.add_argument("--since", default=None, help="YYYY-MM-DD")
+    parser.add_argument("--learners", type=int, default=5000, help="bench: synthetic learners")
+    parser.add_argument("--answers", type=int, default=40, help="bench: answers per learner")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        path = ANALYTICS_PATH + "_bench"
+        shutil.rmtree(path, ignore_errors=True)
+        store = AnalyticsStore(path, batch_size=50000)
+        start = time.perf_counter()
+        synthetic_events(store, args.learners, args.answers, ["Logistics Manager", "Supply Chain Analyst",
+                                                              "Warehouse Supervisor", "Procurement Specialist"])
+        print(f"Wrote {store.stats['events']} events in {time.perf_counter() - start:.1f}s ({store.stats['files']} files)")
+        for label, fn in (("cohort summary (all roles)", lambda: store.cohort_summary()),
+                          ("cohort summary (one role)", lambda: store.cohort_summary("Logistics Manager")),
+                          ("single learner vector", lambda: store.user_vector("learner-42", 3))):
+            store._cache.clear()
+            start = time.perf_counter()
+            fn()
+            print(f"{label:<28} {(time.perf_counter() - start) * 1000:8.1f} ms")
+        store.close()
+        shutil.rmtree(path, ignore_errors=True)
+        return
+
+    store = AnalyticsStore()
+    if args.command == "compact":
+        before, after = store.compact()
+        print(f"Compacted {before} files into {after}.")
+        return
+    summary = store.cohort_summary(args.role, args.since)
+    print(f"Learners: {summary['learners']}" + (f" ({args.role})" if args.role else ""))
+    print(f"{'competency':<16}{'mean level':>11}{'answers':>9}{'accuracy':>10}")
+    for c in COMPETENCIES:
+        print(f"{c:<16}{summary['mean'][c]:>11.2f}{summary['answers'][c]:>9}{summary['accuracy'][c]:>10.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import os
+import re
+import csv
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import COMPETENCIES, strip_code_fences
+
+# Configuration
+GRADE_CACHE_PATH = os.environ.get("GRADE_CACHE_PATH", "grade_cache.jsonl")
+BATCH_MAX_RESPONSES = 12        # responses per grading call
+BATCH_MAX_RESPONSE_TOKENS = 2500  # estimated tokens of learner text per grading call
+MAX_RESPONSE_CHARS = 2000       # longer answers are truncated before grading
+GRADING_CONCURRENCY = 4
+
+def grade_key(scenario, response):
+    """
+    Cache key for one (scenario, response) pair; whitespace and case differences don't matter.
+    """
+    norm = lambda text: " ".join(str(text).split()).lower()
+    raw = json.dumps([norm(scenario.get("scenario", "")), norm(scenario.get("question", "")), norm(response)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class GradeCache:
+    """
+    Append-only JSONL cache of grades, loaded once and shared by all grading threads.
+    """
+
+    def __init__(self, path=GRADE_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._grades = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partially written last line from a crash
+                        continue
+                    self._grades[entry["key"]] = entry["grade"]
+
+    def get(self, key):
+        with self._lock:
+            return self._grades.get(key)
+
+    def put_many(self, items):
+        with self._lock:
+            new = [(k, g) for k, g in items if k not in self._grades]
+            for key, grade in new:
+                self._grades[key] = grade
+            if self.path and new:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    for key, grade in new:
+                        f.write(json.dumps({"key": key, "grade": grade}) + "\n")
+
+def pack_batches(responses, max_responses=BATCH_MAX_RESPONSES, max_tokens=BATCH_MAX_RESPONSE_TOKENS):
+    """
+    Greedily pack (key, text) pairs into batches bounded by count and estimated tokens.
+    """
+    from engine import estimate_tokens
+    batches, current, used = [], [], 0
+    for key, text in responses:
+        cost = estimate_tokens(text)
+        if current and (len(current) >= max_responses or used + cost > max_tokens):
+            batches.append(current)
+            current, used = [], 0
+        current.append((key, text))
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def build_grading_prompt(scenario, batch):
+    answers = "\n\n".join(f"[R{i + 1}]\n{text}" for i, (_, text) in enumerate(batch))
+    return f"""
+    Scenario: {scenario['scenario']}
+    Question: {scenario['question']}
+
+    Act as a senior supervisor. Grade each learner response below independently
+    against semiconductor industry standards (JIT, predictive maintenance, etc.).
+
+    Learner responses:
+    {answers}
+
+    Return strictly a JSON array with one object per response, in order, each with:
+    - "id": the response label, e.g. "R1"
+    - "grade": "Pass" or "Fail"
+    - "rationale": 1-2 sentences explaining the grade
+    - "competencies": list of competencies the response demonstrates, from: {", ".join(COMPETENCIES)}
+
+    Do not include markdown code blocks.
+    """
+
+def parse_grades(content, size):
+    """
+    Map response position -> grade dict from the model output; malformed entries are left out.
+    """
+    try:
+        json_match = re.search(r'(\[.*\])', content, re.DOTALL)
+        items = json.loads(json_match.group(1) if json_match else strip_code_fences(content))
+    except json.JSONDecodeError:
+        return {}
+    grades = {}
+    for position, item in enumerate(items if isinstance(items, list) else []):
+        if not isinstance(item, dict):
+            continue
+        label = re.match(r"R?(\d+)$", str(item.get("id", "")).strip())
+        index = int(label.group(1)) - 1 if label else position
+        grade = str(item.get("grade", "")).strip().capitalize()
+        if not 0 <= index < size or grade not in ("Pass", "Fail"):
+            continue
+        tags = item.get("competencies") or []
+        grades[index] = {
+            "grade": grade,
+            "rationale": str(item.get("rationale", "")).strip(),
+            "competencies": [c for c in tags if c in COMPETENCIES] if isinstance(tags, list) else [],
+        }
+    return grades
+
+def grade_batch(scenario, batch, stats=None):
+    """
+    Grade a batch in one LLM call. Responses the model skipped or mangled are
+    regraded in smaller batches, down to single responses.
+    Returns {key: grade}.
+    """
+    from engine import invoke_llm
+    if stats is not None:
+        stats["llm_calls"] += 1
+    content = invoke_llm(build_grading_prompt(scenario, batch), "grading").content
+    parsed = parse_grades(content, len(batch))
+    results = {batch[i][0]: grade for i, grade in parsed.items()}
+
+    missing = [item for i, item in enumerate(batch) if i not in parsed]
+    if missing and len(batch) > 1:
+        half = max(1, len(missing) // 2)
+        for part in (missing[:half], missing[half:]):
+            if part:
+                results.update(grade_batch(scenario, part, stats))
+    elif missing:
+        key = missing[0][0]
+        results[key] = {"grade": "Ungraded", "rationale": "The grader did not return a usable result.", "competencies": []}
+    return results
+
+def grade_cohort(scenario, responses, concurrency=GRADING_CONCURRENCY, cache=None):
+    """
+    Grade many responses to one scenario.
+    Cached and duplicate answers are graded once; the rest are packed into
+    size-bounded batches graded concurrently (LLM calls go through the engine's rate limiter).
+    Returns (grades in input order, stats).
+    """
+    cache = cache if cache is not None else GradeCache()
+    stats = {"responses": len(responses), "cache_hits": 0, "llm_calls": 0, "batches": 0}
+    keys = [grade_key(scenario, r) for r in responses]
+
+    pending = {}
+    for key, text in zip(keys, responses):
+        if cache.get(key) is not None:
+            stats["cache_hits"] += 1
+        elif key not in pending:
+            pending[key] = str(text)[:MAX_RESPONSE_CHARS]
+
+    batches = pack_batches(list(pending.items()))
+    stats["batches"] = len(batches)
+    fresh = {}
+    if batches:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for result in pool.map(lambda b: grade_batch(scenario, b, stats), batches):
+                fresh.update(result)
+        # Ungraded results are returned for this run but not cached, so they are retried next time
+        cache.put_many([(k, g) for k, g in fresh.items() if g["grade"] != "Ungraded"])
+
+    return [cache.get(key) or fresh[key] for key in keys], stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Grade a cohort's answers to one Fab Crisis scenario in batches.")
+    parser.add_argument("scenario", help="JSON file with 'scenario' and 'question'")
+    parser.add_argument("responses", help="CSV with 'name' and 'response' columns")
+    parser.add_argument("--output", default="grades.csv")
+    parser.add_argument("--concurrency", type=int, default=GRADING_CONCURRENCY)
+    args = parser.parse_args()
+
+    with open(args.scenario, encoding="utf-8") as f:
+        scenario = json.load(f)
+    with open(args.responses, newline="", encoding="utf-8-sig") as f:
+        rows = [r for r in csv.DictReader(f) if (r.get("response") or "").strip()]
+
+    start = time.perf_counter()
+    grades, stats = grade_cohort(scenario, [r["response"] for r in rows], args.concurrency)
+    elapsed = time.perf_counter() - start
+
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "grade", "rationale", "competencies"])
+        for row, grade in zip(rows, grades):
+            writer.writerow([row.get("name", ""), grade["grade"], grade["rationale"], "; ".join(grade["competencies"])])
+
+    passed = sum(1 for g in grades if g["grade"] == "Pass")
+    print(f"Graded {len(rows)} responses in {elapsed:.1f}s with {stats['llm_calls']} LLM calls "
+          f"({stats['cache_hits']} cached). Pass: {passed}, Fail: {sum(1 for g in grades if g['grade'] == 'Fail')}.")
+    print(f"Grades written to {args.output}")
+
+if __name__ == "__main__":
+    main()
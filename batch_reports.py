@@ -0,0 +1,244 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+from utils import ensure_directory_exists, generate_pdf_report, build_roadmap_query
+
+# Use the shared engine service when one is running (see service.py)
+if os.environ.get("ENGINE_SERVICE_URL"):
+    from engine_client import get_rag_response
+else:
+    from engine import get_rag_response
+
+# Configuration
+DEFAULT_OUTPUT_DIR = "cohort_reports"
+CHECKPOINT_FILE = "checkpoint.jsonl"
+SUMMARY_FILE = "summary.json"
+MAX_RETRIES = 2
+
+def load_cohort(csv_path):
+    """
+    Read the cohort CSV.
+    Expected columns: name, role, literacy_level and an optional quiz_score.
+    Returns (members, errors) where errors lists rows that could not be parsed.
+    """
+    members = []
+    errors = []
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        for line_no, row in enumerate(reader, start=2):
+            row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+            try:
+                name = row["name"]
+                role = row["role"]
+                level = int(row["literacy_level"])
+                if not name or not role:
+                    raise ValueError("name and role are required")
+                if not 1 <= level <= 5:
+                    raise ValueError(f"literacy_level must be 1-5, got {level}")
+                score = row.get("quiz_score")
+                score = int(score) if score else None
+            except (KeyError, ValueError) as e:
+                errors.append({"line": line_no, "error": str(e)})
+                continue
+
+            members.append({
+                "key": member_key(name, role, level),
+                "name": name,
+                "role": role,
+                "literacy_level": level,
+                "quiz_score": score,
+            })
+    return members, errors
+
+def member_key(name, role, level):
+    """
+    Stable identifier for a cohort member, used for checkpointing.
+    """
+    raw = f"{name}|{role}|{level}".encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+def report_filename(member):
+    """
+    Filesystem-safe PDF name for a cohort member.
+    """
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", member["name"]).strip("_") or "member"
+    return f"{slug}_{member['key']}.pdf"
+
+def roadmap_key(role, level):
+    """
+    Roadmaps depend only on role and literacy level, so members sharing both share one.
+    """
+    return hashlib.sha1(f"{role}|{level}".encode("utf-8")).hexdigest()[:16]
+
+def load_checkpoint(path):
+    """
+    Load finished roadmaps from a previous (possibly interrupted) run.
+    Only successful entries are kept, so failures are retried on resume.
+    """
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Partially written last line from a crash
+                continue
+            if entry.get("status") == "ok":
+                done[entry["key"]] = entry["roadmap"]
+    return done
+
+def generate_roadmap(role, level):
+    """
+    Run the existing RAG chain in "roadmap" mode and collect the stream.
+    """
+    last_error = None
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            stream = get_rag_response(
+                build_roadmap_query(role, level),
+                role,
+                level,
+                generation_mode="roadmap"
+            )
+            return "".join(stream)
+        except Exception as e:
+            last_error = e
+            if attempt < MAX_RETRIES:
+                time.sleep(2 ** attempt)
+    raise last_error
+
+def generate_roadmaps(members, checkpoint_path, concurrency):
+    """
+    Generate one roadmap per distinct (role, literacy level) with at most
+    `concurrency` LLM calls in flight, and map the results back to members.
+    Every result is appended to the checkpoint as soon as it arrives.
+    Returns ({member key: roadmap}, failures).
+    """
+    done = load_checkpoint(checkpoint_path)
+    groups = {}
+    for m in members:
+        groups.setdefault(roadmap_key(m["role"], m["literacy_level"]), []).append(m)
+    pending = [key for key in groups if key not in done]
+    failures = []
+
+    print(f"Roadmaps: {len(groups)} distinct role/level pairs for {len(members)} members; "
+          f"{len(groups) - len(pending)} restored from checkpoint, {len(pending)} to generate.")
+
+    with open(checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {
+            pool.submit(generate_roadmap, groups[key][0]["role"], groups[key][0]["literacy_level"]): key
+            for key in pending
+        }
+        for i, future in enumerate(as_completed(futures), start=1):
+            key = futures[future]
+            group = groups[key]
+            role, level = group[0]["role"], group[0]["literacy_level"]
+            entry = {"key": key, "role": role, "literacy_level": level}
+            try:
+                roadmap = future.result()
+                entry.update(status="ok", roadmap=roadmap)
+                done[key] = roadmap
+            except Exception as e:
+                entry.update(status="error", error=str(e))
+                failures.extend({"name": m["name"], "stage": "roadmap", "error": str(e)} for m in group)
+
+            checkpoint.write(json.dumps(entry) + "\n")
+            checkpoint.flush()
+            print(f"[{i}/{len(pending)}] {entry['status'].upper()} {role} L{level} ({len(group)} members)")
+
+    roadmaps = {m["key"]: done[key] for key, group in groups.items() if key in done for m in group}
+    return roadmaps, failures
+
+def render_report(args):
+    """
+    Worker-process entry point: render one PDF and write it to disk.
+    """
+    path, role, level, quiz_score, roadmap = args
+    # Write straight to disk; batch inputs are unique, so skip the in-memory cache
+    if generate_pdf_report(role, level, quiz_score, roadmap, output=path) is None:
+        raise RuntimeError("PDF generation failed. Is 'fpdf2' installed?")
+    return path
+
+def render_reports(members, roadmaps, output_dir, workers, force=False):
+    """
+    Render PDF reports in a process pool.
+    Existing PDFs are kept unless `force` is set.
+    """
+    failures = []
+    rendered = 0
+    jobs = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for m in members:
+            if m["key"] not in roadmaps:
+                continue
+            path = os.path.join(output_dir, report_filename(m))
+            if os.path.exists(path) and not force:
+                continue
+            args = (path, m["role"], m["literacy_level"], m["quiz_score"], roadmaps[m["key"]])
+            jobs[pool.submit(render_report, args)] = m
+
+        for future in as_completed(jobs):
+            member = jobs[future]
+            try:
+                future.result()
+                rendered += 1
+            except Exception as e:
+                failures.append({"name": member["name"], "stage": "pdf", "error": str(e)})
+
+    return rendered, failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate roadmaps and PDF career reports for a cohort.")
+    parser.add_argument("csv_path", help="CSV with columns: name, role, literacy_level, quiz_score (optional)")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Where PDFs, checkpoint and summary are written")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum concurrent roadmap generations")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="PDF rendering processes")
+    parser.add_argument("--force", action="store_true", help="Re-render PDFs that already exist")
+    args = parser.parse_args()
+
+    ensure_directory_exists(args.output_dir)
+    checkpoint_path = os.path.join(args.output_dir, CHECKPOINT_FILE)
+
+    members, parse_errors = load_cohort(args.csv_path)
+    print(f"Loaded {len(members)} cohort members ({len(parse_errors)} invalid rows).")
+
+    start = time.perf_counter()
+    roadmaps, roadmap_failures = generate_roadmaps(members, checkpoint_path, args.concurrency)
+    roadmap_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rendered, pdf_failures = render_reports(members, roadmaps, args.output_dir, args.workers, args.force)
+    pdf_seconds = time.perf_counter() - start
+
+    total_seconds = roadmap_seconds + pdf_seconds
+    summary = {
+        "members": len(members),
+        "invalid_rows": parse_errors,
+        "roadmaps_available": len([m for m in members if m["key"] in roadmaps]),
+        "reports_rendered": rendered,
+        "failures": roadmap_failures + pdf_failures,
+        "failure_count": len(roadmap_failures) + len(pdf_failures),
+        "roadmap_seconds": round(roadmap_seconds, 2),
+        "pdf_seconds": round(pdf_seconds, 2),
+        "reports_per_minute": round(rendered / total_seconds * 60, 2) if total_seconds else None,
+    }
+    with open(os.path.join(args.output_dir, SUMMARY_FILE), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    print("-" * 60)
+    print(f"Reports rendered: {rendered}/{len(members)}")
+    print(f"Failures: {summary['failure_count']}")
+    print(f"Roadmap stage: {summary['roadmap_seconds']}s | PDF stage: {summary['pdf_seconds']}s")
+    print(f"Throughput: {summary['reports_per_minute']} reports/min")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import glob
+import os
+import re
+import tempfile
+import time
+
+from extract import available_backends, extract_pages
+from utils import get_directories
+
+_WORD_RE = re.compile(r"\w+")
+
+def word_set(pages):
+    return set(_WORD_RE.findall(" ".join(pages).lower()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PDF extraction backends on the bundled corpus.")
+    parser.add_argument("--backends", nargs="+", default=None, help="Backends to compare (default: all installed)")
+    args = parser.parse_args()
+
+    backends = args.backends or available_backends()
+    pdfs = sorted(p for d in get_directories() for p in glob.glob(os.path.join(d, "**", "*.pdf"), recursive=True))
+    if not pdfs or not backends:
+        print("Need at least one PDF and one installed backend (pymupdf, pypdfium2, pypdf).")
+        return
+    print(f"{len(pdfs)} PDFs, backends: {', '.join(backends)}")
+
+    totals = {b: {"pages": 0, "seconds": 0.0, "chars": 0, "errors": 0, "words": {}} for b in backends}
+    for pdf in pdfs:
+        for backend in backends:
+            start = time.perf_counter()
+            try:
+                pages = extract_pages(pdf, backend, use_cache=False)
+            except Exception as e:
+                totals[backend]["errors"] += 1
+                print(f"  [{backend}] ERROR {os.path.basename(pdf)}: {e}")
+                continue
+            totals[backend]["seconds"] += time.perf_counter() - start
+            totals[backend]["pages"] += len(pages)
+            totals[backend]["chars"] += sum(len(p) for p in pages)
+            totals[backend]["words"][pdf] = word_set(pages)
+
+    # Output agreement: vocabulary overlap with the first backend, averaged per file
+    reference = backends[0]
+    print(f"\n{'backend':<10}{'pages':>8}{'seconds':>10}{'pages/s':>10}{'chars':>12}{'errors':>8}  overlap vs {reference}")
+    for backend in backends:
+        t = totals[backend]
+        overlaps = []
+        for pdf, words in t["words"].items():
+            ref = totals[reference]["words"].get(pdf)
+            if ref is not None and (ref or words):
+                overlaps.append(len(ref & words) / len(ref | words))
+        overlap = sum(overlaps) / len(overlaps) if overlaps else 0.0
+        rate = t["pages"] / t["seconds"] if t["seconds"] else 0.0
+        print(f"{backend:<10}{t['pages']:>8}{t['seconds']:>10.2f}{rate:>10.1f}{t['chars']:>12}{t['errors']:>8}  {overlap:.3f}")
+
+    # Cold vs cached extraction for the fastest backend
+    fastest = min(backends, key=lambda b: totals[b]["seconds"] or float("inf"))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        for pdf in pdfs:
+            extract_pages(pdf, fastest, cache_dir=cache_dir)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        for pdf in pdfs:
+            extract_pages(pdf, fastest, cache_dir=cache_dir)
+        warm = time.perf_counter() - start
+        cache_bytes = sum(os.path.getsize(os.path.join(cache_dir, f)) for f in os.listdir(cache_dir))
+    print(f"\nCache ({fastest}): cold {cold:.2f}s, cached {warm:.2f}s, {cache_bytes / 1e6:.2f} MB compressed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import time
+import argparse
+import statistics
+
+from langchain.prompts import ChatPromptTemplate
+from langchain.schema import StrOutputParser
+from langchain.schema.runnable import RunnablePassthrough
+
+from engine import (get_chain, get_llm, mode_prompt, estimate_tokens, build_context,
+                    MODE_BUDGETS, MODE_PROMPTS, CHARS_PER_TOKEN)
+
+# The single template every mode used before per-mode chains
+LEGACY_RAG_TEMPLATE = """
+    You are the "Semiconductor Logistics AI-Upskiller", an expert mentor.
+
+    Context from Knowledge Base:
+    {context}
+
+    User Role: {role}
+    AI Literacy Level: {ai_literacy_level}/5
+    Current Mode: {generation_mode}
+
+    User Query: {question}
+
+    Instructions:
+    1. Search context for competencies/standards.
+
+    2. MODE-SPECIFIC RULES (CRITICAL):
+
+       IF Current Mode is "chat":
+       - **DO NOT** generate a full learning path, curriculum, or 10-module table.
+       - **DO NOT** generate Mermaid charts.
+       - Answer the user's specific question concisely.
+       - If they ask for a full roadmap/plan, provide a brief summary of key topics (bullet points) and **explicitly tell them to use the 'Personalized Roadmap' tab** for the full visual schedule.
+
+       IF Current Mode is "roadmap":
+       - **FORCE FORMATTING**: Output a valid Markdown table for the Training Path.
+       - **IGNORE** original module numbers. RENUMBER from Module 1 to Module 10.
+       - **STRICT LIMIT**: Exact 10 distinct modules.
+       - **INCLUDE** a Mermaid chart (using graph TD, no parens in labels).
+
+       IF Current Mode is "search":
+       - Incorporate the provided web search results into your answer.
+       - Cite the web sources where appropriate.
+       - Focus on recent trends (2024-2025).
+
+    3. General QA Rules (for "chat" mode):
+
+       - Answer directly and professionally.
+       - Use bullet points for list items.
+       - Cite internal knowledge if context is missing.
+
+    Response:
+    """
+
+BENCH_CASES = {
+    "chat": "How is AI used to forecast wafer demand?",
+    "roadmap": "Create a comprehensive learning roadmap for a Logistics Manager with AI literacy level 3 "
+               "in the semiconductor industry. Include a mermaid chart.",
+    "search": "Latest AI trends in semiconductor supply chain logistics",
+}
+ROLE, LEVEL = "Logistics Manager", 3
+SAMPLE_CONTEXT_SENTENCE = ("Fab logistics teams track AMHS uptime, WIP levels and supplier lead times "
+                           "to plan wafer starts and buffer stock. ")
+
+def legacy_chain(mode, context):
+    """
+    The old per-call construction: a fresh template and runnable graph on every request.
+    """
+    prompt = ChatPromptTemplate.from_template(LEGACY_RAG_TEMPLATE)
+    return (
+        {"context": lambda x: context, "question": RunnablePassthrough(), "role": lambda x: ROLE,
+         "ai_literacy_level": lambda x: LEVEL, "generation_mode": lambda x: mode}
+        | prompt
+        | get_llm()
+        | StrOutputParser()
+    )
+
+def instruction_tokens(template):
+    """
+    Tokens of a template with its placeholders emptied: what every call pays besides context and query.
+    """
+    return estimate_tokens(template.format(context="", question="", role="", ai_literacy_level="", generation_mode=""))
+
+def sample_context(mode, retrieve):
+    if retrieve:
+        return build_context(BENCH_CASES[mode], mode)
+    chars = MODE_BUDGETS[mode]["context_tokens"] * CHARS_PER_TOKEN
+    return (SAMPLE_CONTEXT_SENTENCE * (chars // len(SAMPLE_CONTEXT_SENTENCE) + 1))[:chars]
+
+def time_setup(build, calls):
+    """
+    Mean ms to get a chain and render its prompt (no model call).
+    """
+    start = time.perf_counter()
+    for _ in range(calls):
+        build()
+    return (time.perf_counter() - start) * 1000 / calls
+
+def time_stream(chain, inputs, repeat):
+    """
+    Median time to first token and total (ms), and the output length in characters.
+    """
+    firsts, totals, length = [], [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        first, text = None, ""
+        for chunk in chain.stream(inputs):
+            if first is None:
+                first = time.perf_counter() - start
+            text += chunk
+        firsts.append((first or 0) * 1000)
+        totals.append((time.perf_counter() - start) * 1000)
+        length = len(text)
+    return statistics.median(firsts), statistics.median(totals), length
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt tokens and latency: shared RAG template vs per-mode chains.")
+    parser.add_argument("--modes", nargs="+", default=list(MODE_PROMPTS), choices=list(MODE_PROMPTS))
+    parser.add_argument("--repeat", type=int, default=3, help="Model calls per mode and variant")
+    parser.add_argument("--setup-calls", type=int, default=200)
+    parser.add_argument("--retrieve", action="store_true",
+                        help="Use real build_context() output (needs an index) instead of sample context")
+    parser.add_argument("--no-llm", action="store_true", help="Skip the model calls")
+    args = parser.parse_args()
+
+    print(f"Instruction tokens: legacy {instruction_tokens(LEGACY_RAG_TEMPLATE)} in every mode")
+    print(f"{'mode':<9}{'variant':>9}{'instr tok':>10}{'prompt tok':>11}{'setup ms':>10}"
+          f"{'TTFT ms':>9}{'total ms':>10}{'chars':>7}")
+    for mode in args.modes:
+        query = BENCH_CASES[mode]
+        context = sample_context(mode, args.retrieve)
+        inputs = {"context": context, "question": query, "role": ROLE, "ai_literacy_level": LEVEL}
+
+        def legacy_setup():
+            legacy_chain(mode, context)
+            ChatPromptTemplate.from_template(LEGACY_RAG_TEMPLATE).format(generation_mode=mode, **inputs)
+
+        def per_mode_setup():
+            get_chain(mode)
+            new_prompt.format(**inputs)
+
+        new_prompt = ChatPromptTemplate.from_template(mode_prompt(mode))
+        rows = [
+            ("legacy", LEGACY_RAG_TEMPLATE, LEGACY_RAG_TEMPLATE.format(generation_mode=mode, **inputs),
+             time_setup(legacy_setup, args.setup_calls),
+             lambda: time_stream(legacy_chain(mode, context), query, args.repeat)),
+            ("per-mode", mode_prompt(mode), mode_prompt(mode).format(**inputs),
+             time_setup(per_mode_setup, args.setup_calls),
+             lambda: time_stream(get_chain(mode), inputs, args.repeat)),
+        ]
+        for variant, template, prompt_text, setup_ms, run in rows:
+            timing = f"{'-':>9}{'-':>10}{'-':>7}"
+            if not args.no_llm:
+                first, total, length = run()
+                timing = f"{first:>9.0f}{total:>10.0f}{length:>7}"
+            print(f"{mode:<9}{variant:>9}{instruction_tokens(template):>10}{estimate_tokens(prompt_text):>11}{setup_ms:>10.3f}{timing}")
+
+if __name__ == "__main__":
+    main()
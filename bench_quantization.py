@@ -0,0 +1,71 @@
+import argparse
+import os
+import tempfile
+import numpy as np
+
+from flat_index import FlatIndex, export_flat_index
+from bench_retrieval import BENCH_QUERIES, synthetic_corpus, summarize, time_calls
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+def recall_at_k(index, exact, queries, k):
+    hits = 0
+    for q in queries:
+        truth = {row for row, _ in exact.search(q, k)}
+        hits += len(truth & {row for row, _ in index.search(q, k)})
+    return hits / (k * len(queries))
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall, latency and footprint of quantized flat indexes.")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--scale", type=int, default=1, help="Tile the corpus to simulate a larger index")
+    parser.add_argument("--sample-queries", type=int, default=200, help="Extra queries drawn from perturbed corpus chunks")
+    args = parser.parse_args()
+
+    from engine import get_chroma_db, get_embedding_function, active_index
+
+    db = get_chroma_db()
+    data = db.get(include=["embeddings", "metadatas", "documents"])
+    if not data["ids"]:
+        print("Chroma collection is empty. Run `python ingest.py` first.")
+        return
+
+    base = np.asarray(data["embeddings"], dtype=np.float32)
+    vectors = synthetic_corpus(base, args.scale)
+    ids = [str(i) for i in range(len(vectors))]
+
+    # Real user-style queries plus perturbed chunks as near-duplicate lookups
+    rng = np.random.default_rng(0)
+    queries = list(np.asarray(get_embedding_function(active_index()[3]).embed_documents(BENCH_QUERIES), dtype=np.float32))
+    sampled = vectors[rng.integers(0, len(vectors), args.sample_queries)]
+    queries += list(sampled + rng.normal(0, 0.05, sampled.shape).astype(np.float32))
+
+    class ArrayCollection:
+        # Mimics Chroma's get() so the real export path is benchmarked
+        def get(self, include):
+            return {"ids": ids, "embeddings": vectors, "metadatas": [{}] * len(ids), "documents": [""] * len(ids)}
+
+    exact = FlatIndex.from_arrays(vectors, ids)
+    print(f"Corpus: {len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+    print(f"{'mode':<22}{'RAM scan':>12}{'disk':>12}{'recall':>9}  latency")
+
+    configs = [("none", True), ("int8", True), ("int8", False), ("binary", True), ("binary", False)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for quantization, keep_float32 in configs:
+            path = os.path.join(tmp, f"{quantization}_{keep_float32}")
+            export_flat_index(ArrayCollection(), path, quantization=quantization, keep_float32=keep_float32)
+            index = FlatIndex.load(path)
+
+            label = quantization + ("" if keep_float32 else " (no float32)")
+            ram = index.memory_footprint()
+            disk = directory_size(path) - sum(
+                os.path.getsize(os.path.join(path, name))
+                for name in ("ids.json", "metadata.json", "documents.json", "manifest.json")
+            )
+            recall = recall_at_k(index, exact, queries, args.k)
+            latency = time_calls(lambda q: index.search(q, args.k), [(q,) for q in queries], repeat=1)
+            print(f"{label:<22}{ram / 1e6:>10.2f}MB{disk / 1e6:>10.2f}MB{recall:>9.3f}  {summarize(latency)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import statistics
+import time
+import numpy as np
+
+from flat_index import FlatIndex, FlatIndexRetriever
+
+# Realistic queries across the four roles and the three modes
+BENCH_QUERIES = [
+    "What competencies does a Logistics Manager need in a semiconductor fab?",
+    "Key responsibilities of a supply chain analyst",
+    "Warehouse safety standards for cleanroom materials",
+    "How is AI used for demand forecasting in semiconductors?",
+    "Materials planning manager skills and qualifications",
+    "Semiconductor talent shortage and upskilling strategies",
+    "Inventory management KPIs for a warehouse supervisor",
+    "Supplier quality management for semiconductor components",
+    "Training curriculum for electronics mechanic NSQF level 4",
+    "Procurement specialist negotiation and sourcing skills",
+    "Japanese semiconductor industry workforce development",
+    "Predictive maintenance and logistics bottlenecks in a fab",
+]
+
+# Queries whose answer should come from one role's job descriptions
+# (the "Job Descriptions/<subfolder>" a relevant chunk is loaded from)
+RERANK_JUDGEMENTS = [
+    ("What are the day-to-day duties of a logistics manager?", "Logistics Manager"),
+    ("Qualifications required for a warehouse operations manager", "Warehouse Manager"),
+    ("Which analytical skills does a supply chain analyst need?", "Analyst"),
+    ("Responsibilities of a materials planning manager", "Materials Manager"),
+    ("Supplier quality responsibilities of a supply chain planner", "Supply Chain Planner"),
+]
+
+def is_relevant(doc, subfolder):
+    source = doc.metadata.get("source", "").replace("\\", "/")
+    return f"Job Descriptions/{subfolder}/" in source
+
+def ranking_quality(ranked_lists, k):
+    """
+    Mean precision@k and MRR over [(docs, subfolder)].
+    """
+    precision, mrr = [], []
+    for docs, subfolder in ranked_lists:
+        flags = [is_relevant(d, subfolder) for d in docs[:k]]
+        precision.append(sum(flags) / k)
+        mrr.append(next((1 / (i + 1) for i, f in enumerate(flags) if f), 0.0))
+    return statistics.mean(precision), statistics.mean(mrr)
+
+def bench_rerank(k, repeat):
+    """
+    Ranking quality and latency of retrieval with and without the cross-encoder.
+    """
+    from engine import retrieve_documents, get_reranker
+
+    print("\n== Cross-encoder re-ranking (role-specific JD queries) ==")
+    reranker = get_reranker()
+    reranker.budget_ms = float("inf")  # measure the stage itself, not the skip logic
+    for query, _ in RERANK_JUDGEMENTS:
+        retrieve_documents(query, k=k, rerank=True)  # load model
+    reranker.clear_cache()
+
+    for label, rerank in (("baseline", False), ("reranked", True)):
+        results = [(retrieve_documents(q, k=k, rerank=rerank), sub) for q, sub in RERANK_JUDGEMENTS]
+        p_at_k, mrr = ranking_quality(results, k)
+        if rerank:
+            # First pass is cold; later repeats hit the pair-score cache
+            reranker.clear_cache()
+        latencies = time_calls(lambda q: retrieve_documents(q, k=k, rerank=rerank),
+                               [(q,) for q, _ in RERANK_JUDGEMENTS], repeat)
+        print(f"{label:<9}: P@{k} {p_at_k:.3f} | MRR {mrr:.3f} | {summarize(latencies)}")
+    print(f"Cached pair scores: {reranker.stats['cache_hits']} hits, {reranker.stats['pairs_scored']} scored")
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def time_calls(fn, args_list, repeat=3):
+    """
+    Run fn over all args `repeat` times; return per-call latencies in ms.
+    """
+    latencies = []
+    for _ in range(repeat):
+        for args in args_list:
+            start = time.perf_counter()
+            fn(*args)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def summarize(latencies):
+    return f"p50 {statistics.median(latencies):7.3f} ms | p95 {percentile(latencies, 95):7.3f} ms"
+
+def synthetic_corpus(base, scale, seed=0):
+    """
+    Tile the real vectors `scale` times with small noise so the
+    distribution stays realistic at 10x and 100x corpus size.
+    """
+    if scale == 1:
+        return base
+    rng = np.random.default_rng(seed)
+    tiled = np.tile(base, (scale, 1))
+    tiled += rng.normal(0, 0.02, tiled.shape).astype(np.float32)
+    return tiled
+
+def build_chroma_collection(vectors):
+    """
+    Raw Chroma collection (HNSW, cosine) holding precomputed vectors.
+    """
+    import chromadb
+    client = chromadb.EphemeralClient()
+    name = f"bench_{len(vectors)}"
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass
+    collection = client.create_collection(name, metadata={"hnsw:space": "cosine"})
+    batch = 5000
+    for start in range(0, len(vectors), batch):
+        chunk = vectors[start:start + batch]
+        collection.add(ids=[str(i) for i in range(start, start + len(chunk))], embeddings=chunk.tolist())
+    return collection
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the flat NumPy index against Chroma.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--rerank", action="store_true", help="Also benchmark cross-encoder re-ranking")
+    args = parser.parse_args()
+
+    from engine import get_chroma_db, get_embedding_function, active_index
+
+    db = get_chroma_db()
+    embeddings = get_embedding_function(active_index()[3])
+    data = db.get(include=["embeddings", "metadatas", "documents"])
+    base = np.asarray(data["embeddings"], dtype=np.float32)
+    if not len(base):
+        print("Chroma collection is empty. Run `python ingest.py` first.")
+        return
+    print(f"Corpus: {len(base)} chunks, {base.shape[1]} dims")
+    query_vectors = np.asarray(embeddings.embed_documents(BENCH_QUERIES), dtype=np.float32)
+
+    # End-to-end at 1x: includes query embedding, as in get_rag_response
+    print("\n== End-to-end retriever (1x, includes query embedding) ==")
+    flat_retriever = FlatIndexRetriever(FlatIndex.from_arrays(base, data["ids"], data["metadatas"], data["documents"]), embeddings, k=args.k)
+    chroma_retriever = db.as_retriever(search_kwargs={"k": args.k})
+    queries = [(q,) for q in BENCH_QUERIES]
+    print(f"db.as_retriever : {summarize(time_calls(chroma_retriever.invoke, queries, args.repeat))}")
+    print(f"FlatIndexRetriever: {summarize(time_calls(flat_retriever.invoke, queries, args.repeat))}")
+
+    print("\n== Index search only (precomputed query vectors) ==")
+    for scale in args.scales:
+        vectors = synthetic_corpus(base, scale)
+        index = FlatIndex.from_arrays(vectors, range(len(vectors)))
+        collection = build_chroma_collection(index.vectors)
+
+        qargs = [(q,) for q in query_vectors]
+        flat_lat = time_calls(lambda q: index.search(q, args.k), qargs, args.repeat)
+        chroma_lat = time_calls(lambda q: collection.query(query_embeddings=[q.tolist()], n_results=args.k), qargs, args.repeat)
+
+        # Recall of HNSW against the exact flat result
+        hits = 0
+        for q in query_vectors:
+            exact = {str(row) for row, _ in index.search(q, args.k)}
+            approx = set(collection.query(query_embeddings=[q.tolist()], n_results=args.k)["ids"][0])
+            hits += len(exact & approx)
+        recall = hits / (args.k * len(query_vectors))
+
+        print(f"\n{scale}x ({len(vectors)} vectors, {index.vectors.nbytes / 1e6:.1f} MB float32)")
+        print(f"  flat   : {summarize(flat_lat)}")
+        print(f"  chroma : {summarize(chroma_lat)} | recall@{args.k} vs exact {recall:.3f}")
+
+    if args.rerank:
+        bench_rerank(args.k, args.repeat)
+
+if __name__ == "__main__":
+    main()
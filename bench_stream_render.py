@@ -0,0 +1,97 @@
+import re
+import time
+import argparse
+
+from llm_backends import FAKE_ROADMAP, FAKE_CHAT, FAKE_TOKEN_LATENCY_MS
+from stream_render import StreamRenderer, CURSOR, RENDER_INTERVAL_S
+
+_TOKEN_RE = re.compile(r"\S+\s*|\s+")
+
+try:
+    import markdown as _markdown   # optional: times a real Markdown parse per update as a client-side proxy
+except ImportError:
+    _markdown = None
+
+class RecordingElement:
+    """
+    Stand-in for st.empty(): counts what would be sent to the browser.
+    """
+
+    def __init__(self, totals):
+        self.totals = totals
+
+    def markdown(self, text):
+        self.totals["updates"] += 1
+        self.totals["bytes"] += len(text.encode("utf-8"))
+        if _markdown is not None:
+            start = time.perf_counter()
+            _markdown.markdown(text, extensions=["tables", "fenced_code"])
+            self.totals["parse_s"] += time.perf_counter() - start
+
+    def empty(self):
+        return self
+
+class RecordingContainer:
+    def __init__(self):
+        self.totals = {"updates": 0, "bytes": 0, "parse_s": 0.0}
+
+    def empty(self):
+        return RecordingElement(self.totals)
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def tokens_for(text, repeat):
+    body = "\n\n".join([text] * repeat)
+    return _TOKEN_RE.findall(body)
+
+def run_naive(tokens):
+    """
+    The old loop: re-send the whole answer plus cursor on every token.
+    """
+    container = RecordingContainer()
+    element = container.empty()
+    full = ""
+    start = time.perf_counter()
+    for token in tokens:
+        full += token
+        element.markdown(full + CURSOR)
+    element.markdown(full)
+    return container.totals, time.perf_counter() - start
+
+def run_renderer(tokens, token_latency_ms, interval):
+    container = RecordingContainer()
+    clock = VirtualClock()
+    renderer = StreamRenderer(container, interval=interval, clock=clock)
+    start = time.perf_counter()
+    for token in tokens:
+        clock.now += token_latency_ms / 1000
+        renderer.write(token)
+    renderer.close()
+    return container.totals, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes sent and render work: per-token re-render vs StreamRenderer.")
+    parser.add_argument("--repeat", type=int, nargs="+", default=[1, 4, 8], help="Answer length multipliers")
+    parser.add_argument("--token-latency-ms", type=float, default=FAKE_TOKEN_LATENCY_MS)
+    parser.add_argument("--interval", type=float, default=RENDER_INTERVAL_S)
+    args = parser.parse_args()
+
+    if _markdown is None:
+        print("(install `markdown` to also time a Markdown parse per update)")
+    print(f"{'answer':<10}{'x':>4}{'tokens':>8}{'method':>10}{'updates':>9}{'KB sent':>10}{'parse ms':>10}{'loop ms':>9}")
+    for name, text in (("chat", FAKE_CHAT), ("roadmap", FAKE_ROADMAP)):
+        for repeat in args.repeat:
+            tokens = tokens_for(text, repeat)
+            for method, (totals, seconds) in (("naive", run_naive(tokens)),
+                                              ("renderer", run_renderer(tokens, args.token_latency_ms, args.interval))):
+                parse = f"{totals['parse_s'] * 1000:10.1f}" if _markdown is not None else f"{'-':>10}"
+                print(f"{name:<10}{repeat:>4}{len(tokens):>8}{method:>10}{totals['updates']:>9}"
+                      f"{totals['bytes'] / 1024:>10.1f}{parse}{seconds * 1000:>9.1f}")
+
+if __name__ == "__main__":
+    main()
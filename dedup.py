@@ -0,0 +1,100 @@
+import re
+import zlib
+from collections import defaultdict
+import numpy as np
+
+# Configuration
+NUM_PERM = 128
+LSH_BANDS = 16              # 16 bands x 8 rows: candidate pairs from ~0.7 Jaccard
+SHINGLE_SIZE = 5            # words per shingle
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_WORD_RE = re.compile(r"\w+")
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Hashed word n-grams of normalized text (stable across runs).
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+class MinHasher:
+    """
+    MinHash signatures with universal hashing (a * x + b) mod p, vectorized over permutations.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, seed=42):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, _MERSENNE_PRIME, num_perm, dtype=np.int64)
+        self.b = rng.integers(0, _MERSENNE_PRIME, num_perm, dtype=np.int64)
+
+    def signature(self, text):
+        values = np.fromiter(shingles(text), dtype=np.int64)
+        if not len(values):
+            return np.full(self.num_perm, _MERSENNE_PRIME, dtype=np.int64)
+        # (num_shingles, num_perm) hash table, min over shingles
+        hashed = (np.outer(values, self.a) + self.b) % _MERSENNE_PRIME
+        return hashed.min(axis=0)
+
+    def signatures(self, texts):
+        return np.stack([self.signature(t) for t in texts]) if texts else np.zeros((0, self.num_perm), dtype=np.int64)
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def near_duplicate_clusters(texts, threshold=NEAR_DUPLICATE_THRESHOLD, bands=LSH_BANDS, hasher=None):
+    """
+    Group texts whose estimated Jaccard similarity is >= threshold.
+    Returns a list of clusters (lists of indices, size >= 2, first index lowest).
+    """
+    hasher = hasher or MinHasher()
+    return signature_clusters(hasher.signatures(texts), threshold, bands)
+
+def signature_clusters(sigs, threshold=NEAR_DUPLICATE_THRESHOLD, bands=LSH_BANDS):
+    """
+    near_duplicate_clusters() over precomputed MinHash signatures (one row per text).
+    LSH banding proposes candidate pairs; signature agreement confirms them.
+    """
+    rows = sigs.shape[1] // bands
+    parent = list(range(len(sigs)))
+
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i, band_sig in enumerate(sigs[:, band * rows:(band + 1) * rows]):
+            buckets[band_sig.tobytes()].append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            first = members[0]
+            for other in members[1:]:
+                root_a, root_b = _find(parent, first), _find(parent, other)
+                if root_a == root_b:
+                    continue
+                if np.mean(sigs[first] == sigs[other]) >= threshold:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    clusters = defaultdict(list)
+    for i in range(len(sigs)):
+        clusters[_find(parent, i)].append(i)
+    return [sorted(c) for c in clusters.values() if len(c) > 1]
+
+def deduplicate_chunks(chunks, threshold=NEAR_DUPLICATE_THRESHOLD, signatures=None):
+    """
+    Drop near-duplicate LangChain chunks, keeping the first of each cluster.
+    `signatures` may hold the chunks' precomputed MinHash signatures.
+    Returns (kept_chunks, removed_chunks).
+    """
+    if signatures is None:
+        signatures = MinHasher().signatures([c.page_content for c in chunks])
+    clusters = signature_clusters(signatures, threshold)
+    drop = {i for cluster in clusters for i in cluster[1:]}
+    kept = [c for i, c in enumerate(chunks) if i not in drop]
+    removed = [c for i, c in enumerate(chunks) if i in drop]
+    return kept, removed
@@ -1,141 +1,411 @@
 import os
+import time
+import threading
+import contextvars
 import streamlit as st
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_groq import ChatGroq
 from langchain_community.tools import DuckDuckGoSearchResults
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema import StrOutputParser
-from langchain.schema.runnable import RunnablePassthrough
+from utils import extract_mermaid, prepare_mermaid, strip_code_fences, build_roadmap_query, COMPETENCIES
+from resources import get_resources
+from flat_index import FLAT_INDEX_PATH, FlatIndex, FlatIndexRetriever
+from rerank import CrossEncoderReranker, RERANK_OVERFETCH
+from llm_backends import get_chat_model, LLM_BACKEND
+import index_versions
 
 # Constants
-CHROMA_PATH = "chroma_db"
+CHROMA_PATH = "chroma_db"  # legacy unversioned index, used until a versioned build is activated
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+INDEX_CHECK_INTERVAL_S = 2.0  # how often the active index pointer is re-read (hot reload)
 
-def get_chroma_db():
+# "chroma" (default) or "flat" for the in-process NumPy index (see flat_index.py)
+RETRIEVER_BACKEND = os.environ.get("RETRIEVER_BACKEND", "chroma")
+
+# Optional cross-encoder re-ranking of over-fetched candidates (see rerank.py)
+RERANK_ENABLED = os.environ.get("RERANK_ENABLED", "0") == "1"
+RERANK_LATENCY_BUDGET_MS = float(os.environ.get("RERANK_LATENCY_BUDGET_MS", 300))
+
+# Retrieval depth and prompt-token budget per generation mode.
+# k grows from k_min to k_max with query length; retrieved chunks are packed
+# into at most context_tokens, and the whole prompt is kept under prompt_tokens.
+MODE_BUDGETS = {
+    "chat": {"k_min": 2, "k_max": 5, "context_tokens": 900, "prompt_tokens": 1800},
+    "roadmap": {"k_min": 6, "k_max": 8, "context_tokens": 2400, "prompt_tokens": 3400},
+    "search": {"k_min": 2, "k_max": 3, "context_tokens": 700, "prompt_tokens": 3400},
+}
+CHARS_PER_TOKEN = 4  # Llama 3 tokenizer averages ~4 characters per English token
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate for budgeting (no tokenizer round trip).
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+class TokenAccountant:
+    """
+    Running prompt/completion token totals per mode and per session,
+    plus a one-minute window to compare against Groq's tokens-per-minute limit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_mode = {}
+        self.by_session = {}
+        self._recent = []  # (timestamp, tokens)
+
+    def record(self, mode, prompt_tokens, completion_tokens, session_id=None, estimated=True):
+        session_id = session_id or _usage_session.get()
+        now = time.time()
+        with self._lock:
+            for totals, key in ((self.by_mode, mode), (self.by_session, session_id or "default")):
+                entry = totals.setdefault(key, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "estimated_calls": 0})
+                entry["calls"] += 1
+                entry["prompt_tokens"] += prompt_tokens
+                entry["completion_tokens"] += completion_tokens
+                entry["estimated_calls"] += int(estimated)
+            self._recent.append((now, prompt_tokens + completion_tokens))
+            self._recent = [(t, n) for t, n in self._recent if now - t < 60]
+
+    def snapshot(self, session_id=None):
+        with self._lock:
+            now = time.time()
+            usage = {
+                "by_mode": {k: dict(v) for k, v in self.by_mode.items()},
+                "tokens_last_minute": sum(n for t, n in self._recent if now - t < 60),
+            }
+            if session_id is not None:
+                usage["session"] = dict(self.by_session.get(session_id, {}))
+            else:
+                usage["by_session"] = {k: dict(v) for k, v in self.by_session.items()}
+            return usage
+
+token_accountant = TokenAccountant()
+# Session the current thread/request is working for (set by the UI or the service)
+_usage_session = contextvars.ContextVar("usage_session", default=None)
+
+def set_usage_session(session_id):
+    """
+    Attribute subsequent LLM calls in this context to session_id.
+    """
+    _usage_session.set(session_id)
+
+def get_token_usage(session_id=None):
+    """
+    Token usage totals per mode (and for one session, or all sessions).
+    """
+    return token_accountant.snapshot(session_id)
+
+class RateLimiter:
+    """
+    Blocks callers so that requests and estimated tokens over any 60-second
+    window stay under the provider's per-minute limits (0 disables a limit).
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._cond = threading.Condition()
+        self._window = []  # (timestamp, tokens)
+        self.stats = {"acquired": 0, "waited_s": 0.0}
+
+    def _wait_time(self, tokens, now):
+        self._window = [(t, n) for t, n in self._window if now - t < 60]
+        if not self._window:
+            return 0.0
+        waits = [0.0]
+        if self.requests_per_minute and len(self._window) >= self.requests_per_minute:
+            waits.append(60 - (now - self._window[len(self._window) - self.requests_per_minute][0]))
+        if self.tokens_per_minute:
+            excess = sum(n for _, n in self._window) + tokens - self.tokens_per_minute
+            for t, n in self._window:
+                if excess <= 0:
+                    break
+                # Wait until enough of the oldest calls have left the window
+                excess -= n
+                waits.append(60 - (now - t))
+        return max(waits)
+
+    def acquire(self, tokens=0):
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = self._wait_time(tokens, now)
+                if wait <= 0:
+                    self._window.append((now, tokens))
+                    break
+                self._cond.wait(wait)
+        self.stats["acquired"] += 1
+        self.stats["waited_s"] += time.monotonic() - start
+
+# Groq's free-tier request limit by default; set LLM_RATE_LIMIT_TPM to your tier's token limit.
+# The local and fake backends are unlimited unless configured.
+llm_rate_limiter = RateLimiter(
+    requests_per_minute=int(os.environ.get("LLM_RATE_LIMIT_RPM", 30 if LLM_BACKEND == "groq" else 0)),
+    tokens_per_minute=int(os.environ.get("LLM_RATE_LIMIT_TPM", 0)),
+)
+COMPLETION_TOKEN_RESERVE = 500  # expected invoke_llm completion size counted against the limit up front
+
+def invoke_llm(prompt, mode, session_id=None):
+    """
+    llm.invoke with rate limiting and token accounting; uses the provider's usage counts when reported.
+    """
+    llm_rate_limiter.acquire(estimate_tokens(prompt) + COMPLETION_TOKEN_RESERVE)
+    response = get_llm().invoke(prompt)
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage.get("input_tokens") is not None:
+        token_accountant.record(mode, usage["input_tokens"], usage.get("output_tokens", 0), session_id, estimated=False)
+    else:
+        token_accountant.record(mode, estimate_tokens(prompt), estimate_tokens(response.content), session_id)
+    return response
+
+def choose_k(query_text, generation_mode="chat"):
+    """
+    Retrieval depth for a query: short factual questions get fewer chunks.
     """
-    Initialize and return the ChromaDB client.
-    Cached to prevent reloading on every run.
+    budget = MODE_BUDGETS.get(generation_mode, MODE_BUDGETS["chat"])
+    words = len(query_text.split())
+    # 6 words or fewer -> k_min, 30 or more -> k_max
+    share = min(1.0, max(0.0, (words - 6) / 24))
+    return budget["k_min"] + round(share * (budget["k_max"] - budget["k_min"]))
+
+def pack_context(docs, max_tokens):
+    """
+    Join chunks in rank order until the token budget is used; the top chunk is always kept (truncated if needed).
+    """
+    parts, used = [], 0
+    for doc in docs:
+        cost = estimate_tokens(doc.page_content)
+        if used + cost > max_tokens:
+            if not parts:
+                parts.append(doc.page_content[:max_tokens * CHARS_PER_TOKEN])
+            break
+        parts.append(doc.page_content)
+        used += cost
+    return "\n\n".join(parts)
+
+@st.cache_resource
+def get_embedding_function(model_name=EMBEDDING_MODEL):
+    """
+    Load the sentence-transformer embeddings once per process (and per model).
+    """
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+_active_index = {"checked": 0.0, "value": None}
+_active_index_lock = threading.Lock()
+
+def active_index():
     """
-    embedding_function = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-    db = Chroma(
-        persist_directory=CHROMA_PATH,
-        embedding_function=embedding_function
+    (version, chroma path, flat index path, embedding model) of the active index build.
+    The pointer is re-read every INDEX_CHECK_INTERVAL_S, so an activated build is picked
+    up without a restart. Falls back to the legacy chroma_db/ and flat_index/ directories.
+    """
+    with _active_index_lock:
+        if _active_index["value"] and time.monotonic() - _active_index["checked"] < INDEX_CHECK_INTERVAL_S:
+            return _active_index["value"]
+        version = index_versions.current_version()
+        manifest = index_versions.read_manifest(version) if version else None
+        if manifest is None:
+            value = (None, CHROMA_PATH, FLAT_INDEX_PATH, EMBEDDING_MODEL)
+        else:
+            path = index_versions.version_path(version)
+            value = (version, os.path.join(path, index_versions.CHROMA_DIR), os.path.join(path, index_versions.FLAT_DIR),
+                     manifest.get("embedding_model", EMBEDDING_MODEL))
+        if _active_index["value"] and value[0] != _active_index["value"][0]:
+            print(f"Switched to index version {value[0] or 'legacy'}")
+        _active_index.update(checked=time.monotonic(), value=value)
+        return value
+
+@st.cache_resource(max_entries=2)
+def open_chroma_db(path, model_name=EMBEDDING_MODEL):
+    """
+    Chroma client for one index directory; the previous version stays open
+    until it is evicted, so in-flight requests finish on it.
+    """
+    return Chroma(
+        persist_directory=path,
+        embedding_function=get_embedding_function(model_name)
     )
-    return db
+
+def get_chroma_db():
+    """
+    Return the ChromaDB client for the active index.
+    Cached per index version to prevent reloading on every run.
+    """
+    _, chroma_path, _, model_name = active_index()
+    return open_chroma_db(chroma_path, model_name)
+
+@st.cache_resource(max_entries=2)
+def open_flat_index(path):
+    if not os.path.exists(os.path.join(path, "manifest.json")):
+        return None
+    return FlatIndex.load(path)
+
+def get_flat_index():
+    """
+    Load the active flat index, or None if none has been exported.
+    """
+    return open_flat_index(active_index()[2])
+
+@st.cache_resource
+def get_reranker():
+    """
+    Shared cross-encoder re-ranker (model is loaded on first use).
+    """
+    return CrossEncoderReranker(budget_ms=RERANK_LATENCY_BUDGET_MS)
+
+@st.cache_resource
+def get_news_store():
+    """
+    Shared store of web research passages (see news_store.py).
+    """
+    from news_store import NewsStore
+    return NewsStore()
+
+def get_retriever(k=5, backend=None):
+    """
+    Return a retriever with an `invoke(query)` method.
+    backend: "chroma" or "flat"; falls back to Chroma when no flat index exists.
+    """
+    backend = backend or RETRIEVER_BACKEND
+    if backend == "flat":
+        index = get_flat_index()
+        if index is not None:
+            return FlatIndexRetriever(index, get_embedding_function(active_index()[3]), k=k)
+    return get_chroma_db().as_retriever(search_kwargs={"k": k})
 
 def get_llm():
     """
-    Initialize the Groq LLM.
+    Return the chat model for the configured LLM_BACKEND (see llm_backends.py).
     """
-    api_key = st.secrets["GROQ_API_KEY"]
-    llm = ChatGroq(
-        temperature=0.7,
-        model_name="llama-3.1-8b-instant", 
-        groq_api_key=api_key
-    )
-    return llm
+    return get_chat_model()
 
-def get_rag_response(query, role=None, ai_literacy_level=None, generation_mode="chat"):
+def retrieve_documents(query, k=5, backend=None, rerank=None):
     """
-    Perform RAG to get response.
-    generation_mode: "chat" (default) or "roadmap"
+    Retrieve the top-k chunks for a query.
+    With re-ranking, k * RERANK_OVERFETCH candidates are fetched and re-ordered
+    by the cross-encoder (which skips itself if over its latency budget).
     """
-    db = get_chroma_db()
-    llm = get_llm()
-    
-    # 1. Retrieve specific docs
-    retriever = db.as_retriever(search_kwargs={"k": 5})
-    
-    # 2. Hybrid Reasoning / Prompt Engineering
-    template = """
-    You are the "Semiconductor Logistics AI-Upskiller", an expert mentor.
-    
-    Context from Knowledge Base:
-    {context}
-    
-    User Role: {role}
-    AI Literacy Level: {ai_literacy_level}/5
-    Current Mode: {generation_mode}
-    
-    User Query: {question}
-    
-    Instructions:
-    1. Search context for competencies/standards.
-    
-    2. MODE-SPECIFIC RULES (CRITICAL):
-    
-       IF Current Mode is "chat":
-       - **DO NOT** generate a full learning path, curriculum, or 10-module table.
-       - **DO NOT** generate Mermaid charts.
-       - Answer the user's specific question concisely.
-       - If they ask for a full roadmap/plan, provide a brief summary of key topics (bullet points) and **explicitly tell them to use the 'Personalized Roadmap' tab** for the full visual schedule.
-       
-       IF Current Mode is "roadmap":
-       - **FORCE FORMATTING**: Output a valid Markdown table for the Training Path.
-       - **IGNORE** original module numbers. RENUMBER from Module 1 to Module 10.
-       - **STRICT LIMIT**: Exact 10 distinct modules.
-       - **INCLUDE** a Mermaid chart (using graph TD, no parens in labels).
-
-       IF Current Mode is "search":
-       - Incorporate the provided web search results into your answer.
-       - Cite the web sources where appropriate.
-       - Focus on recent trends (2024-2025).
-       
-    3. General QA Rules (for "chat" mode):
-    
-       - Answer directly and professionally.
-       - Use bullet points for list items.
-       - Cite internal knowledge if context is missing.
-    
-    Response:
+    rerank = RERANK_ENABLED if rerank is None else rerank
+    if not rerank:
+        return get_retriever(k=k, backend=backend).invoke(query)
+    candidates = get_retriever(k=k * RERANK_OVERFETCH, backend=backend).invoke(query)
+    return get_reranker().rerank(query, candidates, k)
+
+# 2. Hybrid Reasoning / Prompt Engineering
+# Each mode gets its own prompt with only its rules, compiled into a chain once (see get_chain).
+PROMPT_HEADER = """You are the "Semiconductor Logistics AI-Upskiller", an expert mentor.
+
+Context from Knowledge Base:
+{context}
+
+User Role: {role}
+AI Literacy Level: {ai_literacy_level}/5
+
+User Query: {question}
+
+Instructions:
+"""
+
+MODE_RULES = {
+    "chat": """- Answer the user's question directly and concisely, using the context for competencies and standards. Cite internal knowledge if context is missing.
+- Use bullet points for list items.
+- Do NOT generate a full learning path, module table or Mermaid chart. If they ask for a full roadmap, list the key topics briefly and tell them to use the 'Personalized Roadmap' tab.
+""",
+    "roadmap": """- Output the Training Path as a Markdown table of exactly 10 distinct modules, numbered Module 1 to Module 10 (ignore the source's numbering). Base it on the competencies and standards in the context.
+- Include a Mermaid chart (graph TD, no parentheses in labels).
+""",
+    "search": """- Answer using the knowledge-base context and the web research results above. Cite the web sources.
+- Focus on recent trends (2024-2025).
+- Answer directly; use bullet points for list items.
+""",
+}
+
+MODE_PROMPTS = {mode: PROMPT_HEADER + rules + "\nResponse:\n" for mode, rules in MODE_RULES.items()}
+
+# Completion limits per mode, bound into each compiled chain
+MODE_GENERATION = {
+    "chat": {"max_tokens": 700},
+    "roadmap": {"max_tokens": 2000},
+    "search": {"max_tokens": 900},
+}
+STOP_SEQUENCES = ["\nUser Query:"]  # the model starting a new turn of the template
+
+def mode_prompt(generation_mode):
+    return MODE_PROMPTS.get(generation_mode, MODE_PROMPTS["chat"])
+
+@st.cache_resource
+def get_chain(generation_mode):
     """
-    
-    prompt = ChatPromptTemplate.from_template(template)
-    
-    def format_docs(docs):
-        # Return only the content, no usage of metadata/source filenames
-        return "\n\n".join([d.page_content for d in docs])
-
-    # NEW: Web Search Integration
-    def get_context(query_text):
-        # query_text is the raw user query string passed to the chain
-        
-        # Base RAG context
-        rag_docs = retriever.invoke(query_text)
-        rag_context = format_docs(rag_docs)
-        
-        # Check for web search flag (captured from outer scope)
-        if generation_mode == "search":
-            try:
-                with DDGS() as ddgs:
-                    # Search specifically for recent semiconductor logistics news
-                    search_query = f"latest semiconductor logistics news 2024 2025 {query_text}"
-                    results = list(ddgs.text(search_query, max_results=3))
-                    
-                    web_context = "\n\n=== WEB SEARCH RESULTS (REAL-TIME) ===\n"
-                    for r in results:
-                        web_context += f"Source: {r['title']}\nSnippet: {r['body']}\nLink: {r['href']}\n\n"
-                    
-                    return rag_context + web_context
-            except Exception as e:
-                return rag_context + f"\n[System: Web search failed: {str(e)}]"
-        
-        return rag_context
-
-    chain = (
-        {
-         "context": get_context, # Dynamic context fetching
-         "question": RunnablePassthrough(), 
-         "role": lambda x: role, 
-         "ai_literacy_level": lambda x: ai_literacy_level,
-         "generation_mode": lambda x: generation_mode
-        }
-        | prompt
-        | llm
-        | StrOutputParser()
-    )
-    
-    return chain.stream(query)
+    Compiled prompt | model | parser chain for a mode, built once per process.
+    Expects {"context", "question", "role", "ai_literacy_level"}.
+    """
+    settings = MODE_GENERATION.get(generation_mode, MODE_GENERATION["chat"])
+    prompt = ChatPromptTemplate.from_template(mode_prompt(generation_mode))
+    llm = get_llm().bind(max_tokens=settings["max_tokens"], stop=STOP_SEQUENCES)
+    return prompt | llm | StrOutputParser()
+
+def build_context(query_text, generation_mode="chat", retriever_backend=None, rerank=None):
+    """
+    Knowledge-base context for a query, plus live web results in "search" mode.
+    Depth and size follow the mode's budget in MODE_BUDGETS.
+    Split out of get_rag_response so it can be computed ahead of time (see prefetch.py).
+    """
+    budget = MODE_BUDGETS.get(generation_mode, MODE_BUDGETS["chat"])
+    # Whatever the query and template leave of the prompt budget, capped by the context budget
+    context_tokens = min(budget["context_tokens"],
+                         budget["prompt_tokens"] - estimate_tokens(mode_prompt(generation_mode)) - estimate_tokens(query_text))
+
+    # Base RAG context
+    rag_docs = retrieve_documents(query_text, k=choose_k(query_text, generation_mode), backend=retriever_backend, rerank=rerank)
+    rag_context = pack_context(rag_docs, max(context_tokens, 0))
+
+    if generation_mode == "search":
+        # Multi-query web research (or fresh stored findings) fills what is left of the prompt budget
+        from research import research
+        web_tokens = (budget["prompt_tokens"] - estimate_tokens(mode_prompt(generation_mode)) - estimate_tokens(query_text)
+                      - estimate_tokens(rag_context))
+        try:
+            return rag_context + research(query_text, max_tokens=max(web_tokens, 0), store=get_news_store())["context"]
+        except Exception as e:
+            return rag_context + f"\n[System: Web search failed: {str(e)}]"
+
+    return rag_context
+
+def get_rag_response(query, role=None, ai_literacy_level=None, generation_mode="chat", retriever_backend=None, rerank=None, context=None, session_id=None):
+    """
+    Perform RAG to get response.
+    generation_mode: "chat" (default), "roadmap" or "search"
+    retriever_backend: "chroma" or "flat"; defaults to RETRIEVER_BACKEND
+    rerank: re-rank retrieved chunks with a cross-encoder; defaults to RERANK_ENABLED
+    context: precomputed build_context() output; retrieved on demand when None
+    session_id: attributes the call's token usage to a session (see get_token_usage)
+    """
+    chain = get_chain(generation_mode if generation_mode in MODE_PROMPTS else "chat")
+
+    def accounted_stream():
+        completion = []
+        used_context = ""
+        budget = MODE_BUDGETS.get(generation_mode, MODE_BUDGETS["chat"])
+        # Reserve the completion the mode's chain may actually generate
+        max_tokens = MODE_GENERATION.get(generation_mode, MODE_GENERATION["chat"])["max_tokens"]
+        llm_rate_limiter.acquire(budget["prompt_tokens"] + max_tokens)
+        try:
+            # Context is fetched when streaming starts, unless it was prefetched
+            used_context = context if context is not None else build_context(query, generation_mode, retriever_backend, rerank)
+            inputs = {"context": used_context, "question": query, "role": role, "ai_literacy_level": ai_literacy_level}
+            for chunk in chain.stream(inputs):
+                completion.append(chunk)
+                yield chunk
+        finally:
+            # Streamed chunks carry no usage counts, so both sides are estimated
+            prompt_text = mode_prompt(generation_mode) + used_context + query + str(role)
+            token_accountant.record(generation_mode, estimate_tokens(prompt_text),
+                                    estimate_tokens("".join(completion)), session_id)
+
+    return accounted_stream()
 
 import json
 import re
@@ -145,7 +415,6 @@ def generate_quiz_questions(role, level):
     Generate 5 multiple-choice questions to test the AI literacy and Logistics knowledge for a {role} at level {level}/10.
     Returns a list of dictionaries.
     """
-    llm = get_llm()
     prompt = f"""
     Generate 5 multiple-choice questions specifically about **AI applications, tools, and digital transformation skills** for a {role} at AI literacy level {level}/5.
     
@@ -156,16 +425,15 @@ def generate_quiz_questions(role, level):
     - "question" (string)
     - "options" (list of 4 strings)
     - "correct_answer" (integer index 0-3)
+    - "competency" (the competency it tests, exactly one of: {", ".join(COMPETENCIES)})
     
     Do not include any markdown formatting like ```json or ```. Just the raw JSON array.
     """
-    response = llm.invoke(prompt)
+    response = invoke_llm(prompt, "quiz")
     content = response.content
     
     # Clean up common markdown wrapping
-    content = re.sub(r'```json\s*', '', content)
-    content = re.sub(r'```\s*', '', content)
-    content = content.strip()
+    content = strip_code_fences(content)
     
     try:
         questions = json.loads(content)
@@ -180,7 +448,6 @@ def generate_scenario(role, level):
     Generates a 2-turn role-play scenario.
     Returns a dictionary with 'scenario_text' and 'options' (optional) or just text.
     """
-    llm = get_llm()
     prompt = f"""
     Create a realistic "Crisis Scenario" for a {role} in a semiconductor fab supply chain.
     The user has AI Literacy Level {level}/5.
@@ -191,7 +458,7 @@ def generate_scenario(role, level):
     
     Do not include markdown code blocks.
     """
-    response = llm.invoke(prompt)
+    response = invoke_llm(prompt, "scenario")
     content = response.content
     
     # Robust JSON extraction
@@ -204,11 +471,46 @@ def generate_scenario(role, level):
     except:
         return {"scenario": "System Error: Could not generate scenario.", "question": "Please try again."}
 
+def generate_scenario_batch(role, level, count=5, competencies=COMPETENCIES):
+    """
+    Generate several distinct crisis scenarios in one LLM call (used to fill the scenario library).
+    Returns a list of {"scenario", "question", "competency"} dicts; malformed items are dropped.
+    """
+    prompt = f"""
+    Create {count} different realistic "Crisis Scenarios" for a {role} in a semiconductor fab supply chain.
+    The user has AI Literacy Level {level}/5.
+    Spread them across these competencies: {", ".join(competencies)}.
+    
+    Output strictly a JSON array of {count} objects, each with:
+    1. "scenario": A clear paragraph describing the emergency (e.g., machine down, logistics delay).
+    2. "question": A challenging question asking the user what AI tool or strategy they would use.
+    3. "competency": The competency it tests, exactly as written in the list above.
+    
+    Do not include markdown code blocks.
+    """
+    content = invoke_llm(prompt, "scenario").content
+    try:
+        json_match = re.search(r'(\[.*\])', content, re.DOTALL)
+        items = json.loads(json_match.group(1) if json_match else strip_code_fences(content))
+    except json.JSONDecodeError:
+        return []
+    if not isinstance(items, list):
+        return []
+    scenarios = []
+    for item in items:
+        if isinstance(item, dict) and item.get("scenario") and item.get("question"):
+            competency = item.get("competency")
+            scenarios.append({
+                "scenario": str(item["scenario"]).strip(),
+                "question": str(item["question"]).strip(),
+                "competency": competency if competency in competencies else None,
+            })
+    return scenarios
+
 def evaluate_scenario(scenario_data, user_response):
     """
     Evaluates the user's text response to the scenario.
     """
-    llm = get_llm()
     prompt = f"""
     Scenario: {scenario_data['scenario']}
     Question: {scenario_data['question']}
@@ -219,7 +521,7 @@ def evaluate_scenario(scenario_data, user_response):
     2. Explain WHY based on semiconductor industry standards (JIT, predictive maintenance, etc.).
     3. Keep it brief (3-4 sentences).
     """
-    response = llm.invoke(prompt)
+    response = invoke_llm(prompt, "evaluate")
     return response.content
 
 # NEW: Flashcards
@@ -227,13 +529,12 @@ def generate_flashcards(topic="Semiconductor Logistics"):
     """
     Generates 5 key terms and definitions.
     """
-    llm = get_llm()
     prompt = f"""
     Extract 5 advanced acronyms or key terms related to {topic} and AI.
     Return strictly a JSON array of objects with keys: "term", "definition".
     No markdown formatting.
     """
-    response = llm.invoke(prompt)
+    response = invoke_llm(prompt, "flashcards")
     content = response.content
     
     try:
@@ -242,63 +543,40 @@ def generate_flashcards(topic="Semiconductor Logistics"):
         if json_match:
             return json.loads(json_match.group(1))
         # Fallback cleanup
-        content = content.replace('```json', '').replace('```', '').strip()
+        content = strip_code_fences(content)
         return json.loads(content)
     except:
         return []
 
-# from langchain_community.tools import DuckDuckGoSearchResults # Removed to avoid wrapper issues
-from duckduckgo_search import DDGS
-
-# ... (imports remain the same in the file content, just ensuring I don't break them)
-
 def search_learning_resources(role, topic="Semiconductor Logistics"):
     """
     Return curated learning resources tailored to each role.
+    Links marked dead by the last `validate_links.py` run are hidden;
+    no network calls are made here.
     """
-    
-    # Curated resources by role
-    RESOURCES = {
-        "Logistics Manager": [
-            ("Coursera: Supply Chain Management", "https://www.coursera.org/search?query=supply%20chain%20management"),
-            ("edX: MIT Supply Chain Courses", "https://www.edx.org/school/mitx"),
-            ("ASCM: Certification Programs", "https://www.ascm.org/learning-development/"),
-            ("IEEE: Semiconductor Resources", "https://www.ieee.org/"),
-            ("LinkedIn Learning: Logistics", "https://www.linkedin.com/learning/topics/logistics-and-supply-chain-management"),
-        ],
-        "Supply Chain Analyst": [
-            ("Coursera: Supply Chain Analytics", "https://www.coursera.org/search?query=supply%20chain%20analytics"),
-            ("MIT OpenCourseWare", "https://ocw.mit.edu/search/?q=supply+chain"),
-            ("Gartner: Supply Chain", "https://www.gartner.com/en/supply-chain"),
-            ("Udemy: Data Analytics", "https://www.udemy.com/courses/business/Data-and-Analytics/"),
-            ("ASCM: CPIM & Certifications", "https://www.ascm.org/learning-development/"),
-        ],
-        "Warehouse Supervisor": [
-            ("LinkedIn Learning: Warehouse Mgmt", "https://www.linkedin.com/learning/topics/warehouse-management"),
-            ("Coursera: Warehouse Operations", "https://www.coursera.org/search?query=warehouse%20management"),
-            ("OSHA: Warehousing Topic", "https://www.osha.gov/warehousing"),
-            ("WERC: Warehouse Council", "https://werc.org/"),
-            ("ASCM: Inventory Learning", "https://www.ascm.org/learning-development/"),
-        ],
-        "Procurement Specialist": [
-            ("Coursera: Procurement", "https://www.coursera.org/search?query=procurement"),
-            ("CIPS: Procurement Qualifications", "https://www.cips.org/"),
-            ("SIA: Semiconductor Industry", "https://www.semiconductors.org/"),
-            ("LinkedIn Learning: Sourcing", "https://www.linkedin.com/learning/topics/procurement"),
-            ("Harvard Online: Business", "https://online.hbs.edu/subjects/business-management/"),
-        ]
-    }
-    
-    # Get resources for role, default to Logistics Manager if not found
-    resources = RESOURCES.get(role, RESOURCES["Logistics Manager"])
+    resources = get_resources(role)
+    if not resources:
+        return "No verified resources are currently available for this role."
     items = [f"- [{title}]({link})" for title, link in resources]
     return "\n".join(items)
 
-def generate_skill_web(role):
+# Validated skill-web diagrams, keyed by role
+SKILL_WEB_ATTEMPTS = 2
+_skill_web_cache = {}
+_skill_web_lock = threading.Lock()
+
+def generate_skill_web(role, refresh=False):
     """
     Generates a Mermaid.js graph string acting as a skill map.
+    Diagrams are validated (and repaired if needed) before being cached per role,
+    so each role costs one LLM call. Pass refresh=True to regenerate.
+    Returns None if no valid diagram could be produced.
     """
-    llm = get_llm()
+    if not refresh:
+        with _skill_web_lock:
+            if role in _skill_web_cache:
+                return _skill_web_cache[role]
+
     prompt = f"""
     Create a "Skill Web" for a {role} in Semiconductor Logistics using Mermaid.js syntax.
     
@@ -314,14 +592,12 @@ def generate_skill_web(role):
     - Labels: Keep labels short (1-2 words).
     - IDs: Use simple alphanumerics (A, B, C...).
     """
-    response = llm.invoke(prompt)
-    content = response.content
-    
-    # Extract Mermaid code block if present
-    mermaid_match = re.search(r"```mermaid\n(.*?)\n```", content, re.DOTALL)
-    if mermaid_match:
-        return mermaid_match.group(1).strip()
-    
-    # Fallback: Strip all fences
-    content = content.replace('```mermaid', '').replace('```', '').strip()
-    return content
+    for _ in range(SKILL_WEB_ATTEMPTS):
+        content = invoke_llm(prompt, "skill_web").content
+        mermaid_code, _ = extract_mermaid(content)
+        diagram = prepare_mermaid(mermaid_code or strip_code_fences(content))
+        if diagram:
+            with _skill_web_lock:
+                _skill_web_cache[role] = diagram
+            return diagram
+    return None
@@ -0,0 +1,97 @@
+import os
+import json
+import contextvars
+import requests
+
+from utils import build_roadmap_query
+
+# Configuration
+ENGINE_SERVICE_URL = os.environ.get("ENGINE_SERVICE_URL", "http://127.0.0.1:8765").rstrip("/")
+REQUEST_TIMEOUT = float(os.environ.get("ENGINE_SERVICE_TIMEOUT", 120))
+
+# One pooled session per process, reused by every call
+_session = requests.Session()
+
+_usage_session = contextvars.ContextVar("usage_session", default=None)
+
+class EngineServiceError(RuntimeError):
+    pass
+
+def set_usage_session(session_id):
+    """
+    Attribute subsequent calls in this context to session_id (sent as X-Session-Id).
+    """
+    _usage_session.set(session_id)
+
+def _headers():
+    session_id = _usage_session.get()
+    return {"X-Session-Id": session_id} if session_id else {}
+
+def _post(path, payload):
+    response = _session.post(f"{ENGINE_SERVICE_URL}{path}", json=payload, headers=_headers(), timeout=REQUEST_TIMEOUT)
+    if response.status_code != 200:
+        raise EngineServiceError(f"{path} failed ({response.status_code}): {response.text[:200]}")
+    return response.json()
+
+def iter_sse(lines):
+    """
+    Parse server-sent event lines into (event, data) pairs.
+    """
+    event, data = "message", []
+    for line in lines:
+        if line is None:
+            continue
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+    if data:
+        yield event, json.loads("\n".join(data))
+
+def get_rag_response(query, role=None, ai_literacy_level=None, generation_mode="chat", session_id=None):
+    """
+    Same contract as engine.get_rag_response: yields answer tokens as they arrive.
+    """
+    payload = {"query": query, "role": role, "ai_literacy_level": ai_literacy_level,
+               "generation_mode": generation_mode, "session_id": session_id or _usage_session.get()}
+    with _session.post(f"{ENGINE_SERVICE_URL}/rag/stream", json=payload,
+                       stream=True, timeout=REQUEST_TIMEOUT) as response:
+        if response.status_code != 200:
+            raise EngineServiceError(f"/rag/stream failed ({response.status_code}): {response.text[:200]}")
+        for event, data in iter_sse(response.iter_lines(decode_unicode=True)):
+            if event == "error":
+                raise EngineServiceError(data.get("error", "Unknown engine error"))
+            if event == "done":
+                return
+            yield data.get("token", "")
+
+def generate_quiz_questions(role, level):
+    return _post("/quiz", {"role": role, "level": level})
+
+def generate_scenario(role, level):
+    return _post("/scenario", {"role": role, "level": level})
+
+def evaluate_scenario(scenario, user_response):
+    return _post("/scenario/evaluate", {"scenario": scenario, "response": user_response})["feedback"]
+
+def generate_flashcards(topic="Semiconductor Logistics"):
+    return _post("/flashcards", {"topic": topic})
+
+def generate_skill_web(role, refresh=False):
+    return _post("/skill-web", {"role": role, "refresh": refresh})["mermaid"]
+
+def search_learning_resources(role, topic="Semiconductor Logistics"):
+    response = _session.get(f"{ENGINE_SERVICE_URL}/resources", params={"role": role}, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()["markdown"]
+
+def get_token_usage(session_id=None):
+    params = {"session_id": session_id} if session_id is not None else {}
+    response = _session.get(f"{ENGINE_SERVICE_URL}/usage", params=params, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
@@ -0,0 +1,112 @@
+import os
+import gzip
+import json
+import hashlib
+from langchain_core.documents import Document
+
+# Configuration
+EXTRACT_CACHE_DIR = ".extract_cache"
+# "auto" picks the fastest installed backend: pymupdf, then pdfium, then pypdf
+PDF_EXTRACT_BACKEND = os.environ.get("PDF_EXTRACT_BACKEND", "auto")
+CACHE_FORMAT_VERSION = 1
+
+def _extract_pypdf(path):
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return [page.extract_text() or "" for page in reader.pages]
+
+def _extract_pymupdf(path):
+    try:
+        import pymupdf
+    except ImportError:
+        import fitz as pymupdf  # PyMuPDF < 1.24
+    with pymupdf.open(path) as doc:
+        return [page.get_text() for page in doc]
+
+def _extract_pdfium(path):
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(path)
+    try:
+        pages = []
+        for page in pdf:
+            textpage = page.get_textpage()
+            pages.append(textpage.get_text_range())
+            textpage.close()
+            page.close()
+        return pages
+    finally:
+        pdf.close()
+
+# name -> (modules to probe, extractor)
+BACKENDS = {
+    "pymupdf": (("pymupdf", "fitz"), _extract_pymupdf),
+    "pdfium": (("pypdfium2",), _extract_pdfium),
+    "pypdf": (("pypdf",), _extract_pypdf),
+}
+
+def available_backends():
+    """
+    Names of the installed backends, fastest first.
+    """
+    import importlib.util
+    return [name for name, (modules, _) in BACKENDS.items()
+            if any(importlib.util.find_spec(m) for m in modules)]
+
+def resolve_backend(backend=None):
+    backend = backend or PDF_EXTRACT_BACKEND
+    if backend == "auto":
+        installed = available_backends()
+        if not installed:
+            raise ImportError("No PDF backend installed (pymupdf, pypdfium2 or pypdf).")
+        return installed[0]
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+    return backend
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    SHA-256 of the file contents, so renamed or moved files still hit the cache.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _cache_path(digest, backend, cache_dir):
+    return os.path.join(cache_dir, f"{digest}.{backend}.v{CACHE_FORMAT_VERSION}.json.gz")
+
+def extract_pages(path, backend=None, use_cache=True, cache_dir=EXTRACT_CACHE_DIR):
+    """
+    Return the text of each page of a PDF.
+    Results are cached as gzip-compressed JSON keyed by file hash and backend.
+    """
+    backend = resolve_backend(backend)
+    cache_file = None
+    if use_cache:
+        cache_file = _cache_path(file_hash(path), backend, cache_dir)
+        try:
+            with gzip.open(cache_file, "rt", encoding="utf-8") as f:
+                return json.load(f)["pages"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    pages = BACKENDS[backend][1](path)
+
+    if cache_file:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = f"{cache_file}.tmp"
+        with gzip.open(tmp_file, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump({"backend": backend, "source": os.path.basename(path), "pages": pages}, f)
+        os.replace(tmp_file, cache_file)
+    return pages
+
+def load_pdf_documents(path, backend=None, use_cache=True):
+    """
+    One Document per page, with the same `source`/`page` metadata PyPDFLoader produces.
+    """
+    pages = extract_pages(path, backend, use_cache)
+    return [
+        Document(page_content=text, metadata={"source": path, "page": i, "total_pages": len(pages)})
+        for i, text in enumerate(pages)
+    ]
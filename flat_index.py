@@ -0,0 +1,353 @@
+import os
+import json
+import shutil
+import numpy as np
+from langchain_core.documents import Document
+
+# Configuration
+FLAT_INDEX_PATH = "flat_index"
+VECTORS_FILE = "vectors.f32"
+MANIFEST_FILE = "manifest.json"
+IDS_FILE = "ids.json"
+METADATA_FILE = "metadata.json"
+DOCUMENTS_FILE = "documents.json"
+INT8_CODES_FILE = "codes.i8"
+INT8_PARAMS_FILE = "codes.i8.params.f32"
+BINARY_CODES_FILE = "codes.bin"
+BINARY_CENTER_FILE = "codes.bin.center.f32"
+
+# "none", "int8" (4x smaller scan matrix) or "binary" (32x smaller)
+QUANTIZATION_MODES = ("none", "int8", "binary")
+# Candidates kept from the quantized scan for re-ranking, as a multiple of k
+RERANK_OVERSAMPLE = {"int8": 4, "binary": 20}
+SCAN_BLOCK_ROWS = 65536
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def quantize_int8(vectors):
+    """
+    Per-dimension scalar quantization to int8.
+    Returns (codes, scale, offset) with vectors ~= (codes + 128) * scale + offset.
+    """
+    offset = vectors.min(axis=0)
+    scale = (vectors.max(axis=0) - offset) / 255.0
+    scale[scale == 0] = 1.0
+    codes = np.clip(np.round((vectors - offset) / scale) - 128, -128, 127).astype(np.int8)
+    return codes, scale.astype(np.float32), offset.astype(np.float32)
+
+def dequantize_int8(codes, scale, offset):
+    return (codes.astype(np.float32) + 128.0) * scale + offset
+
+def quantize_binary(vectors):
+    """
+    One sign bit per dimension of the mean-centered vectors, packed 8 per byte.
+    Embeddings are not zero-mean, so centering keeps the bits informative.
+    Returns (packed_codes, center).
+    """
+    center = vectors.mean(axis=0).astype(np.float32)
+    return np.packbits(vectors - center > 0, axis=1), center
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(values):
+        return _POPCOUNT_TABLE[values]
+
+def export_flat_index(db, path=FLAT_INDEX_PATH, model_name="all-MiniLM-L6-v2",
+                      quantization="none", keep_float32=True):
+    """
+    Dump a Chroma collection's vectors, IDs, metadata and text into `path`:
+    a raw row-major float32 matrix (memory-mapped on load) plus JSON sidecars.
+    Vectors are L2-normalized so a dot product is cosine similarity.
+    With quantization="int8"/"binary" compact scan codes are written as well;
+    keep_float32=False drops the float32 matrix and re-ranks with int8 codes instead.
+    The new export is written next to the old one and swapped in at the end.
+    """
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"quantization must be one of {QUANTIZATION_MODES}")
+    if quantization == "none":
+        keep_float32 = True
+    data = db.get(include=["embeddings", "metadatas", "documents"])
+    vectors = np.ascontiguousarray(_normalize(np.asarray(data["embeddings"], dtype=np.float32)))
+    count, dim = vectors.shape if vectors.size else (0, 0)
+
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    if count and keep_float32:
+        matrix = np.memmap(os.path.join(tmp_path, VECTORS_FILE), dtype=np.float32, mode="w+", shape=(count, dim))
+        matrix[:] = vectors
+        matrix.flush()
+        del matrix
+
+    if count and (quantization == "int8" or not keep_float32):
+        codes, scale, offset = quantize_int8(vectors)
+        codes.tofile(os.path.join(tmp_path, INT8_CODES_FILE))
+        np.stack([scale, offset]).tofile(os.path.join(tmp_path, INT8_PARAMS_FILE))
+    if count and quantization == "binary":
+        packed, center = quantize_binary(vectors)
+        packed.tofile(os.path.join(tmp_path, BINARY_CODES_FILE))
+        center.tofile(os.path.join(tmp_path, BINARY_CENTER_FILE))
+
+    sidecars = {
+        IDS_FILE: data["ids"],
+        METADATA_FILE: [m or {} for m in data["metadatas"]],
+        DOCUMENTS_FILE: data["documents"],
+        MANIFEST_FILE: {
+            "count": count, "dim": dim, "dtype": "float32", "normalized": True, "model": model_name,
+            "quantization": quantization, "float32": keep_float32,
+        },
+    }
+    for name, payload in sidecars.items():
+        with open(os.path.join(tmp_path, name), "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    print(f"Exported {count} vectors ({dim} dims, quantization={quantization}) to {path}/")
+    return count
+
+class FlatIndex:
+    """
+    Brute-force cosine search over a memory-mapped float32 matrix.
+    At a few thousand chunks one matrix-vector product beats an ANN index.
+    With quantized codes, the scan runs over int8 or packed sign bits held in
+    memory and only the top candidates are re-scored at full precision.
+    """
+
+    def __init__(self, vectors, ids, metadatas=None, documents=None, manifest=None,
+                 quantization="none", int8=None, binary=None):
+        self.vectors = vectors
+        self.ids = list(ids)
+        self.metadatas = metadatas if metadatas is not None else [{} for _ in self.ids]
+        self.documents = documents if documents is not None else ["" for _ in self.ids]
+        self.manifest = manifest or {"count": len(self.ids), "dim": vectors.shape[1] if vectors is not None and vectors.ndim == 2 else 0}
+        self.quantization = quantization
+        self.int8 = int8          # (codes, scale, offset) or None
+        self.binary = binary      # (packed sign bits, center) or None
+        self._columns = {}
+
+    @classmethod
+    def from_arrays(cls, vectors, ids, metadatas=None, documents=None, quantization="none"):
+        """
+        Build an in-memory index (normalizes a copy of `vectors`).
+        """
+        vectors = np.ascontiguousarray(_normalize(np.asarray(vectors, dtype=np.float32)))
+        int8 = quantize_int8(vectors) if quantization == "int8" else None
+        binary = quantize_binary(vectors) if quantization == "binary" else None
+        return cls(vectors, ids, metadatas, documents, quantization=quantization, int8=int8, binary=binary)
+
+    @classmethod
+    def load(cls, path=FLAT_INDEX_PATH):
+        """
+        Open an exported index. The float32 matrix is memory-mapped, not read;
+        quantized scan codes are loaded into memory.
+        """
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        with open(os.path.join(path, IDS_FILE), encoding="utf-8") as f:
+            ids = json.load(f)
+        with open(os.path.join(path, METADATA_FILE), encoding="utf-8") as f:
+            metadatas = json.load(f)
+        with open(os.path.join(path, DOCUMENTS_FILE), encoding="utf-8") as f:
+            documents = json.load(f)
+
+        count, dim = manifest["count"], manifest["dim"]
+        quantization = manifest.get("quantization", "none")
+        vectors = int8 = binary = None
+        if not count:
+            vectors = np.zeros((0, dim), dtype=np.float32)
+        elif manifest.get("float32", True):
+            vectors = np.memmap(os.path.join(path, VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, dim))
+
+        int8_path = os.path.join(path, INT8_CODES_FILE)
+        if count and os.path.exists(int8_path):
+            codes = np.fromfile(int8_path, dtype=np.int8).reshape(count, dim)
+            scale, offset = np.fromfile(os.path.join(path, INT8_PARAMS_FILE), dtype=np.float32).reshape(2, dim)
+            int8 = (codes, scale, offset)
+        if count and quantization == "binary":
+            packed = np.fromfile(os.path.join(path, BINARY_CODES_FILE), dtype=np.uint8).reshape(count, -1)
+            binary = (packed, np.fromfile(os.path.join(path, BINARY_CENTER_FILE), dtype=np.float32))
+        return cls(vectors, ids, metadatas, documents, manifest, quantization, int8, binary)
+
+    def memory_footprint(self):
+        """
+        Bytes held in RAM for scanning (the memory-mapped float32 matrix excluded).
+        """
+        if self.quantization == "binary":
+            return self.binary[0].nbytes
+        if self.quantization == "int8":
+            return self.int8[0].nbytes
+        return self.vectors.nbytes
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _column(self, key):
+        # One object array per metadata key, built on first use
+        if key not in self._columns:
+            self._columns[key] = np.array([m.get(key) for m in self.metadatas], dtype=object)
+        return self._columns[key]
+
+    def mask(self, where):
+        """
+        Boolean row mask for a metadata filter such as
+        {"folder_name": "Job Descriptions"} or {"source_file": ["a.pdf", "b.pdf"]}.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for key, value in (where or {}).items():
+            column = self._column(key)
+            if isinstance(value, (list, tuple, set)):
+                mask &= np.isin(column, list(value))
+            else:
+                mask &= column == value
+        return mask
+
+    def _exact_scores(self, query, rows=None):
+        # Full-precision scores; int8 dequantization when float32 was not exported
+        if self.vectors is not None:
+            matrix = self.vectors if rows is None else self.vectors[np.sort(rows)]
+            scores = matrix @ query
+        else:
+            codes, scale, offset = self.int8
+            codes = codes if rows is None else codes[np.sort(rows)]
+            scores = dequantize_int8(codes, scale, offset) @ query
+        if rows is None:
+            return scores
+        # Map back from sorted row order
+        order = np.argsort(np.argsort(rows))
+        return scores[order]
+
+    def _scan_scores(self, query):
+        """
+        Approximate scores from the quantized codes, computed block-wise so
+        the int8->float32 conversion never materializes the whole matrix.
+        """
+        if self.quantization == "binary":
+            packed, center = self.binary
+            packed_query = np.packbits(query - center > 0)
+            scores = np.empty(len(self), dtype=np.float32)
+            for start in range(0, len(self), SCAN_BLOCK_ROWS):
+                block = packed[start:start + SCAN_BLOCK_ROWS]
+                hamming = _popcount(np.bitwise_xor(block, packed_query)).sum(axis=1, dtype=np.int32)
+                scores[start:start + len(block)] = -hamming
+            return scores
+
+        codes, scale, _ = self.int8
+        # (codes + 128) * scale + offset: the +128 and offset terms are the same for every row
+        weighted_query = query * scale
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), SCAN_BLOCK_ROWS):
+            block = codes[start:start + SCAN_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ weighted_query
+        return scores
+
+    @staticmethod
+    def _top_k(scores, k):
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def search(self, query_vector, k=5, where=None, oversample=None):
+        """
+        Return [(row, score)] for the top-k rows, best first.
+        Quantized indexes scan the codes, keep k * oversample candidates and
+        re-rank those with full-precision vectors.
+        """
+        if not len(self):
+            return []
+        query = _normalize(np.asarray(query_vector, dtype=np.float32))
+        quantized = self.quantization != "none"
+        scores = self._scan_scores(query) if quantized else self._exact_scores(query)
+        if where:
+            scores = np.where(self.mask(where), scores, -np.inf)
+
+        if not quantized:
+            top = self._top_k(scores, k)
+            return [(int(i), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+        oversample = oversample or RERANK_OVERSAMPLE[self.quantization]
+        candidates = self._top_k(scores, k * oversample)
+        candidates = candidates[np.isfinite(scores[candidates])]
+        if not len(candidates):
+            return []
+        exact = self._exact_scores(query, candidates)
+        best = np.argsort(-exact)[:k]
+        return [(int(candidates[i]), float(exact[i])) for i in best]
+
+    def document(self, row, score=None):
+        metadata = dict(self.metadatas[row])
+        if score is not None:
+            metadata["score"] = score
+        return Document(page_content=self.documents[row], metadata=metadata, id=self.ids[row])
+
+class FlatIndexRetriever:
+    """
+    Drop-in for `db.as_retriever()` in the RAG chain: `invoke(query)` returns Documents.
+    """
+
+    def __init__(self, index, embedding_function, k=5, where=None):
+        self.index = index
+        self.embedding_function = embedding_function
+        self.k = k
+        self.where = where
+
+    def invoke(self, query, **kwargs):
+        query_vector = self.embedding_function.embed_query(query)
+        return [self.index.document(row, score) for row, score in self.index.search(query_vector, self.k, self.where)]
+
+def export_to_new_build(quantization="none", keep_float32=True):
+    """
+    Copy the active index build into a new version with a freshly exported flat index,
+    record the quantization in its manifest and activate it. Active builds are never
+    modified, so readers keep a consistent index until the pointer swaps.
+    Returns the new version name.
+    """
+    import index_versions
+    from langchain_chroma import Chroma
+    from engine import get_embedding_function
+
+    base = index_versions.current_version()
+    manifest = index_versions.read_manifest(base)
+    base_path = index_versions.version_path(base)
+    version, build_path = index_versions.new_version(manifest.get("corpus_hash") or index_versions.corpus_hash())
+    chroma_path = os.path.join(build_path, index_versions.CHROMA_DIR)
+    shutil.copytree(os.path.join(base_path, index_versions.CHROMA_DIR), chroma_path)
+    if os.path.exists(os.path.join(base_path, index_versions.DEDUP_FILE)):
+        shutil.copy2(os.path.join(base_path, index_versions.DEDUP_FILE), build_path)
+
+    model_name = manifest.get("embedding_model", "all-MiniLM-L6-v2")
+    db = Chroma(persist_directory=chroma_path, embedding_function=get_embedding_function(model_name))
+    export_flat_index(db, os.path.join(build_path, index_versions.FLAT_DIR), model_name=model_name,
+                      quantization=quantization, keep_float32=keep_float32)
+    index_versions.write_manifest(build_path, **dict(manifest, version=version, parent=base,
+                                                     flat_quantization=quantization))
+    index_versions.activate(version)
+    return version
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Export the Chroma collection to a flat NumPy index.")
+    parser.add_argument("command", choices=["export"])
+    parser.add_argument("--quantization", choices=QUANTIZATION_MODES, default="none")
+    parser.add_argument("--no-float32", action="store_true", help="Do not keep full-precision vectors (re-rank with int8)")
+    args = parser.parse_args()
+
+    from engine import get_chroma_db, active_index
+    version, _, path, model_name = active_index()
+    if version:
+        version = export_to_new_build(args.quantization, keep_float32=not args.no_float32)
+        print(f"Activated index version {version}")
+        return
+    # No versioned build yet: re-export the legacy flat_index/ next to chroma_db/
+    export_flat_index(get_chroma_db(), path, model_name=model_name, quantization=args.quantization,
+                      keep_float32=not args.no_float32)
+
+if __name__ == "__main__":
+    main()
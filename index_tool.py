@@ -0,0 +1,218 @@
+import os
+import time
+import shutil
+import hashlib
+import argparse
+from collections import Counter
+
+import numpy as np
+
+import index_versions
+from dedup import near_duplicate_clusters, NEAR_DUPLICATE_THRESHOLD
+from bench_retrieval import BENCH_QUERIES, time_calls, summarize
+
+# Configuration
+COLLECTION_NAME = "langchain"  # langchain_chroma's default collection, used by ingest.py
+WRITE_BATCH = 5000
+LATENCY_REPEAT = 5
+TOP_K = 5
+
+def load_collection(db):
+    """
+    Every record of a Chroma collection: ids, embeddings, metadatas, documents.
+    """
+    data = db.get(include=["embeddings", "metadatas", "documents"])
+    data["metadatas"] = [m or {} for m in data["metadatas"]]
+    return data
+
+def _content_key(text):
+    return hashlib.sha1(" ".join(text.split()).lower().encode("utf-8")).hexdigest()
+
+def exact_duplicate_clusters(documents):
+    """
+    Clusters (index lists, first kept) of chunks whose whitespace/case-normalized text is identical.
+    """
+    groups = {}
+    for i, text in enumerate(documents):
+        groups.setdefault(_content_key(text), []).append(i)
+    return [g for g in groups.values() if len(g) > 1]
+
+def find_orphans(metadatas):
+    """
+    Indexes of chunks whose source file no longer exists on disk.
+    """
+    exists = {}
+    orphans = []
+    for i, meta in enumerate(metadatas):
+        source = meta.get("source")
+        if not source:
+            continue
+        if source not in exists:
+            exists[source] = os.path.exists(source)
+        if not exists[source]:
+            orphans.append(i)
+    return orphans
+
+def health_report(data, near_threshold=NEAR_DUPLICATE_THRESHOLD):
+    """
+    Size, per-file counts, duplicate clusters and orphans of a loaded collection.
+    """
+    documents, metadatas = data["documents"], data["metadatas"]
+    exact = exact_duplicate_clusters(documents)
+    exact_dropped = {i for cluster in exact for i in cluster[1:]}
+    # Near-duplicates are searched among the chunks exact dedup keeps
+    remaining = [i for i in range(len(documents)) if i not in exact_dropped]
+    near = [[remaining[j] for j in cluster]
+            for cluster in near_duplicate_clusters([documents[i] for i in remaining], near_threshold)]
+    return {
+        "chunks": len(documents),
+        "per_source": Counter(m.get("source_file") or os.path.basename(m.get("source", "")) or "?" for m in metadatas),
+        "exact_clusters": exact,
+        "near_clusters": near,
+        "orphans": find_orphans(metadatas),
+    }
+
+def rows_to_drop(report, near=True, orphans=True):
+    drop = {i for cluster in report["exact_clusters"] for i in cluster[1:]}
+    if near:
+        drop |= {i for cluster in report["near_clusters"] for i in cluster[1:]}
+    if orphans:
+        drop |= set(report["orphans"])
+    return drop
+
+def measure_latency(db, query_vectors, k=TOP_K, repeat=LATENCY_REPEAT):
+    """
+    Query latencies (ms) and the mean number of repeated passages in each top-k.
+    """
+    latencies = time_calls(lambda v: db.similarity_search_by_vector(v, k=k), [(v,) for v in query_vectors], repeat)
+    repeats = []
+    for vector in query_vectors:
+        docs = db.similarity_search_by_vector(vector, k=k)
+        repeats.append(len(docs) - len({_content_key(d.page_content) for d in docs}))
+    return latencies, float(np.mean(repeats)) if repeats else 0.0
+
+def compact_in_place(db, ids):
+    """
+    Delete the given chunk IDs from the collection.
+    Only for the legacy unversioned chroma_db/: versioned builds are immutable once active.
+    """
+    for start in range(0, len(ids), WRITE_BATCH):
+        db.delete(ids=ids[start:start + WRITE_BATCH])
+
+def compact_to_new_build(data, keep_rows, model_name):
+    """
+    Copy the kept chunks (with their stored embeddings, so nothing is re-embedded)
+    into a new index version under stable chunk IDs, export its flat index and activate it.
+    Returns the new version name.
+    """
+    import chromadb
+    from langchain_core.documents import Document
+    from flat_index import export_flat_index
+    from ingest import chunk_id, FLAT_INDEX_QUANTIZATION
+
+    base = index_versions.current_version()
+    manifest = (index_versions.read_manifest(base) if base else None) or {}
+    digest = index_versions.corpus_hash()
+    version, build_path = index_versions.new_version(digest)
+    client = chromadb.PersistentClient(path=os.path.join(build_path, index_versions.CHROMA_DIR))
+    collection = client.get_or_create_collection(COLLECTION_NAME)
+
+    records = {}
+    for i in keep_rows:
+        doc = Document(page_content=data["documents"][i], metadata=data["metadatas"][i])
+        records.setdefault(chunk_id(doc), i)
+    ids, rows = list(records), list(records.values())
+    for start in range(0, len(ids), WRITE_BATCH):
+        batch = rows[start:start + WRITE_BATCH]
+        collection.add(ids=ids[start:start + WRITE_BATCH],
+                       embeddings=[list(map(float, data["embeddings"][i])) for i in batch],
+                       metadatas=[data["metadatas"][i] or None for i in batch],
+                       documents=[data["documents"][i] for i in batch])
+
+    from langchain_chroma import Chroma
+    from engine import get_embedding_function
+    db = Chroma(client=client, collection_name=COLLECTION_NAME, embedding_function=get_embedding_function(model_name))
+    export_flat_index(db, os.path.join(build_path, index_versions.FLAT_DIR), model_name=model_name,
+                      quantization=manifest.get("flat_quantization", FLAT_INDEX_QUANTIZATION))
+    # Incremental updates (ingest.update_index) re-run dedup from the base build's signatures
+    if base and os.path.exists(os.path.join(index_versions.version_path(base), index_versions.DEDUP_FILE)):
+        shutil.copy2(os.path.join(index_versions.version_path(base), index_versions.DEDUP_FILE), build_path)
+    index_versions.write_manifest(build_path, **dict(manifest, version=version, embedding_model=model_name,
+                                                     corpus_hash=digest, chunks=len(ids), parent=base, compacted=True))
+    index_versions.activate(version)
+    return version
+
+def print_report(report, top=15):
+    print(f"Chunks: {report['chunks']} from {len(report['per_source'])} source files")
+    for source, count in report["per_source"].most_common(top):
+        print(f"  {count:>6}  {source}")
+    if len(report["per_source"]) > top:
+        print(f"  ... {len(report['per_source']) - top} more")
+    exact_extra = sum(len(c) - 1 for c in report["exact_clusters"])
+    near_extra = sum(len(c) - 1 for c in report["near_clusters"])
+    print(f"Exact duplicates: {len(report['exact_clusters'])} clusters, {exact_extra} redundant chunks")
+    print(f"Near-duplicates:  {len(report['near_clusters'])} clusters, {near_extra} redundant chunks")
+    print(f"Orphaned chunks (source file gone): {len(report['orphans'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Report on and compact the vector index.")
+    parser.add_argument("command", choices=["report", "compact"])
+    parser.add_argument("--in-place", action="store_true",
+                        help="Delete from the legacy chroma_db/ directly instead of writing a new index version")
+    parser.add_argument("--keep-near-duplicates", action="store_true")
+    parser.add_argument("--keep-orphans", action="store_true")
+    parser.add_argument("--threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD)
+    args = parser.parse_args()
+
+    from engine import get_chroma_db, get_embedding_function, active_index
+    version, _, _, model_name = active_index()
+    if args.in_place and version:
+        parser.error(f"{version} is an active versioned build, which live readers share; "
+                     "compact it into a new build (the default) instead of --in-place")
+    db = get_chroma_db()
+    print(f"Index: {version or 'legacy chroma_db/'} (model {model_name})")
+
+    start = time.perf_counter()
+    data = load_collection(db)
+    report = health_report(data, args.threshold)
+    print_report(report)
+    print(f"Analysis took {time.perf_counter() - start:.1f}s")
+
+    query_vectors = get_embedding_function(model_name).embed_documents(BENCH_QUERIES)
+    latencies, repeats = measure_latency(db, query_vectors)
+    print(f"\nQuery latency (top {TOP_K}): {summarize(latencies)} | repeated passages per top {TOP_K}: {repeats:.2f}")
+    if args.command == "report":
+        return
+
+    drop = rows_to_drop(report, near=not args.keep_near_duplicates, orphans=not args.keep_orphans)
+    if report["orphans"] and len(report["orphans"]) == report["chunks"] and not args.keep_orphans:
+        print("\nEvery chunk looks orphaned; are the corpus folders present here? Re-run with --keep-orphans.")
+        return
+    if not drop:
+        print("\nNothing to compact.")
+        return
+
+    print(f"\nRemoving {len(drop)} of {report['chunks']} chunks...")
+    if not args.in_place:
+        # Copy the kept chunks into a new build and swap to it; readers of the old build are unaffected
+        keep_rows = [i for i in range(report["chunks"]) if i not in drop]
+        version = compact_to_new_build(data, keep_rows, model_name)
+        print(f"Activated compacted build {version}")
+        # The engine re-reads the pointer on an interval; open the new build directly
+        from engine import open_chroma_db
+        db = open_chroma_db(os.path.join(index_versions.version_path(version), index_versions.CHROMA_DIR), model_name)
+    else:
+        compact_in_place(db, [data["ids"][i] for i in sorted(drop)])
+        flat_path = active_index()[2]
+        if os.path.exists(os.path.join(flat_path, "manifest.json")):
+            from flat_index import export_flat_index
+            from ingest import FLAT_INDEX_QUANTIZATION
+            export_flat_index(db, flat_path, model_name=model_name, quantization=FLAT_INDEX_QUANTIZATION)
+
+    after, repeats_after = measure_latency(db, query_vectors)
+    print(f"Chunks now: {len(db.get(include=[])['ids'])}")
+    print(f"Query latency before: {summarize(latencies)} | repeated passages: {repeats:.2f}")
+    print(f"Query latency after:  {summarize(after)} | repeated passages: {repeats_after:.2f}")
+
+if __name__ == "__main__":
+    main()
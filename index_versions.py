@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+
+from utils import get_directories
+
+# Configuration
+INDEXES_ROOT = os.environ.get("INDEXES_ROOT", "indexes")
+CURRENT_FILE = "CURRENT"          # holds the active version name; replaced atomically
+MANIFEST_FILE = "manifest.json"
+CHROMA_DIR = "chroma"
+FLAT_DIR = "flat_index"
+DEDUP_FILE = "dedup.npz"            # pre-dedup chunk signatures, for incremental updates
+KEEP_VERSIONS = 3                 # inactive versions kept by gc (for rollback)
+PARTIAL_BUILD_MAX_AGE_S = 6 * 3600  # unfinished builds older than this are treated as abandoned
+CORPUS_EXTENSIONS = (".txt", ".pdf")
+
+def corpus_files(base_dirs=None):
+    """
+    Every source document under the corpus folders, as sorted relative paths.
+    """
+    files = []
+    for dir_name in base_dirs or get_directories():
+        for root, _, names in os.walk(dir_name):
+            files.extend(os.path.join(root, n) for n in names if n.lower().endswith(CORPUS_EXTENSIONS))
+    return sorted(files)
+
+def corpus_hash(files=None):
+    """
+    SHA-256 over the corpus file paths and contents; identical corpora hash identically.
+    """
+    digest = hashlib.sha256()
+    for path in files if files is not None else corpus_files():
+        digest.update(path.replace("\\", "/").encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+def version_path(version, root=INDEXES_ROOT):
+    return os.path.join(root, version)
+
+def new_version(corpus_digest, root=INDEXES_ROOT):
+    """
+    Create an empty build directory; returns (version, path).
+    """
+    base = f"{time.strftime('%Y%m%d-%H%M%S')}-{corpus_digest[:8]}"
+    version, n = base, 0
+    while True:
+        path = version_path(version, root)
+        try:
+            os.makedirs(path)
+            return version, path
+        except FileExistsError:
+            # Two builds within the same second
+            n += 1
+            version = f"{base}.{n}"
+
+def write_manifest(path, **fields):
+    manifest = dict(fields, built_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def read_manifest(version, root=INDEXES_ROOT):
+    try:
+        with open(os.path.join(version_path(version, root), MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def current_version(root=INDEXES_ROOT):
+    """
+    The active version name, or None when no versioned build has been activated.
+    """
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def activate(version, root=INDEXES_ROOT):
+    """
+    Point CURRENT at a finished build. The pointer is written to a temp file and
+    renamed over the old one, so readers see either the old or the new version.
+    """
+    if read_manifest(version, root) is None:
+        raise ValueError(f"{version} is not a complete index build (no {MANIFEST_FILE})")
+    tmp = os.path.join(root, f"{CURRENT_FILE}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(root, CURRENT_FILE))
+
+def list_versions(root=INDEXES_ROOT):
+    """
+    Complete builds, oldest first, as (version, manifest) pairs.
+    """
+    if not os.path.isdir(root):
+        return []
+    versions = []
+    for name in sorted(os.listdir(root)):
+        manifest = read_manifest(name, root)
+        if manifest is not None:
+            versions.append((name, manifest))
+    return versions
+
+def gc(root=INDEXES_ROOT, keep=KEEP_VERSIONS, min_age_s=PARTIAL_BUILD_MAX_AGE_S):
+    """
+    Delete inactive builds beyond the newest `keep`, and abandoned partial builds
+    (no manifest) older than min_age_s. The active version is never removed.
+    Returns the removed directory names.
+    """
+    if not os.path.isdir(root):
+        return []
+    active = current_version(root)
+    complete = [v for v, _ in list_versions(root)]
+    inactive = [v for v in complete if v != active]
+    doomed = inactive[:max(len(inactive) - keep, 0)]
+    for name in os.listdir(root):
+        path = version_path(name, root)
+        if (os.path.isdir(path) and name not in complete and name != active
+                and time.time() - os.path.getmtime(path) > min_age_s):
+            doomed.append(name)
+    for name in doomed:
+        shutil.rmtree(version_path(name, root), ignore_errors=True)
+    return doomed
+
+def main():
+    parser = argparse.ArgumentParser(description="List, activate and garbage-collect versioned index builds.")
+    parser.add_argument("command", choices=["list", "activate", "gc"])
+    parser.add_argument("version", nargs="?", help="Version to activate")
+    parser.add_argument("--keep", type=int, default=KEEP_VERSIONS, help="Inactive versions kept by gc")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        active = current_version()
+        for version, manifest in list_versions():
+            marker = "*" if version == active else " "
+            print(f"{marker} {version}  model={manifest.get('embedding_model')} chunks={manifest.get('chunks')} "
+                  f"chunking={manifest.get('chunk_size')}/{manifest.get('chunk_overlap')} built={manifest.get('built_at')}")
+        if not active:
+            print("No active version; the app reads the legacy chroma_db/ directory.")
+    elif args.command == "activate":
+        if not args.version:
+            parser.error("activate needs a version")
+        activate(args.version)
+        print(f"Active index: {args.version}")
+    else:
+        removed = gc(keep=args.keep)
+        print(f"Removed {len(removed)} old builds: {', '.join(removed) or '-'}")
+
+if __name__ == "__main__":
+    main()
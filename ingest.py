@@ -1,17 +1,53 @@
 import os
+import re
+import glob
+import json
+import time
+import hashlib
+import queue
+import shutil
+import argparse
+import threading
+from collections import Counter, defaultdict
+import numpy as np
 import chromadb
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.document_loaders import DirectoryLoader, TextLoader, PyPDFLoader
+from langchain_community.document_loaders import DirectoryLoader, TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from utils import get_directories
+from flat_index import export_flat_index
+from dedup import MinHasher, deduplicate_chunks, signature_clusters, NEAR_DUPLICATE_THRESHOLD, NUM_PERM
+from extract import load_pdf_documents
+import index_versions
 
 # Configuration
-CHROMA_PATH = "chroma_db"
+CHROMA_PATH = "chroma_db"  # legacy unversioned index (read when no version is active)
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
 
-def load_documents():
+# Watch mode (python ingest.py --watch): poll the corpus folders and re-ingest changed files
+WATCH_POLL_INTERVAL_S = float(os.environ.get("WATCH_POLL_INTERVAL_S", 2))
+WATCH_DEBOUNCE_S = float(os.environ.get("WATCH_DEBOUNCE_S", 5))  # quiet period before an update starts
+WATCH_MAX_DELAY_S = 60            # ...unless changes keep arriving for this long
+WATCH_METRICS_PATH = os.path.join(index_versions.INDEXES_ROOT, "watch_metrics.json")
+# "none", "int8" or "binary" scan codes for the flat index (see flat_index.py)
+FLAT_INDEX_QUANTIZATION = os.environ.get("FLAT_INDEX_QUANTIZATION", "none")
+
+# Page furniture: lines within this many lines of a page's top/bottom that
+# repeat on at least FURNITURE_MIN_SHARE of a file's pages are stripped
+FURNITURE_ZONE_LINES = 3
+FURNITURE_MIN_SHARE = 0.5
+FURNITURE_MIN_PAGES = 3
+
+_DIGITS_RE = re.compile(r"\d+")
+_PAGE_NUMBER_RE = re.compile(r"^(page\s*)?[-\u2013(\[]?\s*\d+\s*([-\u2013)\]]|(of|/)\s*\d+)?\s*$", re.IGNORECASE)
+
+def load_documents(pdf_backend=None):
     """
     Load documents from the specified directories.
+    pdf_backend: extraction backend name (see extract.BACKENDS); defaults to PDF_EXTRACT_BACKEND.
     """
     documents = []
     base_dirs = get_directories()
@@ -27,68 +63,464 @@ def load_documents():
         # Using DirectoryLoader with TextLoader for simplicity for now, or default
         # Assuming mixed content, let's try to handle common formats
         loader = DirectoryLoader(path, glob="**/*.txt", loader_cls=TextLoader)
-        docs = loader.load()
+        # Sorted so every build sees the files in the same order (see corpus_order)
+        docs = sorted(loader.load(), key=lambda d: d.metadata.get("source", ""))
         for doc in docs:
             doc.metadata["folder_name"] = dir_name
             doc.metadata["source_file"] = os.path.basename(doc.metadata.get("source", ""))
             documents.extend([doc])
             
-        # Add PDF support if needed, assuming simple text for now based on description implies standard text mostly
-        # But "Industry Reports" likely PDF. 
-        loader_pdf = DirectoryLoader(path, glob="**/*.pdf", loader_cls=PyPDFLoader)
-        try:
-            pdf_docs = loader_pdf.load()
+        # PDFs go through the cached extraction layer (see extract.py)
+        pdf_paths = sorted(glob.glob(os.path.join(path, "**", "*.pdf"), recursive=True))
+        for pdf_path in pdf_paths:
+            try:
+                pdf_docs = load_pdf_documents(pdf_path, backend=pdf_backend)
+            except Exception as e:
+                print(f"Error loading {pdf_path}: {e}")
+                continue
             for doc in pdf_docs:
                 doc.metadata["folder_name"] = dir_name
                 doc.metadata["source_file"] = os.path.basename(doc.metadata.get("source", ""))
             documents.extend(pdf_docs)
-        except Exception as e:
-            print(f"Error loading PDFs from {dir_name}: {e}")
 
     return documents
 
+def load_file(path, pdf_backend=None):
+    """
+    Documents for a single corpus file, with the same metadata load_documents() sets.
+    """
+    path = os.path.abspath(path)
+    folders = {os.path.abspath(d): d for d in get_directories()}
+    dir_name = next((name for folder, name in folders.items() if path.startswith(folder + os.sep)), "")
+    if path.lower().endswith(".pdf"):
+        docs = load_pdf_documents(path, backend=pdf_backend)
+    else:
+        docs = TextLoader(path).load()
+    for doc in docs:
+        doc.metadata["folder_name"] = dir_name
+        doc.metadata["source_file"] = os.path.basename(doc.metadata.get("source", ""))
+    return docs
+
+def corpus_order(source):
+    """
+    Sort key for a file's position in a full build: folder, TXT before PDF, then path.
+    Near-duplicate dedup keeps the first chunk of a cluster, so this decides the survivor.
+    """
+    folders = [os.path.abspath(d) + os.sep for d in get_directories()]
+    folder = next((i for i, f in enumerate(folders) if os.path.abspath(source).startswith(f)), len(folders))
+    return folder, source.lower().endswith(".pdf"), source
+
+def load_chunks(paths):
+    """
+    Cleaned and split (not deduplicated) chunks of the given corpus files, in corpus order.
+    """
+    documents = []
+    for path in sorted(paths, key=corpus_order):
+        try:
+            documents.extend(load_file(path))
+        except Exception as e:
+            print(f"Error loading {path}: {e}")
+    documents, _ = strip_page_furniture(documents)
+    return split_documents(documents)
+
+def _furniture_key(line):
+    # "Page 3 of 40" and "Page 4 of 40" must match, so digits are masked
+    return _DIGITS_RE.sub("#", " ".join(line.lower().split()))
+
+def strip_page_furniture(documents):
+    """
+    Remove repeated headers, footers and page numbers from PDF pages.
+    Pages are grouped by source file; a line in the top/bottom zone of a page
+    counts as furniture when it recurs on enough of that file's pages.
+    Documents without `page` metadata (TXT files) are left untouched, so a text
+    file's first or last line is never mistaken for a page number.
+    Returns (documents, stats) with stats on lines and characters removed.
+    """
+    stats = {"lines": 0, "chars": 0, "pages": 0}
+    by_source = defaultdict(list)
+    for doc in documents:
+        if "page" in doc.metadata:
+            by_source[doc.metadata.get("source", "")].append(doc)
+
+    for pages in by_source.values():
+        zones = []
+        counts = Counter()
+        for doc in pages:
+            lines = doc.page_content.splitlines()
+            non_empty = [i for i, l in enumerate(lines) if l.strip()]
+            # Short pages get a smaller zone so body text is never treated as furniture
+            size = min(FURNITURE_ZONE_LINES, max(1, len(non_empty) // 4))
+            zone = set(non_empty[:size] + non_empty[-size:])
+            zones.append((lines, zone))
+            counts.update({_furniture_key(lines[i]) for i in zone})
+
+        min_pages = max(FURNITURE_MIN_PAGES, int(len(pages) * FURNITURE_MIN_SHARE))
+        repeated = {key for key, n in counts.items() if n >= min_pages} if len(pages) >= FURNITURE_MIN_PAGES else set()
+
+        for doc, (lines, zone) in zip(pages, zones):
+            kept = []
+            for i, line in enumerate(lines):
+                if i in zone and (_furniture_key(line) in repeated or _PAGE_NUMBER_RE.match(line.strip())):
+                    stats["lines"] += 1
+                    stats["chars"] += len(line)
+                    continue
+                kept.append(line)
+            if len(kept) != len(lines):
+                stats["pages"] += 1
+                doc.page_content = "\n".join(kept)
+
+    return documents, stats
+
 def split_documents(documents):
     """
     Split documents into chunks.
     """
     text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
         length_function=len,
         is_separator_regex=False,
     )
     return text_splitter.split_documents(documents)
 
-def add_to_chroma(chunks):
+def chunk_id(chunk):
+    """
+    Stable ID from the chunk's source (relative path), page and text: re-adding
+    the same chunk overwrites it instead of adding a copy.
+    """
+    source = chunk.metadata.get("source", "")
+    source = os.path.relpath(source) if os.path.isabs(source) else source
+    key = f"{source.replace(os.sep, '/')}|{chunk.metadata.get('page', '')}|{chunk.page_content}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+def add_chunks(db, chunks):
+    """
+    Upsert chunks under their stable IDs; identical chunks from one page are stored once.
+    Returns the number stored.
+    """
+    unique = {}
+    for chunk in chunks:
+        unique.setdefault(chunk_id(chunk), chunk)
+    if unique:
+        db.add_documents(list(unique.values()), ids=list(unique))
+    return len(unique)
+
+def add_to_chroma(chunks, path=CHROMA_PATH, model_name=EMBEDDING_MODEL):
     """
     Add chunks to ChromaDB.
     """
     # Using a standard open embedding model suitable for local/cpu usage if needed, 
     # or we can use target specific ones. "all-MiniLM-L6-v2" is a safe bet.
-    embedding_function = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    embedding_function = HuggingFaceEmbeddings(model_name=model_name)
     
     # Initialize Chroma
     db = Chroma(
-        persist_directory=CHROMA_PATH,
+        persist_directory=path,
         embedding_function=embedding_function
     )
     
-    # Add chunks
-    # Chroma handles IDs automatically if not provided, but we can prevent dupes if we want.
-    # For this simple upskiller, we'll just add.
-    
+    # Add chunks under stable IDs so re-running ingest into the same collection can't multiply it
     print(f"Adding {len(chunks)} chunks to ChromaDB...")
-    db.add_documents(chunks)
+    add_chunks(db, chunks)
     print("Data ingestion complete.")
+    return db
 
-def main():
+def save_dedup_state(build_path, ids, sources, signatures):
+    """
+    Store the ID, source and MinHash signature of every chunk the build saw, kept or
+    dropped as a near-duplicate, in corpus order. update_index re-runs dedup from this.
+    """
+    np.savez(os.path.join(build_path, index_versions.DEDUP_FILE), ids=np.array(ids, dtype=str),
+             sources=np.array(sources, dtype=str), signatures=signatures)
+
+def load_dedup_state(version):
+    """
+    (ids, sources, signatures) saved with a build, or None for builds without it.
+    """
+    path = os.path.join(index_versions.version_path(version), index_versions.DEDUP_FILE)
+    try:
+        with np.load(path) as data:
+            return data["ids"].tolist(), data["sources"].tolist(), data["signatures"]
+    except OSError:
+        return None
+
+def corpus_snapshot():
+    """
+    {absolute path: [mtime, size]} for every corpus file.
+    """
+    snapshot = {}
+    for path in index_versions.corpus_files():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        snapshot[os.path.abspath(path)] = [stat.st_mtime, stat.st_size]
+    return snapshot
+
+def diff_snapshots(old, new):
+    """
+    (changed or added paths, removed paths) between two corpus snapshots.
+    """
+    changed = {path for path, sig in new.items() if old.get(path) != sig}
+    return changed, set(old) - set(new)
+
+def build_index(embedding_model=EMBEDDING_MODEL, activate=True, keep=index_versions.KEEP_VERSIONS):
+    """
+    Full build of the corpus into a new index version. Returns the version, or None.
+    """
+    snapshot = corpus_snapshot()
+    digest = index_versions.corpus_hash()
     documents = load_documents()
     if not documents:
         print("No documents found.")
+        return None
+    
+    # Clean before chunking so furniture never ends up inside chunk text
+    documents, furniture = strip_page_furniture(documents)
+    raw_chunks = split_documents(documents)
+    raw_chunk_count = len(raw_chunks)
+    signatures = MinHasher().signatures([c.page_content for c in raw_chunks])
+    chunks, duplicates = deduplicate_chunks(raw_chunks, NEAR_DUPLICATE_THRESHOLD, signatures)
+    
+    # Each build goes into its own directory; the running app keeps reading the active one
+    version, build_path = index_versions.new_version(digest)
+    print(f"Building index version {version}")
+    start = time.perf_counter()
+    db = add_to_chroma(chunks, os.path.join(build_path, index_versions.CHROMA_DIR), embedding_model)
+    embed_seconds = time.perf_counter() - start
+    
+    # Report what cleaning saved (time saved is extrapolated from the measured per-chunk cost)
+    print("-" * 60)
+    print(f"Page furniture: removed {furniture['lines']} lines ({furniture['chars']} chars) from {furniture['pages']} pages")
+    print(f"Near-duplicates: removed {len(duplicates)} of {raw_chunk_count} chunks "
+          f"({len(duplicates) / max(raw_chunk_count, 1):.1%} smaller index)")
+    if chunks:
+        saved = embed_seconds / len(chunks) * len(duplicates)
+        print(f"Embedding/storage time: {embed_seconds:.1f}s, ~{saved:.1f}s saved by deduplication")
+    
+    # The in-process NumPy index used by RETRIEVER_BACKEND=flat is built alongside
+    export_flat_index(db, os.path.join(build_path, index_versions.FLAT_DIR), model_name=embedding_model,
+                      quantization=FLAT_INDEX_QUANTIZATION)
+    save_dedup_state(build_path, [chunk_id(c) for c in raw_chunks],
+                     [c.metadata.get("source", "") for c in raw_chunks], signatures)
+
+    # The manifest is written last: a build without one is incomplete and can't be activated
+    index_versions.write_manifest(
+        build_path, version=version, embedding_model=embedding_model, chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP, corpus_hash=digest, documents=len(documents), chunks=len(chunks),
+        flat_quantization=FLAT_INDEX_QUANTIZATION, files=snapshot)
+    if not activate:
+        print(f"Built {version}; activate it with: python index_versions.py activate {version}")
+        return version
+    index_versions.activate(version)
+    removed = index_versions.gc(keep=keep)
+    print(f"Active index: {version}" + (f" (removed old builds: {', '.join(removed)})" if removed else ""))
+    return version
+
+def update_index(changed, removed, keep=index_versions.KEEP_VERSIONS):
+    """
+    Re-ingest only the changed files and drop the removed ones.
+    The active build is copied into a new version, patched there and then activated,
+    so readers never see a partial update. Near-duplicate dedup is re-run over the whole
+    corpus from the signatures the build saved, so the result matches a full rebuild:
+    a copy that was dropped in favour of a changed or removed file's chunk is loaded
+    again from its own file when it becomes the survivor.
+    Falls back to a full build when no version is active or it has no saved dedup state.
+    Returns {"version", "files", "chunks_added", "chunks_removed"}.
+    """
+    base = index_versions.current_version()
+    manifest = index_versions.read_manifest(base) if base else None
+    state = load_dedup_state(base) if manifest else None
+    if state is None:
+        version = build_index(keep=keep)
+        return {"version": version, "files": len(changed) + len(removed), "chunks_added": None, "chunks_removed": 0}
+
+    snapshot = corpus_snapshot()
+    digest = index_versions.corpus_hash()
+    version, build_path = index_versions.new_version(digest)
+    chroma_path = os.path.join(build_path, index_versions.CHROMA_DIR)
+    shutil.copytree(os.path.join(index_versions.version_path(base), index_versions.CHROMA_DIR), chroma_path)
+    model_name = manifest.get("embedding_model", EMBEDDING_MODEL)
+    db = Chroma(persist_directory=chroma_path, embedding_function=HuggingFaceEmbeddings(model_name=model_name))
+
+    # Every pre-dedup chunk per file: unchanged files from the saved state, changed files re-read
+    ids, sources, signatures = state
+    touched = set(changed) | set(removed)
+    by_source = defaultdict(list)
+    for cid, source, signature in zip(ids, sources, signatures):
+        if source not in touched:
+            by_source[source].append((cid, source, signature, None))
+    new_chunks = load_chunks(changed)
+    for chunk, signature in zip(new_chunks, MinHasher().signatures([c.page_content for c in new_chunks])):
+        source = chunk.metadata.get("source", "")
+        by_source[source].append((chunk_id(chunk), source, signature, chunk))
+
+    raw = [entry for source in sorted(by_source, key=corpus_order) for entry in by_source[source]]
+    raw_signatures = np.stack([e[2] for e in raw]) if raw else np.zeros((0, NUM_PERM), dtype=np.int64)
+    drop = {i for cluster in signature_clusters(raw_signatures, NEAR_DUPLICATE_THRESHOLD) for i in cluster[1:]}
+    kept = [entry for i, entry in enumerate(raw) if i not in drop]
+
+    existing = set(db.get(include=[])["ids"])
+    stale_ids = sorted(existing - {cid for cid, _, _, _ in kept})
+    if stale_ids:
+        db.delete(ids=stale_ids)
+
+    # Changed files are re-added in full; an unchanged file is re-read only when a copy
+    # that was dropped from it now survives
+    revived = {cid: source for cid, source, _, chunk in kept if chunk is None and cid not in existing}
+    reloaded = {chunk_id(c): c for c in load_chunks(set(revived.values()))} if revived else {}
+    added = [chunk for _, _, _, chunk in kept if chunk is not None]
+    added += [reloaded[cid] for cid in revived if cid in reloaded]
+    add_chunks(db, added)
+
+    export_flat_index(db, os.path.join(build_path, index_versions.FLAT_DIR), model_name=model_name,
+                      quantization=manifest.get("flat_quantization", FLAT_INDEX_QUANTIZATION))
+    save_dedup_state(build_path, [e[0] for e in raw], [e[1] for e in raw], raw_signatures)
+    index_versions.write_manifest(
+        build_path, **dict(manifest, version=version, corpus_hash=digest, chunks=len(db.get(include=[])["ids"]),
+                           files=snapshot, parent=base, changed_files=len(changed), removed_files=len(removed)))
+    index_versions.activate(version)
+    index_versions.gc(keep=keep)
+    return {"version": version, "files": len(changed) + len(removed), "chunks_added": len(added),
+            "chunks_removed": len(stale_ids)}
+
+class CorpusWatcher:
+    """
+    Polls the corpus folders and re-ingests changed files on a background worker.
+    A burst of changes is debounced into one update; polling continues while an
+    update runs, and changes seen meanwhile go into the next one.
+    """
+
+    def __init__(self, poll_interval=WATCH_POLL_INTERVAL_S, debounce=WATCH_DEBOUNCE_S, max_delay=WATCH_MAX_DELAY_S,
+                 keep=index_versions.KEEP_VERSIONS, metrics_path=WATCH_METRICS_PATH, update=update_index):
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.keep = keep
+        self.metrics_path = metrics_path
+        self.update = update
+        # Start from what the active build indexed, so edits made while nobody watched are caught up
+        manifest = index_versions.read_manifest(index_versions.current_version() or "")
+        self.snapshot = (manifest or {}).get("files", {})
+        self.pending = {}          # path -> "changed" | "removed"
+        self.first_change = None   # wall-clock time of the oldest unprocessed change
+        self.last_change = None
+        self._busy = threading.Event()
+        self._lock = threading.Lock()
+        self._jobs = queue.Queue()
+        self.metrics = {"updates": 0, "failures": 0, "files": 0, "chunks_added": 0, "chunks_removed": 0,
+                        "last_version": index_versions.current_version(), "last_lag_s": None, "max_lag_s": 0.0,
+                        "last_update_s": None, "chunks_per_s": None, "pending_files": 0}
+
+    def poll(self):
+        """
+        Compare the corpus with the last snapshot and queue the differences.
+        """
+        current = corpus_snapshot()
+        changed, removed = diff_snapshots(self.snapshot, current)
+        self.snapshot = current
+        if not changed and not removed:
+            return
+        now = time.time()
+        with self._lock:
+            self.pending.update({path: "changed" for path in changed})
+            self.pending.update({path: "removed" for path in removed})
+            self.first_change = self.first_change or now
+            self.last_change = now
+            self.metrics["pending_files"] = len(self.pending)
+
+    def due(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            if not self.pending or self._busy.is_set():
+                return False
+            return now - self.last_change >= self.debounce or now - self.first_change >= self.max_delay
+
+    def dispatch(self):
+        """
+        Hand the pending changes to the worker as one update.
+        """
+        with self._lock:
+            batch, first = self.pending, self.first_change
+            self.pending, self.first_change, self.last_change = {}, None, None
+            self.metrics["pending_files"] = 0
+        self._busy.set()
+        self._jobs.put((batch, first))
+
+    def _work(self):
+        while True:
+            batch, first = self._jobs.get()
+            changed = {p for p, kind in batch.items() if kind == "changed"}
+            removed = {p for p, kind in batch.items() if kind == "removed"}
+            start = time.time()
+            try:
+                result = self.update(changed, removed, keep=self.keep)
+            except Exception as e:
+                print(f"Re-ingest of {len(batch)} files failed: {e}")
+                with self._lock:
+                    # Retry with the next update, keeping the original change time for the lag metric
+                    for path, kind in batch.items():
+                        self.pending.setdefault(path, kind)
+                    self.first_change = min(filter(None, [self.first_change, first]))
+                    self.last_change = self.last_change or time.time()
+                    self.metrics["failures"] += 1
+                    self.metrics["pending_files"] = len(self.pending)
+            else:
+                end = time.time()
+                with self._lock:
+                    m = self.metrics
+                    m["updates"] += 1
+                    m["files"] += result["files"]
+                    m["chunks_added"] += result["chunks_added"] or 0
+                    m["chunks_removed"] += result["chunks_removed"]
+                    m["last_version"] = result["version"]
+                    m["last_lag_s"] = round(end - first, 2)
+                    m["max_lag_s"] = max(m["max_lag_s"], m["last_lag_s"])
+                    m["last_update_s"] = round(end - start, 2)
+                    if result["chunks_added"]:
+                        m["chunks_per_s"] = round(result["chunks_added"] / max(end - start, 1e-6), 1)
+                print(f"Published {result['version']}: {result['files']} files, +{result['chunks_added']} "
+                      f"-{result['chunks_removed']} chunks in {end - start:.1f}s (lag {end - first:.1f}s)")
+            finally:
+                self._busy.clear()
+                self.write_metrics()
+
+    def write_metrics(self):
+        if not self.metrics_path:
+            return
+        with self._lock:
+            data = dict(self.metrics, updated_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        os.makedirs(os.path.dirname(self.metrics_path) or ".", exist_ok=True)
+        tmp = f"{self.metrics_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.metrics_path)
+
+    def run(self):
+        threading.Thread(target=self._work, name="ingest-worker", daemon=True).start()
+        print(f"Watching {', '.join(get_directories())} every {self.poll_interval:g}s "
+              f"(debounce {self.debounce:g}s). Metrics: {self.metrics_path}")
+        while True:
+            self.poll()
+            if self.due():
+                self.dispatch()
+            time.sleep(self.poll_interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a new versioned vector index from the corpus folders.")
+    parser.add_argument("--embedding-model", default=EMBEDDING_MODEL)
+    parser.add_argument("--no-activate", action="store_true", help="Build only; activate later with index_versions.py")
+    parser.add_argument("--keep", type=int, default=index_versions.KEEP_VERSIONS, help="Old versions kept after activation")
+    parser.add_argument("--watch", action="store_true", help="Keep running and re-ingest files as they change")
+    args = parser.parse_args()
+
+    if args.watch:
+        try:
+            CorpusWatcher(keep=args.keep).run()
+        except KeyboardInterrupt:
+            print("Watcher stopped.")
         return
-        
-    chunks = split_documents(documents)
-    add_to_chroma(chunks)
+    build_index(args.embedding_model, activate=not args.no_activate, keep=args.keep)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,285 @@
+import os
+import re
+import json
+import time
+import threading
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Configuration
+# "groq" (default), "local" (llama.cpp on CPU) or "fake" (scripted, offline)
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "groq")
+GROQ_MODEL = os.environ.get("GROQ_MODEL", "llama-3.1-8b-instant")
+LLM_TEMPERATURE = 0.7
+LOCAL_MODEL_PATH = os.environ.get("LOCAL_MODEL_PATH", "models/llama-3.2-3b-instruct-q4_k_m.gguf")
+LOCAL_CONTEXT_SIZE = int(os.environ.get("LOCAL_CONTEXT_SIZE", 4096))
+FAKE_TTFT_MS = float(os.environ.get("FAKE_LLM_TTFT_MS", 150))        # delay before the first token
+FAKE_TOKEN_LATENCY_MS = float(os.environ.get("FAKE_LLM_TOKEN_LATENCY_MS", 15))
+
+_models = {}
+_models_lock = threading.Lock()
+
+FAKE_QUIZ = [
+    {"question": "Which AI technique is most commonly used to forecast wafer demand?",
+     "options": ["Time-series forecasting", "Image segmentation", "Speech recognition", "Rule-based expert systems"],
+     "correct_answer": 0, "competency": "AI Strategy"},
+    {"question": "How does computer vision support incoming materials inspection?",
+     "options": ["By negotiating supplier contracts", "By detecting packaging damage and mislabels", "By scheduling trucks", "By setting prices"],
+     "correct_answer": 1, "competency": "Procurement"},
+    {"question": "What does a digital twin of a fab supply chain let you do?",
+     "options": ["Replace ERP", "Simulate disruptions before they happen", "Print labels", "Store wafers"],
+     "correct_answer": 1, "competency": "AI Strategy"},
+    {"question": "Which data is most useful for predictive maintenance of AMHS equipment?",
+     "options": ["Sensor vibration and temperature logs", "Employee birthdays", "Marketing emails", "Office floor plans"],
+     "correct_answer": 0, "competency": "Data Literacy"},
+    {"question": "What is a key risk when deploying AI route optimization?",
+     "options": ["Too many trucks", "Poor data quality leading to bad recommendations", "Lower fuel prices", "Faster customs"],
+     "correct_answer": 1, "competency": "Logistics Ops"},
+]
+
+FAKE_SCENARIO = {
+    "scenario": "A critical photoresist shipment is held at customs and the fab has 36 hours of stock left. "
+                "The lithography bay will idle if it does not arrive, costing millions per day.",
+    "question": "Which AI tool or data-driven strategy would you use to decide between expediting, "
+                "re-routing or re-sequencing production, and why?",
+}
+
+# Batch output for the scenario library, one per competency
+FAKE_SCENARIOS = [
+    dict(FAKE_SCENARIO, competency="Logistics Ops"),
+    {"scenario": "The demand forecast for a new 5 nm product jumped 40% overnight after a customer pulled in orders, "
+                 "but the forecasting model was trained on last year's mix.",
+     "question": "How would you check whether the model's forecast can be trusted before committing wafer starts?",
+     "competency": "Data Literacy"},
+    {"scenario": "Leadership wants to deploy an AI agent that automatically places purchase orders for consumables, "
+                 "and asks you to propose guardrails before the pilot.",
+     "question": "Which controls and success metrics would you put around the AI agent, and why?",
+     "competency": "AI Strategy"},
+    {"scenario": "A vision system flags a leaking chemical drum in the bulk gas yard during a night shift "
+                 "with only two technicians on site.",
+     "question": "How would you combine the AI alert with safety procedures to respond without putting staff at risk?",
+     "competency": "Safety"},
+    {"scenario": "Your sole supplier of high-purity quartz announces a 12-week allocation due to a furnace failure.",
+     "question": "How could supplier risk analytics help you qualify alternates and rebalance orders quickly?",
+     "competency": "Procurement"},
+]
+
+FAKE_EVALUATION = (
+    "Pass. You used demand and inventory data to quantify the stock-out risk before acting, which matches "
+    "JIT practice in fabs. Re-sequencing lots with a scheduling model buys time without expediting cost. "
+    "Next time, also mention supplier risk scoring to prevent the delay recurring."
+)
+
+FAKE_FLASHCARDS = [
+    {"term": "AMHS", "definition": "Automated Material Handling System that moves wafer carriers between fab tools."},
+    {"term": "FOUP", "definition": "Front Opening Unified Pod, the sealed carrier that transports 300 mm wafers."},
+    {"term": "WIP", "definition": "Work in progress: wafers released to the fab but not yet finished."},
+    {"term": "MES", "definition": "Manufacturing Execution System that tracks lots and equipment states in the fab."},
+    {"term": "S&OP", "definition": "Sales and Operations Planning, aligning demand forecasts with supply capacity."},
+]
+
+FAKE_ROADMAP = """## Personalized Learning Roadmap
+
+| Module | Topic | Duration | Outcome |
+|---|---|---|---|
+| Module 1 | Semiconductor Supply Chain Basics | 1 week | Map the fab supply chain |
+| Module 2 | Data Literacy for Logistics | 1 week | Read and clean logistics data |
+| Module 3 | Demand Forecasting with AI | 2 weeks | Build a baseline forecast |
+| Module 4 | Inventory Optimization | 1 week | Set safety stock with data |
+| Module 5 | Predictive Maintenance | 1 week | Interpret equipment alerts |
+| Module 6 | Computer Vision for Inspection | 1 week | Evaluate vision use cases |
+| Module 7 | Route and Network Optimization | 1 week | Compare routing options |
+| Module 8 | Supplier Risk Analytics | 1 week | Score supplier risk |
+| Module 9 | Digital Twins | 1 week | Simulate a disruption |
+| Module 10 | AI Strategy and Governance | 1 week | Present an AI roadmap |
+
+```mermaid
+graph TD
+    M1["Supply Chain Basics"] --> M2["Data Literacy"]
+    M2 --> M3["Demand Forecasting"]
+    M3 --> M4["Inventory Optimization"]
+    M4 --> M5["Predictive Maintenance"]
+    M5 --> M6["Vision Inspection"]
+    M6 --> M7["Route Optimization"]
+    M7 --> M8["Supplier Risk"]
+    M8 --> M9["Digital Twins"]
+    M9 --> M10["AI Strategy"]
+```
+"""
+
+FAKE_SKILL_WEB = """```mermaid
+graph TD
+    A["{role}"] --> B["Technical"]
+    A --> C["Management"]
+    A --> D["Compliance"]
+    B --> B1["Data Analysis"]
+    B --> B2["AI Tools"]
+    C --> C1["Planning"]
+    C --> C2["Leadership"]
+    D --> D1["Export Control"]
+    D --> D2["Safety"]
+```"""
+
+FAKE_CHAT = (
+    "A {role} in a semiconductor fab should focus on three areas:\n\n"
+    "- **Data literacy**: reading inventory, lead-time and WIP data with confidence.\n"
+    "- **AI-assisted planning**: using forecasting and scheduling tools to anticipate shortages.\n"
+    "- **Risk management**: monitoring suppliers and logistics routes for disruption.\n\n"
+    "For a full visual schedule, use the 'Personalized Roadmap' tab."
+)
+
+_ROLE_RE = re.compile(r"(?:User Role:|for an? )\s*([A-Z][\w ]+?)(?:\n| at | in |\.|$)")
+# Interpolated data (retrieved context, learner text, scenarios) that must not steer the reply choice
+_PROMPT_DATA_RE = re.compile(
+    r"(Context from Knowledge Base:).*?(?=\n\s*User Role:)"
+    r"|(Learner responses:).*?(?=\n\s*Return strictly)"
+    r"|^(\s*(?:Scenario|Question|User Query|User Response):)[^\n]*",
+    re.DOTALL | re.MULTILINE,
+)
+
+def template_text(prompt):
+    """
+    The prompt with its interpolated data sections emptied, leaving the instructions.
+    """
+    return _PROMPT_DATA_RE.sub(lambda m: m.group(1) or m.group(2) or m.group(3), prompt)
+
+def scripted_response(prompt):
+    """
+    Canned reply for an engine prompt, picked by the task its instructions ask for.
+    Only the template wording is matched, so retrieved context or learner text
+    quoting another task's phrases cannot select the wrong reply.
+    """
+    full_prompt, prompt = prompt, template_text(prompt)
+    role_match = _ROLE_RE.search(prompt)
+    role = role_match.group(1).strip() if role_match else "Logistics Manager"
+    if "multiple-choice questions" in prompt:
+        return json.dumps(FAKE_QUIZ)
+    if "Crisis Scenarios" in prompt:
+        return json.dumps(FAKE_SCENARIOS)
+    if "Crisis Scenario" in prompt:
+        return json.dumps(FAKE_SCENARIO)
+    if "Grade each learner response" in prompt:
+        # Deterministic verdicts: longer, tool-specific answers pass
+        labels = re.findall(r"^\s*\[(R\d+)\]\n(.*)$", full_prompt, re.MULTILINE)
+        return json.dumps([
+            {"id": label, "grade": "Pass" if len(answer.split()) >= 8 else "Fail",
+             "rationale": "Names a concrete data-driven action." if len(answer.split()) >= 8
+                          else "Too vague: no specific AI tool or data source.",
+             "competencies": ["Logistics Ops", "Data Literacy"]}
+            for label, answer in labels
+        ])
+    if "senior supervisor" in prompt:
+        return FAKE_EVALUATION
+    if "acronyms or key terms" in prompt:
+        return json.dumps(FAKE_FLASHCARDS)
+    if "Skill Web" in prompt:
+        return FAKE_SKILL_WEB.replace("{role}", role)
+    if "Training Path as a Markdown table" in prompt:
+        return FAKE_ROADMAP
+    return FAKE_CHAT.replace("{role}", role)
+
+_TOKEN_RE = re.compile(r"\S+\s*|\s+")
+
+def apply_limits(text, stop=None, max_tokens=None):
+    """
+    Cut a canned reply at the first stop sequence and at max_tokens word-sized tokens,
+    as a real backend would.
+    """
+    for sequence in stop or []:
+        if sequence in text:
+            text = text[:text.index(sequence)]
+    if max_tokens is not None:
+        text = "".join(_TOKEN_RE.findall(text)[:max_tokens])
+    return text
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Offline chat model replaying canned engine responses with realistic timing:
+    ttft_ms before the first token, then token_latency_ms per word-sized token.
+    """
+
+    ttft_ms: float = FAKE_TTFT_MS
+    token_latency_ms: float = FAKE_TOKEN_LATENCY_MS
+
+    @property
+    def _llm_type(self):
+        return "scripted-fake"
+
+    def _prompt_text(self, messages):
+        return "\n".join(str(m.content) for m in messages)
+
+    def _usage(self, prompt, text):
+        # ~4 characters per token, matching engine.estimate_tokens
+        input_tokens, output_tokens = len(prompt) // 4 + 1, len(text) // 4 + 1
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        prompt = self._prompt_text(messages)
+        text = apply_limits(scripted_response(prompt), stop, kwargs.get("max_tokens"))
+        tokens = _TOKEN_RE.findall(text)
+        time.sleep((self.ttft_ms + self.token_latency_ms * len(tokens)) / 1000)
+        message = AIMessage(content=text, usage_metadata=self._usage(prompt, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        text = apply_limits(scripted_response(self._prompt_text(messages)), stop, kwargs.get("max_tokens"))
+        time.sleep(self.ttft_ms / 1000)
+        for i, token in enumerate(_TOKEN_RE.findall(text)):
+            if i:
+                time.sleep(self.token_latency_ms / 1000)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+def _groq_api_key():
+    key = os.environ.get("GROQ_API_KEY")
+    if key:
+        return key
+    import streamlit as st
+    return st.secrets["GROQ_API_KEY"]
+
+def _create_groq():
+    from langchain_groq import ChatGroq
+    return ChatGroq(temperature=LLM_TEMPERATURE, model_name=GROQ_MODEL, groq_api_key=_groq_api_key())
+
+def _create_local():
+    from langchain_community.chat_models import ChatLlamaCpp
+    if not os.path.exists(LOCAL_MODEL_PATH):
+        raise FileNotFoundError(f"Local model not found at '{LOCAL_MODEL_PATH}'. Set LOCAL_MODEL_PATH to a GGUF file.")
+    return ChatLlamaCpp(
+        model_path=LOCAL_MODEL_PATH,
+        temperature=LLM_TEMPERATURE,
+        n_ctx=LOCAL_CONTEXT_SIZE,
+        n_threads=os.cpu_count(),
+        max_tokens=1024,
+        verbose=False,
+    )
+
+def _create_fake():
+    return ScriptedChatModel()
+
+BACKENDS = {
+    "groq": _create_groq,
+    "local": _create_local,
+    "fake": _create_fake,
+}
+
+def get_chat_model(backend=None):
+    """
+    Shared chat model for a backend (created once per process).
+    """
+    backend = backend or LLM_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+    with _models_lock:
+        if backend not in _models:
+            _models[backend] = BACKENDS[backend]()
+        return _models[backend]
@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_retrieval import percentile
+from utils import build_roadmap_query, process_rss_mb
+
+# Configuration
+ROLES = ["Logistics Manager", "Supply Chain Analyst", "Warehouse Supervisor", "Procurement Specialist"]
+DEFAULT_MIX = "chat=45,roadmap=15,quiz=15,scenario=15,research=10"
+CHAT_QUESTIONS = [
+    "What competencies does my role need in a semiconductor fab?",
+    "How can AI help with inventory planning?",
+    "Which certifications should I pursue next?",
+    "Explain predictive maintenance in simple terms.",
+    "How do I handle a supplier delay for critical materials?",
+]
+RESEARCH_QUESTIONS = [
+    "Latest trends in semiconductor logistics automation",
+    "How are fabs using AI for supply chain resilience?",
+]
+SATURATION_GAIN = 1.10  # next stage must add 10% throughput to count as scaling
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(ACTIONS)
+    if unknown:
+        raise ValueError(f"Unknown actions in mix: {', '.join(sorted(unknown))}. Choose from: {', '.join(ACTIONS)}")
+    return mix
+
+def _stream(target, query, role, level, mode, session_id):
+    """
+    Consume a streamed answer; returns seconds to the first token.
+    """
+    start = time.perf_counter()
+    ttft = None
+    for _ in target.get_rag_response(query, role, level, generation_mode=mode, session_id=session_id):
+        if ttft is None:
+            ttft = time.perf_counter() - start
+    return ttft
+
+def action_chat(target, rng, role, level, session_id):
+    return _stream(target, rng.choice(CHAT_QUESTIONS), role, level, "chat", session_id)
+
+def action_roadmap(target, rng, role, level, session_id):
+    return _stream(target, build_roadmap_query(role, level), role, level, "roadmap", session_id)
+
+def action_research(target, rng, role, level, session_id):
+    return _stream(target, rng.choice(RESEARCH_QUESTIONS), role, level, "search", session_id)
+
+def action_quiz(target, rng, role, level, session_id):
+    if not target.generate_quiz_questions(role, level):
+        raise RuntimeError("empty quiz")
+
+def action_scenario(target, rng, role, level, session_id):
+    scenario = target.generate_scenario(role, level)
+    target.evaluate_scenario(scenario, "I would use demand forecasting and re-sequence production.")
+
+ACTIONS = {
+    "chat": action_chat,
+    "roadmap": action_roadmap,
+    "quiz": action_quiz,
+    "scenario": action_scenario,
+    "research": action_research,
+}
+
+def virtual_user(target, user_no, mix, deadline, think_ms, results, lock, seed):
+    """
+    One simulated learner: pick an action from the mix, run it, pause, repeat until the deadline.
+    """
+    rng = random.Random(seed * 1000 + user_no)
+    role, level = rng.choice(ROLES), rng.randint(1, 5)
+    session_id = f"load-{user_no}"
+    if hasattr(target, "set_usage_session"):
+        target.set_usage_session(session_id)
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        error, ttft = None, None
+        try:
+            ttft = ACTIONS[name](target, rng, role, level, session_id)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        total = time.perf_counter() - start
+        with lock:
+            results.append({"action": name, "ttft": ttft if ttft is not None else total,
+                            "latency": total, "error": error, "end": time.perf_counter()})
+        if think_ms:
+            time.sleep(rng.uniform(0.5, 1.5) * think_ms / 1000)
+
+def rss_mb(target):
+    """
+    RSS of the process serving the requests (this one, or the service via /health).
+    """
+    if hasattr(target, "ENGINE_SERVICE_URL"):
+        try:
+            return target._session.get(f"{target.ENGINE_SERVICE_URL}/health", timeout=5).json().get("rss_mb")
+        except Exception:
+            return None
+    return round(process_rss_mb(), 1)
+
+def summarize_stage(concurrency, results, seconds, rss):
+    ok = [r for r in results if not r["error"]]
+    stage = {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "error_rate": (len(results) - len(ok)) / len(results) if results else 0.0,
+        "throughput_rps": len(ok) / seconds if seconds else 0.0,
+        "rss_mb": rss,
+        "by_action": {},
+    }
+    if ok:
+        ttfts = [r["ttft"] * 1000 for r in ok]
+        latencies = [r["latency"] * 1000 for r in ok]
+        stage.update(ttft_p50_ms=percentile(ttfts, 50), ttft_p95_ms=percentile(ttfts, 95),
+                     latency_p50_ms=percentile(latencies, 50), latency_p95_ms=percentile(latencies, 95),
+                     latency_p99_ms=percentile(latencies, 99))
+    for name in sorted({r["action"] for r in results}):
+        rows = [r for r in results if r["action"] == name]
+        lat = [r["latency"] * 1000 for r in rows if not r["error"]]
+        stage["by_action"][name] = {"requests": len(rows), "errors": sum(1 for r in rows if r["error"]),
+                                    "latency_p95_ms": percentile(lat, 95) if lat else None}
+    stage["sample_errors"] = sorted({r["error"] for r in results if r["error"]})[:3]
+    return stage
+
+def find_saturation(stages):
+    """
+    First concurrency level after which throughput stops growing while p95 latency keeps rising.
+    """
+    for prev, cur in zip(stages, stages[1:]):
+        if not prev.get("latency_p95_ms") or not cur.get("latency_p95_ms"):
+            continue
+        if cur["throughput_rps"] < prev["throughput_rps"] * SATURATION_GAIN and cur["latency_p95_ms"] > prev["latency_p95_ms"]:
+            return prev["concurrency"]
+    return None
+
+def run_stage(target, concurrency, seconds, mix, think_ms, seed):
+    results, lock = [], threading.Lock()
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for user_no in range(concurrency):
+            pool.submit(virtual_user, target, user_no, mix, deadline, think_ms, results, lock, seed)
+    elapsed = time.perf_counter() - start
+    return summarize_stage(concurrency, results, elapsed, rss_mb(target))
+
+def get_target(service_url=None):
+    """
+    engine_client for a running service, else the in-process engine.
+    Imported here, after main() has set LLM_BACKEND, because engine reads it at import.
+    """
+    if service_url:
+        import engine_client
+        engine_client.ENGINE_SERVICE_URL = service_url.rstrip("/")
+        return engine_client
+    import engine
+    return engine
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramp concurrent simulated learners against the engine.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32],
+                        help="Concurrent users per stage")
+    parser.add_argument("--stage-seconds", type=float, default=20)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted action mix (default: {DEFAULT_MIX})")
+    parser.add_argument("--think-ms", type=float, default=500, help="Mean pause between a user's actions")
+    parser.add_argument("--service-url", default=None, help="Load a running service.py instead of the in-process engine")
+    parser.add_argument("--llm-backend", default=None, help="LLM_BACKEND for in-process runs (default: fake)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write stage results as JSON")
+    args = parser.parse_args()
+
+    # Default to the offline scripted model so runs measure the app, not the Groq quota
+    if args.llm_backend:
+        os.environ["LLM_BACKEND"] = args.llm_backend
+    else:
+        os.environ.setdefault("LLM_BACKEND", "fake")
+    mix = parse_mix(args.mix)
+    target = get_target(args.service_url)
+    where = args.service_url or f"in-process engine (LLM_BACKEND={os.environ.get('LLM_BACKEND')})"
+    print(f"Target: {where} | mix: {args.mix} | {args.stage_seconds:.0f}s per stage")
+
+    # One warm-up call so model and index loading is not counted in the first stage
+    action_chat(target, random.Random(args.seed), ROLES[0], 3, "load-warmup")
+
+    print(f"\n{'users':>6}{'req':>7}{'req/s':>8}{'err%':>7}{'ttft p50':>10}{'ttft p95':>10}"
+          f"{'lat p50':>10}{'lat p95':>10}{'lat p99':>10}{'rss MB':>9}")
+    stages = []
+    for concurrency in args.concurrency:
+        stage = run_stage(target, concurrency, args.stage_seconds, mix, args.think_ms, args.seed)
+        stages.append(stage)
+        fmt = lambda key: f"{stage[key]:10.0f}" if stage.get(key) is not None else f"{'-':>10}"
+        print(f"{concurrency:>6}{stage['requests']:>7}{stage['throughput_rps']:>8.2f}{stage['error_rate'] * 100:>7.1f}"
+              f"{fmt('ttft_p50_ms')}{fmt('ttft_p95_ms')}{fmt('latency_p50_ms')}{fmt('latency_p95_ms')}"
+              f"{fmt('latency_p99_ms')}{stage['rss_mb'] if stage['rss_mb'] is not None else '-':>9}")
+        for error in stage["sample_errors"]:
+            print(f"        error: {error[:120]}")
+
+    saturation = find_saturation(stages)
+    if saturation:
+        print(f"\nSaturation: throughput stops scaling beyond ~{saturation} concurrent users.")
+    else:
+        print("\nNo saturation point reached; try higher --concurrency.")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"mix": mix, "target": where, "stages": stages, "saturation": saturation}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,114 @@
 import streamlit as st
 import streamlit_mermaid as st_mermaid
+import os
+import uuid
 import plotly.graph_objects as go
-from engine import (
-    get_rag_response, 
-    generate_quiz_questions, 
-    search_learning_resources,
-    generate_scenario,
-    evaluate_scenario,
-    generate_flashcards,
-    generate_skill_web
-)
-from utils import get_directories, generate_pdf_report
+
+# With ENGINE_SERVICE_URL set, the UI talks to the shared engine service (service.py)
+# instead of loading the models and index into this process.
+USE_ENGINE_SERVICE = bool(os.environ.get("ENGINE_SERVICE_URL"))
+if USE_ENGINE_SERVICE:
+    from engine_client import (
+        get_rag_response,
+        build_roadmap_query,
+        generate_quiz_questions,
+        search_learning_resources,
+        generate_scenario,
+        evaluate_scenario,
+        generate_flashcards,
+        generate_skill_web,
+        set_usage_session,
+        get_token_usage
+    )
+else:
+    from engine import (
+        get_rag_response,
+        build_roadmap_query,
+        generate_quiz_questions,
+        search_learning_resources,
+        generate_scenario,
+        evaluate_scenario,
+        generate_flashcards,
+        generate_skill_web,
+        set_usage_session,
+        get_token_usage
+    )
+from utils import get_directories, generate_pdf_report, prepare_mermaid, COMPETENCIES
+from store import ProgressStore, CHAT_WINDOW
+from stream_render import StreamRenderer
+
+ROLES = ["Logistics Manager", "Supply Chain Analyst", "Warehouse Supervisor", "Procurement Specialist"]
 
 # Page Config
 st.set_page_config(page_title="Semiconductor Logistics AI-Upskiller", layout="wide")
 
+@st.cache_resource
+def get_store():
+    """
+    One SQLite progress store shared by all sessions in this process.
+    """
+    return ProgressStore()
+
+store = get_store()
+
+@st.cache_resource
+def get_prefetcher():
+    """
+    Shared background prefetcher for roadmap context (in-process engine only).
+    """
+    if USE_ENGINE_SERVICE:
+        return None
+    from prefetch import Prefetcher
+    return Prefetcher()
+
+prefetcher = get_prefetcher()
+
+@st.cache_resource
+def get_scenario_library():
+    """
+    Shared Fab Crisis scenario library (in-process engine only).
+    """
+    if USE_ENGINE_SERVICE:
+        return None
+    from scenario_library import ScenarioLibrary
+    return ScenarioLibrary()
+
+scenario_library = get_scenario_library()
+
+@st.cache_resource
+def get_analytics():
+    """
+    Shared quiz/scenario results store for the competency radar (needs pyarrow).
+    """
+    try:
+        from analytics import AnalyticsStore
+    except ImportError:
+        return None
+    return AnalyticsStore()
+
+analytics = get_analytics()
+
+def diagram_renderer(area, height, title=None):
+    """
+    on_mermaid callback for StreamRenderer: validate/repair the first diagram
+    and draw it in `area` as soon as its block has streamed in.
+    """
+    shown = []
+    def show(code):
+        if shown:
+            return
+        shown.append(code)
+        repaired = prepare_mermaid(code)
+        with area:
+            if repaired:
+                if title:
+                    st.subheader(title)
+                st_mermaid.st_mermaid(repaired, height=height)
+            else:
+                # Unrenderable: show the source, as the raw response did
+                st.markdown(f"```mermaid\n{code}\n```")
+    return show
+
 # Session State Initialization
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
@@ -26,14 +120,48 @@ if "scenario_data" not in st.session_state:
     st.session_state.scenario_data = None
 if "flashcards" not in st.session_state:
     st.session_state.flashcards = None
-if "roadmap_text" not in st.session_state:
-    st.session_state.roadmap_text = None
+if "roadmap_id" not in st.session_state:
+    st.session_state.roadmap_id = None
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex[:8]
+# Token usage from this script run is attributed to the browser session
+set_usage_session(st.session_state.session_id)
+
+def load_user(user_id):
+    """
+    Swap the session's small working set to another user's saved progress.
+    Roadmap text and older chat pages stay in the store until needed.
+    """
+    st.session_state.user_id = user_id
+    st.session_state.profile = store.get_profile(user_id)
+    st.session_state.chat_history = store.chat_page(user_id, limit=CHAT_WINDOW)
+    st.session_state.chat_pages_back = 0
+    latest = store.latest_quiz_attempt(user_id)
+    st.session_state.quiz_score = latest["score"] if latest else 0
+    st.session_state.quiz_data = None
+    st.session_state.scenario_data = None
+    st.session_state.roadmap_id = store.latest_roadmap_id(user_id)
+    st.session_state.flashcards = store.flashcard_deck(user_id) or None
+    st.session_state.card_idx = 0
 
 # Sidebar
 with st.sidebar:
     st.title("Settings")
-    role = st.selectbox("Select Your Role", ["Logistics Manager", "Supply Chain Analyst", "Warehouse Supervisor", "Procurement Specialist"])
-    ai_literacy = st.slider("AI Literacy Level", 1, 5, 3)
+    user_id = st.text_input("User ID", placeholder="Leave blank for a guest session").strip() or f"guest-{st.session_state.session_id}"
+    if st.session_state.get("user_id") != user_id:
+        load_user(user_id)
+    profile = st.session_state.profile or {}
+
+    role = st.selectbox("Select Your Role", ROLES, index=ROLES.index(profile.get("role", ROLES[0])) if profile.get("role") in ROLES else 0)
+    ai_literacy = st.slider("AI Literacy Level", 1, 5, profile.get("ai_literacy") or 3)
+    if (role, ai_literacy) != (profile.get("role"), profile.get("ai_literacy")):
+        store.save_profile(user_id, role, ai_literacy)
+        st.session_state.profile = {"role": role, "ai_literacy": ai_literacy}
+
+    # Settings changed: start retrieving the roadmap context before the user asks for it
+    if prefetcher and st.session_state.get("prefetched_for") != (role, ai_literacy):
+        prefetcher.schedule(st.session_state.session_id, role, ai_literacy)
+        st.session_state.prefetched_for = (role, ai_literacy)
     
     st.divider()
     
@@ -42,26 +170,29 @@ with st.sidebar:
     # NEW: Competency Radar
     st.subheader("Competency Radar")
     
-    # Mock data based on role/level for visualization
-    categories = ['Data Literacy', 'Logistics Ops', 'AI Strategy', 'Safety', 'Procurement']
-    
-    # Base skills + variance based on user selection
-    base_val = ai_literacy
-    if role == "Logistics Manager":
-        values = [base_val, base_val+1, base_val, base_val, base_val-1]
-    elif role == "Supply Chain Analyst":
-        values = [base_val+2, base_val, base_val+1, base_val-1, base_val]
+    # Levels from graded quiz answers and scenarios, starting from the self-assessed literacy
+    categories = COMPETENCIES
+    if analytics:
+        competency_levels = analytics.user_vector(user_id, ai_literacy)["levels"]
+        cohort = analytics.cohort_summary(role)
     else:
-        values = [base_val, base_val, base_val, base_val, base_val]
-        
-    # Cap at 5
-    values = [min(v, 5) for v in values]
+        competency_levels, cohort = {c: ai_literacy for c in categories}, None
+    values = [competency_levels[c] for c in categories]
+    weakest_competency = min(categories, key=competency_levels.get)
     
     fig = go.Figure(data=go.Scatterpolar(
       r=values,
       theta=categories,
-      fill='toself'
+      fill='toself',
+      name="You"
     ))
+    if cohort and cohort["learners"] > 1:
+        fig.add_trace(go.Scatterpolar(
+          r=[cohort["mean"][c] for c in categories],
+          theta=categories,
+          name=f"{role} cohort",
+          line=dict(dash="dot")
+        ))
     
     fig.update_layout(
       polar=dict(
@@ -69,7 +200,7 @@ with st.sidebar:
           visible=True,
           range=[0, 5]
         )),
-      showlegend=False,
+      showlegend=len(fig.data) > 1,
       margin=dict(l=20, r=20, t=20, b=20),
       height=250
     )
@@ -81,12 +212,18 @@ with st.sidebar:
     # NEW: PDF Export
     if st.button("📄 Prepare Career Report"):
         with st.spinner("Compiling Skill-Gap Report..."):
-            pdf_bytes = generate_pdf_report(
-                role, 
-                ai_literacy, 
-                st.session_state.quiz_score, 
-                st.session_state.get("roadmap_text")
-            )
+            error = "Could not generate PDF. Is 'fpdf2' installed?"
+            try:
+                pdf_bytes = generate_pdf_report(
+                    role, 
+                    ai_literacy, 
+                    st.session_state.quiz_score, 
+                    store.get_roadmap(st.session_state.roadmap_id),
+                    competencies=competency_levels
+                )
+            except RuntimeError as e:
+                # The legacy PyFPDF installed instead of fpdf2
+                pdf_bytes, error = None, str(e)
             
             if pdf_bytes:
                 st.download_button(
@@ -96,8 +233,19 @@ with st.sidebar:
                     mime="application/pdf"
                 )
             else:
-                st.error("Could not generate PDF. Is 'fpdf' installed?")
+                st.error(error)
     
+    with st.expander("Token usage"):
+        usage = get_token_usage(st.session_state.session_id)
+        session_usage = usage.get("session") or {}
+        st.caption(
+            f"This session: {session_usage.get('prompt_tokens', 0):,} prompt + "
+            f"{session_usage.get('completion_tokens', 0):,} completion tokens over {session_usage.get('calls', 0)} calls. "
+            f"All sessions, last minute: {usage['tokens_last_minute']:,} tokens."
+        )
+        for mode, totals in usage["by_mode"].items():
+            st.caption(f"{mode}: {totals['calls']} calls, {totals['prompt_tokens'] + totals['completion_tokens']:,} tokens")
+
     st.info("Adjust settings to personalize your learning path.")
 
 # Main Interface
@@ -185,21 +333,27 @@ with tab_about:
 with tab1:
     st.header("Career & Competency Chat")
     
+    # Older messages are paged in from the store on request, not kept in the session
+    if len(st.session_state.chat_history) >= CHAT_WINDOW and st.button("Show earlier messages"):
+        st.session_state.chat_pages_back += 1
+    earlier = []
+    if st.session_state.chat_pages_back:
+        earlier = store.chat_page(user_id, limit=CHAT_WINDOW * st.session_state.chat_pages_back,
+                                  offset=len(st.session_state.chat_history))
+
     # Display chat history
-    for message in st.session_state.chat_history:
+    for message in earlier + st.session_state.chat_history:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
     # Chat input
     if prompt := st.chat_input("Ask about competencies, standards, or training..."):
         st.session_state.chat_history.append({"role": "user", "content": prompt})
+        store.add_chat_message(user_id, "user", prompt)
         with st.chat_message("user"):
             st.markdown(prompt)
 
         with st.chat_message("assistant"):
-            response_placeholder = st.empty()
-            full_response = ""
-            
             # Stream response
             # Use "chat" mode for general Q&A
             raw_stream = get_rag_response(
@@ -208,27 +362,15 @@ with tab1:
                 ai_literacy_level=ai_literacy, 
                 generation_mode="chat"
             )
-            for chunk in raw_stream:
-                full_response += chunk
-                response_placeholder.markdown(full_response + "▌")
-            
-            # Final render to remove cursor
-            
-            # Check for Mermaid
-            import re
-            mermaid_match = re.search(r"```mermaid\n(.*?)\n```", full_response, re.DOTALL)
-            
-            if mermaid_match:
-                mermaid_code = mermaid_match.group(1)
-                # Remove the mermaid block from the text display so it doesn't show raw code
-                clean_text = full_response.replace(mermaid_match.group(0), "")
-                response_placeholder.markdown(clean_text)
-                with st.chat_message("assistant"):
-                    st_mermaid.st_mermaid(mermaid_code, height="500px")
-            else:
-                response_placeholder.markdown(full_response)
+            # Finished paragraphs render once; Mermaid blocks are drawn below instead of shown as code
+            text_area = st.container()
+            renderer = StreamRenderer(text_area, on_mermaid=diagram_renderer(st.container(), "500px"))
+            full_response = renderer.feed(raw_stream)
             
         st.session_state.chat_history.append({"role": "assistant", "content": full_response})
+        store.add_chat_message(user_id, "assistant", full_response)
+        # Keep only the recent window in memory; the rest is in the store
+        del st.session_state.chat_history[:-CHAT_WINDOW]
 
 # Tab 2: Learning Path
 with tab2:
@@ -237,67 +379,25 @@ with tab2:
     
     if st.button("Generate Roadmap"):
         with st.spinner("Generating roadmap..."):
-            # Prompt specifically for a roadmap
-            roadmap_query = f"Create a comprehensive learning roadmap for a {role} with AI literacy level {ai_literacy} in the semiconductor industry. Include a mermaid chart."
-            
-            response_stream = get_rag_response(
-                roadmap_query, 
-                role, 
-                ai_literacy, 
-                generation_mode="roadmap"
-            )
-            full_text = ""
-            placeholder = st.empty()
-            
-            for chunk in response_stream:
-                full_text += chunk
-                placeholder.markdown(full_text + "▌")
-            
-            # Save for PDF export
-            st.session_state.roadmap_text = full_text
-            
-            # Parse and cleanup
-            import re
-            mermaid_match = re.search(r"```mermaid\n(.*?)\n```", full_text, re.DOTALL)
-            
-            if mermaid_match:
-                mermaid_code = mermaid_match.group(1)
-                
-                # SANITIZE: Remove parentheses from node labels to prevent syntax errors
-                # Replace patterns like: id["Text (with parens)"] -> id["Text - with parens"]
-                # Also: id("Text (with parens)") -> id["Text - with parens"]
-                def sanitize_mermaid(code):
-                    # 1. Handle parentheses inside quoted labels
-                    def replace_parens(match):
-                        label = match.group(1)
-                        # Replace ( and ) with - 
-                        label = label.replace('(', ' - ').replace(')', '')
-                        # Also replace other problematic chars like : if not needed
-                        label = label.replace(":", " -")
-                        return f'["{label}"]'
-                    
-                    code = re.sub(r'\["([^"]*)"\]', replace_parens, code)
-                    code = re.sub(r'\("([^"]*)"\)', replace_parens, code)
-                    
-                    # 2. Fix unquoted labels with parentheses e.g. id(Label Text)
-                    # This is harder but common. We can try to just remove all () if they are not part of node def
-                    # or just brutal search replace.
-                    # A safer way: ensure all nodes are id["Label"] format
-                    
-                    # 3. Ensure graph TD logic is preserved but cleanup syntax
-                    if "graph TD" not in code:
-                        code = "graph TD\n" + code
-                        
-                    return code
-                
-                mermaid_code = sanitize_mermaid(mermaid_code)
-                
-                clean_text = full_text.replace(mermaid_match.group(0), "")
-                placeholder.markdown(clean_text)
-                st.subheader("Visual Roadmap")
-                st_mermaid.st_mermaid(mermaid_code, height="800px")
+            if prefetcher:
+                # Uses the context prefetched when the settings changed
+                response_stream = prefetcher.roadmap_stream(st.session_state.session_id, role, ai_literacy)
             else:
-                placeholder.markdown(full_text)
+                # Prompt specifically for a roadmap
+                roadmap_query = build_roadmap_query(role, ai_literacy)
+
+                response_stream = get_rag_response(
+                    roadmap_query,
+                    role,
+                    ai_literacy,
+                    generation_mode="roadmap"
+                )
+            text_area = st.container()
+            renderer = StreamRenderer(text_area, on_mermaid=diagram_renderer(st.container(), "800px", "Visual Roadmap"))
+            full_text = renderer.feed(response_stream)
+            
+            # Save for PDF export; the session only keeps the id
+            st.session_state.roadmap_id = store.save_roadmap(user_id, role, ai_literacy, full_text)
 
             # Recommended Resources
             st.divider()
@@ -348,6 +448,12 @@ with tab3:
                             score += 1
                 
                 st.session_state.quiz_score = score
+                store.record_quiz_attempt(user_id, role, ai_literacy, score, len(questions))
+                if analytics:
+                    analytics.record_quiz(user_id, role, ai_literacy, questions, [
+                        q['options'].index(a) if a else None
+                        for q, a in zip(questions, st.session_state.user_answers)
+                    ])
                 st.success(f"You scored {score}/{len(questions)}!")
                 
                 # Quiz Review
@@ -372,13 +478,23 @@ with tab4:
     st.header("🏭 The Fab Crisis Simulator")
     st.markdown("Test your knowledge in a risk-free text-based simulation.")
     
+    target_weakest = st.checkbox(f"Target my weakest competency ({weakest_competency})")
     if st.button("Start New Scenario"):
         with st.spinner("Initializing Fab Crisis..."):
-            st.session_state.scenario_data = generate_scenario(role, ai_literacy)
+            scenario = None
+            if scenario_library:
+                # Served from the pre-generated library; live generation only refills it
+                scenario = scenario_library.next_scenario(
+                    user_id, role, ai_literacy,
+                    competency=weakest_competency if target_weakest else None
+                )
+            st.session_state.scenario_data = scenario or generate_scenario(role, ai_literacy)
             
     if st.session_state.scenario_data:
         data = st.session_state.scenario_data
         st.warning(f"🚨 ALERT: {data.get('scenario', 'Unknown Error')}")
+        if data.get("competency"):
+            st.caption(f"Competency: {data['competency']}")
         st.markdown(f"**Your Challenge:** {data.get('question', '')}")
         
         user_action = st.text_area("How do you respond?", placeholder="I would use Predictive Maintenance tools because...")
@@ -387,11 +503,33 @@ with tab4:
             if user_action:
                 with st.spinner("Supervisor evaluating..."):
                     feedback = evaluate_scenario(data, user_action)
+                    store.record_scenario_attempt(user_id, role, ai_literacy, data, user_action, feedback)
+                    if analytics:
+                        analytics.record_scenario(user_id, role, ai_literacy, data, feedback)
                     st.success("Analysis Complete")
                     st.markdown(f"### 🤖 Supervisor Feedback:\n{feedback}")
             else:
                 st.error("Please enter a response.")
 
+        # Instructor-led sessions: grade a whole cohort's answers to this scenario in a few calls
+        if not USE_ENGINE_SERVICE:
+            with st.expander("👩‍🏫 Instructor: grade a cohort's answers"):
+                uploaded = st.file_uploader("CSV with 'name' and 'response' columns", type="csv")
+                if uploaded and st.button("Grade Cohort"):
+                    import csv
+                    import io
+                    from batch_grading import grade_cohort
+                    rows = [r for r in csv.DictReader(io.StringIO(uploaded.getvalue().decode("utf-8-sig")))
+                            if (r.get("response") or "").strip()]
+                    with st.spinner(f"Grading {len(rows)} responses..."):
+                        grades, stats = grade_cohort(data, [r["response"] for r in rows])
+                    st.caption(f"{stats['llm_calls']} LLM calls, {stats['cache_hits']} cached grades.")
+                    st.dataframe([
+                        {"name": r.get("name", ""), "grade": g["grade"], "rationale": g["rationale"],
+                         "competencies": ", ".join(g["competencies"])}
+                        for r, g in zip(rows, grades)
+                    ], width="stretch")
+
 # NEW: Tab 5 - Smart-Study Flashcards
 with tab5:
     st.header("🧠 Smart-Study Flashcards")
@@ -399,6 +537,9 @@ with tab5:
     if st.button("Generate Deck"):
         with st.spinner("Extracting key terms..."):
             st.session_state.flashcards = generate_flashcards(topic="Semiconductor Logistics")
+            st.session_state.card_idx = 0
+            if st.session_state.flashcards:
+                store.save_flashcards(user_id, st.session_state.flashcards)
             
     if st.session_state.flashcards:
         cards = st.session_state.flashcards
@@ -421,10 +562,12 @@ with tab5:
         col_prev, col_next = st.columns(2)
         with col_prev:
             if st.button("⬅️ Previous"):
+                store.record_flashcard_review(user_id, current_card["term"])
                 st.session_state.card_idx = max(0, st.session_state.card_idx - 1)
                 st.rerun()
         with col_next:
             if st.button("Next ➡️"):
+                store.record_flashcard_review(user_id, current_card["term"])
                 st.session_state.card_idx = min(len(cards) - 1, st.session_state.card_idx + 1)
                 st.rerun()
     elif st.session_state.flashcards is not None:
@@ -435,14 +578,13 @@ with tab6:
     st.header("🕸️ The Interactive Skill-Web")
     st.markdown("Visual knowledge discovery.")
     
-    if st.button("Generate Skill Web"):
+    col_gen, col_regen = st.columns(2)
+    generate_clicked = col_gen.button("Generate Skill Web")
+    regenerate_clicked = col_regen.button("🔄 Regenerate")
+    if generate_clicked or regenerate_clicked:
         with st.spinner("Weaving the web..."):
-            mermaid_graph = generate_skill_web(role)
-            # Ensure safe Syntax
-            if "graph TD" not in mermaid_graph and "graph LR" not in mermaid_graph:
-                mermaid_graph = "graph TD\n" + mermaid_graph
-            
-            st.session_state.skill_web_code = mermaid_graph
+            # Validated diagrams are cached per role; regenerate bypasses the cache
+            st.session_state.skill_web_code = generate_skill_web(role, refresh=regenerate_clicked)
             
     if "skill_web_code" in st.session_state:
         if st.session_state.skill_web_code:
@@ -484,11 +626,8 @@ with tab7:
             )
             
             st.divider()
-            output_container = st.empty()
-            full_text = ""
-            for chunk in stream:
-                full_text += chunk
-                output_container.markdown(full_text + "▌")
-            
-            output_container.markdown(full_text)
+            # Diagrams in a research answer are drawn below the text, as in the chat tab
+            text_area = st.container()
+            renderer = StreamRenderer(text_area, on_mermaid=diagram_renderer(st.container(), "500px"))
+            full_text = renderer.feed(stream)
 
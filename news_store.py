@@ -0,0 +1,123 @@
+import os
+import time
+import hashlib
+import argparse
+import threading
+import chromadb
+
+# Configuration
+NEWS_DB_PATH = os.environ.get("NEWS_DB_PATH", "news_db")
+NEWS_COLLECTION = "web_news"
+NEWS_FRESH_HOURS = float(os.environ.get("NEWS_FRESH_HOURS", 12))   # younger hits are served without a web search
+NEWS_TTL_HOURS = float(os.environ.get("NEWS_TTL_HOURS", 72))       # older passages are evicted
+NEWS_MAX_PASSAGES = int(os.environ.get("NEWS_MAX_PASSAGES", 20000))  # oldest fetches are evicted beyond this
+NEWS_MIN_SCORE = 0.5   # cosine similarity for a stored passage to count as on-topic
+NEWS_MIN_HITS = 4      # on-topic fresh passages needed to skip the web
+
+def url_key(url):
+    from research import normalize_url
+    return hashlib.sha1(normalize_url(url).encode("utf-8")).hexdigest()[:16]
+
+class NewsStore:
+    """
+    Web research passages kept in their own persistent Chroma collection (next to
+    the curated chroma_db), stamped with their fetch time so freshness can be checked.
+    Re-fetching a URL replaces its passages; expired and excess passages are evicted.
+    """
+
+    def __init__(self, path=NEWS_DB_PATH, ttl_hours=NEWS_TTL_HOURS, max_passages=NEWS_MAX_PASSAGES):
+        self.ttl = ttl_hours * 3600
+        self.max_passages = max_passages
+        self._client = chromadb.PersistentClient(path=path)
+        self._collection = self._client.get_or_create_collection(NEWS_COLLECTION, metadata={"hnsw:space": "cosine"})
+        self._lock = threading.Lock()
+
+    def count(self):
+        return self._collection.count()
+
+    def add(self, passages, vectors, query=""):
+        """
+        Store passages (dicts with "title", "url", "text") with their precomputed
+        embeddings. Passages already stored for the same URLs are replaced.
+        Returns the number stored.
+        """
+        if not passages:
+            return 0
+        now = time.time()
+        keys = [url_key(p["url"]) for p in passages]
+        ids, seen = [], {}
+        for key in keys:
+            seen[key] = seen.get(key, -1) + 1
+            ids.append(f"{key}-{seen[key]}")
+        metadatas = [{"url": p["url"], "url_key": key, "title": p.get("title", ""), "query": query, "fetched_at": now}
+                     for p, key in zip(passages, keys)]
+        with self._lock:
+            self._collection.delete(where={"url_key": {"$in": list(seen)}})
+            self._collection.add(ids=ids, embeddings=[list(map(float, v)) for v in vectors],
+                                 metadatas=metadatas, documents=[p["text"] for p in passages])
+        self.evict()
+        return len(ids)
+
+    def search(self, query_vector, k=8, max_age_hours=None):
+        """
+        Return up to k stored passages nearest the query, best first, each with
+        "score" (cosine similarity) and "age_hours". max_age_hours defaults to the TTL.
+        """
+        max_age = max_age_hours * 3600 if max_age_hours is not None else self.ttl
+        now = time.time()
+        with self._lock:
+            available = self._collection.count()
+            if not available:
+                return []
+            result = self._collection.query(
+                query_embeddings=[list(map(float, query_vector))], n_results=min(k, available),
+                where={"fetched_at": {"$gte": now - max_age}}, include=["documents", "metadatas", "distances"])
+        hits = []
+        for text, meta, distance in zip(result["documents"][0], result["metadatas"][0], result["distances"][0]):
+            hits.append({"title": meta.get("title", ""), "url": meta["url"], "text": text,
+                         "score": 1.0 - float(distance), "age_hours": (now - meta["fetched_at"]) / 3600})
+        return hits
+
+    def evict(self, now=None):
+        """
+        Drop passages older than the TTL, then the oldest fetches beyond max_passages.
+        Returns the number removed.
+        """
+        now = now or time.time()
+        with self._lock:
+            before = self._collection.count()
+            self._collection.delete(where={"fetched_at": {"$lt": now - self.ttl}})
+            excess = self._collection.count() - self.max_passages
+            if excess > 0:
+                rows = self._collection.get(include=["metadatas"])
+                by_age = sorted(zip(rows["ids"], rows["metadatas"]), key=lambda r: r[1]["fetched_at"])
+                self._collection.delete(ids=[row_id for row_id, _ in by_age[:excess]])
+            return before - self._collection.count()
+
+    def stats(self):
+        with self._lock:
+            rows = self._collection.get(include=["metadatas"])
+        fetched = [m["fetched_at"] for m in rows["metadatas"]]
+        now = time.time()
+        return {
+            "passages": len(fetched),
+            "urls": len({m["url_key"] for m in rows["metadatas"]}),
+            "fresh": sum(1 for t in fetched if now - t <= NEWS_FRESH_HOURS * 3600),
+            "oldest_hours": round((now - min(fetched)) / 3600, 1) if fetched else None,
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or evict the web research news collection.")
+    parser.add_argument("--evict", action="store_true", help="Remove expired and excess passages")
+    parser.add_argument("--path", default=NEWS_DB_PATH)
+    args = parser.parse_args()
+
+    store = NewsStore(args.path)
+    if args.evict:
+        print(f"Evicted {store.evict()} passages.")
+    stats = store.stats()
+    print(f"{stats['passages']} passages from {stats['urls']} URLs, {stats['fresh']} fresher than "
+          f"{NEWS_FRESH_HOURS:g}h, oldest {stats['oldest_hours']}h (TTL {NEWS_TTL_HOURS:g}h).")
+
+if __name__ == "__main__":
+    main()
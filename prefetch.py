@@ -0,0 +1,196 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+from engine import build_context, get_rag_response
+from utils import build_roadmap_query
+
+# Configuration
+PREFETCH_TTL = float(os.environ.get("PREFETCH_TTL", 120))  # seconds a prefetched result stays usable
+# Also start the roadmap generation itself (spends LLM tokens on settings the user may not keep)
+PREFETCH_GENERATION = os.environ.get("PREFETCH_GENERATION", "0") == "1"
+PREFETCH_CACHE_SIZE = 32
+
+class BufferedStream:
+    """
+    Tokens produced by a background generation, readable while it is still running.
+    """
+
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self._cond = threading.Condition()
+
+    def append(self, token):
+        with self._cond:
+            self.tokens.append(token)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+
+    def __iter__(self):
+        i = 0
+        while True:
+            with self._cond:
+                while i >= len(self.tokens) and not self.done:
+                    self._cond.wait()
+                pending = self.tokens[i:]
+                finished, error = self.done, self.error
+            yield from pending
+            i += len(pending)
+            if finished and i >= len(self.tokens):
+                if error:
+                    raise error
+                return
+
+class Prefetcher:
+    """
+    Speculatively retrieves roadmap context (and optionally generates the roadmap)
+    as soon as a session's role or literacy level changes.
+
+    One background worker; each session has a generation token, so scheduling
+    again cancels that session's queued work and makes running work stop early.
+    Results live in a short-lived cache keyed by the roadmap query.
+    """
+
+    def __init__(self, ttl=PREFETCH_TTL, generate=PREFETCH_GENERATION, max_workers=1):
+        self.ttl = ttl
+        self.generate = generate
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._tokens = {}     # session -> current generation token
+        self._last_scheduled = {}  # session -> monotonic time of its last schedule()
+        self._futures = {}    # session -> (query, future, context-ready event)
+        self._contexts = {}   # query -> (expires_at, context)
+        self._streams = {}    # (session, query) -> (expires_at, BufferedStream)
+        self.stats = {"scheduled": 0, "cancelled": 0, "superseded": 0, "context_hits": 0,
+                      "stream_hits": 0, "misses": 0}
+
+    def _current(self, session, token):
+        return self._tokens.get(session) == token
+
+    def _cached_context(self, query):
+        entry = self._contexts.get(query)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        self._contexts.pop(query, None)
+        return None
+
+    def _store_context(self, query, context):
+        with self._lock:
+            self._contexts[query] = (time.monotonic() + self.ttl, context)
+            # Drop expired entries, then the oldest, to stay bounded
+            now = time.monotonic()
+            for key in [k for k, (exp, _) in self._contexts.items() if exp <= now]:
+                del self._contexts[key]
+            while len(self._contexts) > PREFETCH_CACHE_SIZE:
+                del self._contexts[next(iter(self._contexts))]
+
+    def _prune(self, now):
+        """
+        Forget sessions idle for longer than the TTL whose work has finished, and expired streams.
+        Called with the lock held.
+        """
+        idle = [s for s, t in self._last_scheduled.items()
+                if now - t > self.ttl and (s not in self._futures or self._futures[s][1].done())]
+        for session in idle:
+            del self._last_scheduled[session]
+            self._tokens.pop(session, None)
+            self._futures.pop(session, None)
+        self._streams = {k: v for k, v in self._streams.items() if v[0] > now and k[0] in self._last_scheduled}
+
+    def schedule(self, session, role, ai_literacy_level):
+        """
+        Start prefetching the roadmap for these settings, superseding the session's previous prefetch.
+        """
+        query = build_roadmap_query(role, ai_literacy_level)
+        with self._lock:
+            token = self._tokens.get(session, 0) + 1
+            self._tokens[session] = token
+            self._last_scheduled[session] = time.monotonic()
+            previous = self._futures.pop(session, None)
+            if previous and previous[1].cancel():
+                self.stats["cancelled"] += 1
+                previous[2].set()
+            self._streams = {k: v for k, v in self._streams.items() if k[0] != session}
+            self._prune(time.monotonic())
+            self.stats["scheduled"] += 1
+            ready = threading.Event()
+            future = self._executor.submit(self._run, session, token, query, role, ai_literacy_level, ready)
+            self._futures[session] = (query, future, ready)
+        return future
+
+    def _run(self, session, token, query, role, ai_literacy_level, ready):
+        if not self._current(session, token):
+            self.stats["superseded"] += 1
+            ready.set()
+            return None
+        stream = None
+        try:
+            with self._lock:
+                context = self._cached_context(query)
+            if context is None:
+                context = build_context(query, generation_mode="roadmap")
+                self._store_context(query, context)
+            if self.generate and self._current(session, token):
+                # Registered before `ready` is set so a waiting click picks it up
+                stream = BufferedStream()
+                with self._lock:
+                    self._streams[(session, query)] = (time.monotonic() + self.ttl, stream)
+        finally:
+            ready.set()
+
+        if stream is None:
+            return context
+        try:
+            for chunk in get_rag_response(query, role, ai_literacy_level, generation_mode="roadmap",
+                                          context=context, session_id=session):
+                if not self._current(session, token):
+                    # Settings changed mid-generation: stop spending tokens
+                    self.stats["superseded"] += 1
+                    stream.finish(CancelledError("Prefetch superseded"))
+                    return context
+                stream.append(chunk)
+            stream.finish()
+        except Exception as e:
+            stream.finish(e)
+        return context
+
+    def roadmap_stream(self, session, role, ai_literacy_level):
+        """
+        Token stream for the roadmap: the prefetched generation if there is one,
+        else a fresh generation over the prefetched (or in-flight) context.
+        """
+        query = build_roadmap_query(role, ai_literacy_level)
+        with self._lock:
+            in_flight = self._futures.get(session)
+        if in_flight and in_flight[0] == query:
+            if in_flight[1].cancel():
+                # Still queued behind other work: retrieve inline instead
+                in_flight[2].set()
+            else:
+                # Already running: wait for its context instead of repeating the retrieval
+                in_flight[2].wait(timeout=self.ttl)
+
+        with self._lock:
+            entry = self._streams.pop((session, query), None)
+            if entry and entry[0] > time.monotonic() and entry[1].error is None:
+                self.stats["stream_hits"] += 1
+                return iter(entry[1])
+            context = self._cached_context(query)
+
+        if context is not None:
+            self.stats["context_hits"] += 1
+        else:
+            self.stats["misses"] += 1
+        return get_rag_response(query, role, ai_literacy_level, generation_mode="roadmap",
+                                context=context, session_id=session)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,117 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# Configuration
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_OVERFETCH = 4          # Candidates fetched per final result
+RERANK_LATENCY_BUDGET_MS = 300
+RERANK_CACHE_SIZE = 4096
+RERANK_BATCH_SIZE = 32
+
+class CrossEncoderReranker:
+    """
+    Re-orders retrieved chunks with a small CPU cross-encoder.
+    All uncached (query, chunk) pairs are scored in one batch, scores are
+    cached, and the stage skips itself when the estimated scoring time
+    would exceed the latency budget.
+    """
+
+    def __init__(self, model_name=RERANK_MODEL, budget_ms=RERANK_LATENCY_BUDGET_MS,
+                 cache_size=RERANK_CACHE_SIZE, batch_size=RERANK_BATCH_SIZE):
+        self.model_name = model_name
+        self.budget_ms = budget_ms
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self._model = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # Running estimate of the cost of one batch call: fixed overhead + per pair
+        self._overhead_ms = None
+        self._per_pair_ms = None
+        self.stats = {"calls": 0, "skipped": 0, "pairs_scored": 0, "cache_hits": 0, "last_ms": 0.0}
+
+    def _get_model(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+            self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    @staticmethod
+    def _pair_key(query, text):
+        return hashlib.sha1(f"{query}\x00{text}".encode("utf-8")).hexdigest()
+
+    def estimate_ms(self, n_pairs):
+        """
+        Predicted time to score `n_pairs` uncached pairs, or None before the first call.
+        """
+        if self._per_pair_ms is None:
+            return None
+        return self._overhead_ms + self._per_pair_ms * n_pairs
+
+    def _record_timing(self, n_pairs, elapsed_ms):
+        # Exponentially weighted, so the estimate follows the machine's current load
+        per_pair = elapsed_ms / max(n_pairs, 1)
+        overhead = min(elapsed_ms * 0.2, 20.0)
+        if self._per_pair_ms is None:
+            self._per_pair_ms, self._overhead_ms = per_pair, overhead
+        else:
+            self._per_pair_ms = 0.7 * self._per_pair_ms + 0.3 * per_pair
+            self._overhead_ms = 0.7 * self._overhead_ms + 0.3 * overhead
+
+    def score(self, query, texts):
+        """
+        Return a relevance score per text, using the cache where possible.
+        """
+        keys = [self._pair_key(query, t) for t in texts]
+        scores = [None] * len(texts)
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[i] = self._cache[key]
+        missing = [i for i, s in enumerate(scores) if s is None]
+        self.stats["cache_hits"] += len(texts) - len(missing)
+
+        if missing:
+            model = self._get_model()
+            start = time.perf_counter()
+            predicted = model.predict([(query, texts[i]) for i in missing], batch_size=self.batch_size)
+            self._record_timing(len(missing), (time.perf_counter() - start) * 1000)
+            self.stats["pairs_scored"] += len(missing)
+            with self._lock:
+                for i, value in zip(missing, predicted):
+                    scores[i] = float(value)
+                    self._cache[keys[i]] = scores[i]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return scores
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def rerank(self, query, docs, k):
+        """
+        Return the k best documents. Falls back to the retriever's order when
+        the predicted scoring time exceeds the budget.
+        """
+        self.stats["calls"] += 1
+        if len(docs) <= 1:
+            return docs[:k]
+
+        with self._lock:
+            uncached = sum(1 for d in docs if self._pair_key(query, d.page_content) not in self._cache)
+        estimate = self.estimate_ms(uncached)
+        if uncached and estimate is not None and estimate > self.budget_ms:
+            self.stats["skipped"] += 1
+            # Relax the estimate so a stale slow measurement does not disable re-ranking forever
+            self._per_pair_ms *= 0.9
+            return docs[:k]
+
+        start = time.perf_counter()
+        scores = self.score(query, [d.page_content for d in docs])
+        self.stats["last_ms"] = (time.perf_counter() - start) * 1000
+        ranked = sorted(zip(scores, range(len(docs))), key=lambda pair: -pair[0])
+        return [docs[i] for _, i in ranked[:k]]
@@ -0,0 +1,354 @@
+import re
+import json
+import time
+import argparse
+import datetime
+from html import unescape
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import requests
+
+from dedup import near_duplicate_clusters
+from flat_index import FlatIndex
+from validate_links import make_session
+
+# Configuration
+RESEARCH_BUDGET_S = 20.0        # wall clock for search + fetch + ranking
+SEARCH_RESULTS_PER_QUERY = 8
+MAX_PAGES_TO_FETCH = 8
+FETCH_TIMEOUT = 4               # seconds per page (connect + read)
+MAX_PAGE_BYTES = 1_500_000
+PASSAGE_CHARS = 800
+PASSAGE_OVERLAP = 100
+TOP_PASSAGES = 8
+MAX_PASSAGES_PER_SOURCE = 2
+RESEARCH_CONTEXT_TOKENS = 1600  # passages packed into the prompt
+EMBED_RESERVE_S = 3.0           # budget kept back for embedding and ranking
+
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref|ref_src)$", re.IGNORECASE)
+_SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg"}
+_BLOCK_TAGS = {"p", "div", "li", "h1", "h2", "h3", "h4", "br", "tr", "section", "article"}
+
+def expand_queries(query, role=None):
+    """
+    Sub-queries covering the preset from several angles (news, analysis, role impact).
+    Deterministic templates, so no LLM round trip is spent before searching.
+    """
+    year = datetime.date.today().year
+    core = re.sub(r"\s*\b(in |for )?20\d\d\b", "", query).strip()
+    queries = [
+        query,
+        f"{core} {year} news",
+        f"{core} analysis report",
+        f"{core} semiconductor logistics impact",
+    ]
+    if role and role.lower() not in query.lower():
+        queries.append(f"{core} implications for {role}")
+    seen, unique = set(), []
+    for q in queries:
+        key = " ".join(q.lower().split())
+        if key not in seen:
+            seen.add(key)
+            unique.append(" ".join(q.split()))
+    return unique
+
+def normalize_url(url):
+    """
+    Canonical form for deduplication: lowercase host without www, no fragment,
+    no tracking parameters, no trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not _TRACKING_PARAMS.match(k)])
+    return urlunsplit(("https", host, parts.path.rstrip("/") or "/", query, ""))
+
+def _search_one(query, max_results):
+    from duckduckgo_search import DDGS
+    with DDGS() as ddgs:
+        return [dict(r, query=query) for r in ddgs.text(query, max_results=max_results)]
+
+def search_all(queries, deadline, max_results=SEARCH_RESULTS_PER_QUERY, pool=None):
+    """
+    Run all sub-queries concurrently; queries still running at the deadline are dropped.
+    Returns (results, errors).
+    """
+    results, errors = [], []
+    own_pool = pool is None
+    pool = pool or ThreadPoolExecutor(max_workers=len(queries))
+    try:
+        futures = {pool.submit(_search_one, q, max_results): q for q in queries}
+        done, _ = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+        for future in done:
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                errors.append(f"{futures[future]}: {e}")
+    finally:
+        if own_pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+    return results, errors
+
+def dedupe_results(results):
+    """
+    Drop repeated URLs, then near-duplicate snippets (syndicated copies of one story).
+    Keeps first-seen order, which follows search rank.
+    """
+    by_url = {}
+    for r in results:
+        url = r.get("href")
+        if url and normalize_url(url) not in by_url:
+            by_url[normalize_url(url)] = r
+    unique = list(by_url.values())
+    clusters = near_duplicate_clusters([f"{r.get('title', '')} {r.get('body', '')}" for r in unique])
+    drop = {i for cluster in clusters for i in cluster[1:]}
+    return [r for i, r in enumerate(unique) if i not in drop]
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.title = ""
+        self._skip = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS and self._skip:
+            self._skip -= 1
+        elif tag == "title":
+            self._in_title = False
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip:
+            self.parts.append(data)
+
+def extract_text(html):
+    """
+    Readable text of an HTML page: scripts, styles and page chrome removed, whitespace collapsed.
+    """
+    parser = _TextExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass
+    lines = (" ".join(unescape(line).split()) for line in "".join(parser.parts).split("\n"))
+    # Short lines are mostly menus, buttons and captions
+    return "\n".join(line for line in lines if len(line) > 40)
+
+def fetch_page(session, url, timeout=FETCH_TIMEOUT):
+    """
+    Download and extract one page, reading at most MAX_PAGE_BYTES.
+    """
+    with session.get(url, timeout=timeout, stream=True) as r:
+        r.raise_for_status()
+        if "html" not in r.headers.get("Content-Type", "text/html"):
+            return ""
+        body = b""
+        for block in r.iter_content(64 * 1024):
+            body += block
+            if len(body) >= MAX_PAGE_BYTES:
+                break
+        return extract_text(body.decode(r.encoding or "utf-8", errors="replace"))
+
+def fetch_pages(results, deadline, session=None, max_pages=MAX_PAGES_TO_FETCH, pool=None):
+    """
+    Fetch the top results concurrently over one pooled session.
+    Pages not finished by the deadline are skipped (their snippets are still used).
+    Returns {url: text}.
+    """
+    session = session or make_session(pool_size=max_pages)
+    targets = [r["href"] for r in results[:max_pages]]
+    pages = {}
+    own_pool = pool is None
+    pool = pool or ThreadPoolExecutor(max_workers=max(1, len(targets)))
+    try:
+        futures = {pool.submit(fetch_page, session, url): url for url in targets}
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    text = future.result()
+                except (requests.exceptions.RequestException, UnicodeError):
+                    continue
+                if text:
+                    pages[futures[future]] = text
+    finally:
+        if own_pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+    return pages
+
+def split_passages(text, size=PASSAGE_CHARS, overlap=PASSAGE_OVERLAP):
+    """
+    Fixed-size character windows, broken at whitespace where possible.
+    """
+    passages, start = [], 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            space = text.rfind(" ", start + size // 2, end)
+            end = space if space > 0 else end
+        passages.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return [p for p in passages if p]
+
+def embed_passages(results, pages, embeddings):
+    """
+    Snippets and page passages with their embeddings.
+    Returns (passages, vectors), where passages are dicts with "title", "url" and "text".
+    """
+    passages = []
+    for r in results:
+        source = {"title": r.get("title", ""), "url": r["href"]}
+        texts = ([r["body"]] if r.get("body") else []) + split_passages(pages.get(r["href"], ""))
+        passages.extend(dict(source, text=text) for text in texts)
+    if not passages:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    return passages, np.asarray(embeddings.embed_documents([p["text"] for p in passages]), dtype=np.float32)
+
+def cap_per_source(candidates, k=TOP_PASSAGES, per_source=MAX_PASSAGES_PER_SOURCE):
+    """
+    The first k candidates (best first), at most `per_source` from any one URL.
+    """
+    kept, per_url = [], {}
+    for c in candidates:
+        if per_url.get(c["url"], 0) >= per_source:
+            continue
+        per_url[c["url"]] = per_url.get(c["url"], 0) + 1
+        kept.append(c)
+        if len(kept) == k:
+            break
+    return kept
+
+def rank_passages(query_vector, passages, vectors, k=TOP_PASSAGES, per_source=MAX_PASSAGES_PER_SOURCE):
+    """
+    Load the passages into a throwaway flat index and return the top-k for the query.
+    """
+    if not passages:
+        return []
+    index = FlatIndex.from_arrays(vectors, list(range(len(passages))), passages, [p["text"] for p in passages])
+    hits = index.search(query_vector, k=min(len(passages), k * 4))
+    return cap_per_source([dict(passages[row], score=float(score)) for row, score in hits], k, per_source)
+
+def format_passages(passages, max_tokens=RESEARCH_CONTEXT_TOKENS):
+    """
+    Best passages first, with their sources, until the token budget is used up.
+    """
+    from engine import estimate_tokens
+    context, used = "\n\n=== WEB RESEARCH (REAL-TIME) ===\n", 0
+    for p in passages:
+        block = f"Source: {p['title']}\nLink: {p['url']}\nPassage: {p['text']}\n\n"
+        if used + estimate_tokens(block) > max_tokens:
+            break
+        context += block
+        used += estimate_tokens(block)
+    return context
+
+def research(query, role=None, budget_s=RESEARCH_BUDGET_S, max_tokens=RESEARCH_CONTEXT_TOKENS,
+             embeddings=None, store=None):
+    """
+    Multi-query web research within a wall-clock budget.
+    With a news store (see news_store.py), fresh stored passages on the topic are
+    served without searching; otherwise the web results are added to the store.
+    Returns {"context", "passages", "sources", "stats"}; the context holds at most `max_tokens`.
+    """
+    start = time.monotonic()
+    deadline = start + budget_s
+    stats = {"source": "web"}
+    if embeddings is None:
+        from engine import get_embedding_function
+        embeddings = get_embedding_function()
+    query_vector = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+
+    if store is not None:
+        from news_store import NEWS_FRESH_HOURS, NEWS_MIN_SCORE, NEWS_MIN_HITS
+        hits = [h for h in store.search(query_vector, TOP_PASSAGES * 4, NEWS_FRESH_HOURS) if h["score"] >= NEWS_MIN_SCORE]
+        passages = cap_per_source(hits)
+        if len(passages) >= NEWS_MIN_HITS:
+            stats.update(source="news_cache", passages=len(passages), total_s=round(time.monotonic() - start, 2))
+            return _result(passages, stats, max_tokens)
+
+    queries = expand_queries(query, role)
+    # Search gets up to half the budget; fetching gets what remains minus the ranking reserve
+    results, errors = search_all(queries, start + budget_s / 2)
+    stats.update(queries=len(queries), raw_results=len(results), search_errors=errors,
+                 search_s=round(time.monotonic() - start, 2))
+
+    results = dedupe_results(results)
+    stats["unique_results"] = len(results)
+
+    fetch_start = time.monotonic()
+    pages = fetch_pages(results, deadline - EMBED_RESERVE_S) if results else {}
+    stats.update(pages_fetched=len(pages), fetch_s=round(time.monotonic() - fetch_start, 2))
+
+    rank_start = time.monotonic()
+    candidates, vectors = embed_passages(results, pages, embeddings)
+    passages = rank_passages(query_vector, candidates, vectors)
+    stats.update(passages=len(passages), rank_s=round(time.monotonic() - rank_start, 2))
+
+    if store is not None:
+        try:
+            if candidates:
+                stats["stored"] = store.add(candidates, vectors, query)
+            elif errors:
+                # Web unavailable: stale stored passages beat no context at all
+                passages = cap_per_source([h for h in store.search(query_vector, TOP_PASSAGES * 4)
+                                           if h["score"] >= NEWS_MIN_SCORE])
+                stats.update(source="news_cache_stale", passages=len(passages))
+        except Exception as e:
+            stats["store_error"] = str(e)
+
+    stats["total_s"] = round(time.monotonic() - start, 2)
+    if not passages:
+        reason = f"failed: {errors[0]}" if errors else "returned no results."
+        return {"context": f"\n[System: Web search {reason}]", "passages": [], "sources": [], "stats": stats}
+    return _result(passages, stats, max_tokens)
+
+def _result(passages, stats, max_tokens):
+    sources = list({p["url"]: p["title"] for p in passages}.items())
+    return {"context": format_passages(passages, max_tokens), "passages": passages, "sources": sources, "stats": stats}
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Deep Research pipeline for one query and show its timings.")
+    parser.add_argument("query")
+    parser.add_argument("--role", default=None)
+    parser.add_argument("--budget", type=float, default=RESEARCH_BUDGET_S, help="Wall-clock budget in seconds")
+    parser.add_argument("--show-context", action="store_true")
+    parser.add_argument("--no-store", action="store_true", help="Skip the news store and always search the web")
+    args = parser.parse_args()
+
+    store = None
+    if not args.no_store:
+        from news_store import NewsStore
+        store = NewsStore()
+    result = research(args.query, args.role, args.budget, store=store)
+    print(json.dumps(result["stats"], indent=2))
+    for url, title in result["sources"]:
+        print(f"- {title}: {url}")
+    if args.show_context:
+        print(result["context"])
+
+if __name__ == "__main__":
+    main()
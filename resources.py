@@ -0,0 +1,96 @@
+import os
+import json
+import threading
+
+# Configuration
+LINK_STATUS_PATH = "link_status.json"
+DEFAULT_ROLE = "Logistics Manager"
+
+# Curated resources by role (single source of truth for the app and validate_links.py)
+LEARNING_RESOURCES = {
+    "Logistics Manager": [
+        ("Coursera: Supply Chain Management", "https://www.coursera.org/search?query=supply%20chain%20management"),
+        ("edX: MIT Supply Chain Courses", "https://www.edx.org/school/mitx"),
+        ("ASCM: Certification Programs", "https://www.ascm.org/learning-development/"),
+        ("IEEE: Semiconductor Resources", "https://www.ieee.org/"),
+        ("LinkedIn Learning: Logistics", "https://www.linkedin.com/learning/topics/logistics-and-supply-chain-management"),
+    ],
+    "Supply Chain Analyst": [
+        ("Coursera: Supply Chain Analytics", "https://www.coursera.org/search?query=supply%20chain%20analytics"),
+        ("MIT OpenCourseWare", "https://ocw.mit.edu/search/?q=supply+chain"),
+        ("Gartner: Supply Chain", "https://www.gartner.com/en/supply-chain"),
+        ("Udemy: Data Analytics", "https://www.udemy.com/courses/business/Data-and-Analytics/"),
+        ("ASCM: CPIM & Certifications", "https://www.ascm.org/learning-development/"),
+    ],
+    "Warehouse Supervisor": [
+        ("LinkedIn Learning: Warehouse Mgmt", "https://www.linkedin.com/learning/topics/warehouse-management"),
+        ("Coursera: Warehouse Operations", "https://www.coursera.org/search?query=warehouse%20management"),
+        ("OSHA: Warehousing Topic", "https://www.osha.gov/warehousing"),
+        ("WERC: Warehouse Council", "https://werc.org/"),
+        ("ASCM: Inventory Learning", "https://www.ascm.org/learning-development/"),
+    ],
+    "Procurement Specialist": [
+        ("Coursera: Procurement", "https://www.coursera.org/search?query=procurement"),
+        ("CIPS: Procurement Qualifications", "https://www.cips.org/"),
+        ("SIA: Semiconductor Industry", "https://www.semiconductors.org/"),
+        ("LinkedIn Learning: Sourcing", "https://www.linkedin.com/learning/topics/procurement"),
+        ("Harvard Online: Business", "https://online.hbs.edu/subjects/business-management/"),
+    ]
+}
+
+_status_cache = {"path": None, "mtime": None, "data": {}}
+_status_lock = threading.Lock()
+
+def all_resource_urls():
+    """
+    Return every distinct URL in the registry, in registry order.
+    """
+    seen = []
+    for links in LEARNING_RESOURCES.values():
+        for _, url in links:
+            if url not in seen:
+                seen.append(url)
+    return seen
+
+def load_link_status(path=LINK_STATUS_PATH):
+    """
+    Load the persisted link-check results (url -> status record).
+    Re-reads the file only when it changes; never touches the network.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {}
+    mtime = (stat.st_mtime_ns, stat.st_size)
+
+    with _status_lock:
+        if _status_cache["path"] == path and _status_cache["mtime"] == mtime:
+            return _status_cache["data"]
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            data = {}
+        _status_cache.update(path=path, mtime=mtime, data=data)
+        return data
+
+def save_link_status(statuses, path=LINK_STATUS_PATH):
+    """
+    Persist link-check results atomically so readers never see a partial file.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(statuses, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def get_resources(role, hide_dead=True, status_path=LINK_STATUS_PATH):
+    """
+    Return [(title, url)] for a role, defaulting to Logistics Manager.
+    Links the last check marked as dead are hidden; unchecked links are kept.
+    """
+    resources = LEARNING_RESOURCES.get(role, LEARNING_RESOURCES[DEFAULT_ROLE])
+    if not hide_dead:
+        return list(resources)
+    statuses = load_link_status(status_path)
+    return [(title, url) for title, url in resources
+            if statuses.get(url, {}).get("state") != "dead"]
@@ -0,0 +1,227 @@
+import os
+import time
+import random
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from utils import COMPETENCIES
+
+# Configuration
+SCENARIO_LIBRARY_PATH = os.environ.get("SCENARIO_LIBRARY_PATH", "scenario_library.db")
+SCENARIO_BATCH_SIZE = 5          # scenarios per generation call
+SIMILARITY_THRESHOLD = 0.92      # cosine similarity above which a scenario counts as a duplicate
+REFILL_THRESHOLD = 3             # refill when a user has fewer unseen scenarios than this
+LEVELS = range(1, 6)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    id INTEGER PRIMARY KEY,
+    role TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    competency TEXT,
+    scenario TEXT NOT NULL,
+    question TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    created_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_scenarios_key ON scenarios (role, level, competency);
+CREATE TABLE IF NOT EXISTS scenario_views (
+    user_id TEXT NOT NULL,
+    scenario_id INTEGER NOT NULL,
+    seen_at REAL,
+    PRIMARY KEY (user_id, scenario_id)
+);
+"""
+
+def _default_embed(texts):
+    from engine import get_embedding_function
+    return get_embedding_function().embed_documents(texts)
+
+def _default_generate(role, level, count):
+    from engine import generate_scenario_batch
+    return generate_scenario_batch(role, level, count)
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class ScenarioLibrary:
+    """
+    Persistent crisis scenarios keyed by (role, level), deduplicated by embedding
+    similarity, with per-user view tracking so each learner gets unseen scenarios.
+    Generation only runs to fill or refill the library, in a background worker.
+    """
+
+    def __init__(self, path=SCENARIO_LIBRARY_PATH, embed=_default_embed, generate=_default_generate,
+                 threshold=SIMILARITY_THRESHOLD, batch_size=SCENARIO_BATCH_SIZE):
+        self.embed = embed
+        self.generate = generate
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._vectors = {}        # (role, level) -> normalized embedding matrix, loaded lazily
+        self._refilling = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scenario-refill")
+        self.stats = {"served": 0, "generated": 0, "duplicates": 0, "refills": 0, "live_fills": 0}
+
+    def _key_vectors(self, role, level):
+        key = (role, level)
+        if key not in self._vectors:
+            rows = self._conn.execute(
+                "SELECT embedding FROM scenarios WHERE role = ? AND level = ?", (role, level)).fetchall()
+            self._vectors[key] = (np.stack([np.frombuffer(r[0], dtype=np.float32) for r in rows])
+                                  if rows else None)
+        return self._vectors[key]
+
+    def add(self, role, level, scenarios):
+        """
+        Store new scenarios, skipping any too similar to the library or to each other.
+        Returns the number added.
+        """
+        if not scenarios:
+            return 0
+        vectors = _normalize(self.embed([f"{s['scenario']} {s['question']}" for s in scenarios]))
+        added = 0
+        with self._lock:
+            existing = self._key_vectors(role, level)
+            with self._conn:
+                for item, vector in zip(scenarios, vectors):
+                    if existing is not None and float(np.max(existing @ vector)) >= self.threshold:
+                        self.stats["duplicates"] += 1
+                        continue
+                    self._conn.execute(
+                        "INSERT INTO scenarios (role, level, competency, scenario, question, embedding, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (role, level, item.get("competency"), item["scenario"], item["question"],
+                         vector.astype(np.float32).tobytes(), time.time()),
+                    )
+                    existing = vector[None, :] if existing is None else np.vstack([existing, vector])
+                    added += 1
+            self._vectors[(role, level)] = existing
+        self.stats["generated"] += added
+        return added
+
+    def fill(self, role, level, count=None):
+        """
+        Generate one batch for (role, level) and add the non-duplicates.
+        """
+        return self.add(role, level, self.generate(role, level, count or self.batch_size))
+
+    def count(self, role, level):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM scenarios WHERE role = ? AND level = ?", (role, level)).fetchone()[0]
+
+    def unseen_count(self, user_id, role, level):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM scenarios s WHERE s.role = ? AND s.level = ? AND NOT EXISTS "
+                "(SELECT 1 FROM scenario_views v WHERE v.user_id = ? AND v.scenario_id = s.id)",
+                (role, level, user_id)).fetchone()[0]
+
+    def _pick(self, user_id, role, level, competency):
+        """
+        An unseen scenario (for the competency if given), else the one this user saw longest ago.
+        """
+        base = ("SELECT s.id, s.scenario, s.question, s.competency FROM scenarios s "
+                "WHERE s.role = ? AND s.level = ?")
+        unseen = (" AND NOT EXISTS (SELECT 1 FROM scenario_views v "
+                  "WHERE v.user_id = ? AND v.scenario_id = s.id)")
+        queries = []
+        if competency:
+            queries.append((base + " AND s.competency = ?" + unseen, (role, level, competency, user_id)))
+        queries.append((base + unseen, (role, level, user_id)))
+        for sql, params in queries:
+            rows = self._conn.execute(sql, params).fetchall()
+            if rows:
+                return random.choice(rows)
+        return self._conn.execute(
+            base.replace("FROM scenarios s", "FROM scenarios s JOIN scenario_views v ON v.scenario_id = s.id")
+            + " AND v.user_id = ? ORDER BY v.seen_at ASC LIMIT 1", (role, level, user_id)).fetchone()
+
+    def next_scenario(self, user_id, role, level, competency=None):
+        """
+        Serve a scenario this user has not seen, optionally targeting a competency.
+        Generates live only when the library has nothing for (role, level) yet.
+        Returns a dict with "scenario", "question", "competency" and "id", or None.
+        """
+        with self._lock:
+            row = self._pick(user_id, role, level, competency)
+        if row is None:
+            self.stats["live_fills"] += 1
+            self.fill(role, level)
+            with self._lock:
+                row = self._pick(user_id, role, level, competency)
+            if row is None:
+                return None
+
+        scenario_id, scenario, question, tagged = row
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO scenario_views (user_id, scenario_id, seen_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id, scenario_id) DO UPDATE SET seen_at = excluded.seen_at",
+                (user_id, scenario_id, time.time()))
+        self.stats["served"] += 1
+
+        if self.unseen_count(user_id, role, level) < REFILL_THRESHOLD:
+            self.refill_async(role, level)
+        return {"id": scenario_id, "scenario": scenario, "question": question, "competency": tagged}
+
+    def refill_async(self, role, level):
+        """
+        Queue one background generation batch for (role, level), unless one is already queued.
+        """
+        key = (role, level)
+        with self._lock:
+            if key in self._refilling:
+                return None
+            self._refilling.add(key)
+        self.stats["refills"] += 1
+
+        def run():
+            try:
+                return self.fill(role, level)
+            except Exception as e:
+                print(f"Scenario refill failed for {role} L{level}: {e}")
+                return 0
+            finally:
+                with self._lock:
+                    self._refilling.discard(key)
+
+        return self._executor.submit(run)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate the Fab Crisis scenario library.")
+    parser.add_argument("--per-combo", type=int, default=10, help="Target scenarios per role and level")
+    parser.add_argument("--roles", nargs="+", default=None)
+    parser.add_argument("--max-batches", type=int, default=4, help="Give up on a combination after this many batches")
+    args = parser.parse_args()
+
+    from resources import LEARNING_RESOURCES
+    roles = args.roles or list(LEARNING_RESOURCES)
+    library = ScenarioLibrary()
+    start = time.perf_counter()
+    for role in roles:
+        for level in LEVELS:
+            for _ in range(args.max_batches):
+                if library.count(role, level) >= args.per_combo:
+                    break
+                library.fill(role, level)
+            print(f"{role} L{level}: {library.count(role, level)} scenarios")
+    print(f"\nAdded {library.stats['generated']} scenarios, skipped {library.stats['duplicates']} near-duplicates "
+          f"in {time.perf_counter() - start:.1f}s. Competencies: {', '.join(COMPETENCIES)}")
+    library.close()
+
+if __name__ == "__main__":
+    main()
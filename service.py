@@ -0,0 +1,164 @@
+import os
+import json
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+import engine
+from utils import process_rss_mb
+
+# Configuration
+SERVICE_HOST = os.environ.get("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.environ.get("SERVICE_PORT", 8765))
+# Requests allowed to run at once; the rest wait up to QUEUE_TIMEOUT seconds, then get a 503
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("SERVICE_MAX_CONCURRENCY", 8))
+QUEUE_TIMEOUT = float(os.environ.get("SERVICE_QUEUE_TIMEOUT", 30))
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load the embedding model and index once, shared by every request
+    await run_in_threadpool(engine.get_chroma_db)
+    yield
+
+async def usage_session(x_session_id: Optional[str] = Header(None)):
+    # Async so the context variable is set in the request's own context
+    engine.set_usage_session(x_session_id)
+
+app = FastAPI(title="Semiconductor Logistics AI-Upskiller Engine", lifespan=lifespan,
+              dependencies=[Depends(usage_session)])
+_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+_stats = {"in_flight": 0, "served": 0, "rejected": 0, "errors": 0}
+
+class RagRequest(BaseModel):
+    query: str
+    role: Optional[str] = None
+    ai_literacy_level: Optional[int] = None
+    generation_mode: str = "chat"
+    session_id: Optional[str] = None
+
+class ProfileRequest(BaseModel):
+    role: str
+    level: int
+
+class EvaluateRequest(BaseModel):
+    scenario: dict
+    response: str
+
+class FlashcardRequest(BaseModel):
+    topic: str = "Semiconductor Logistics"
+
+class SkillWebRequest(BaseModel):
+    role: str
+    refresh: bool = False
+
+async def _acquire_slot():
+    try:
+        await asyncio.wait_for(_slots.acquire(), QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        _stats["rejected"] += 1
+        raise HTTPException(status_code=503, detail="Engine is at capacity, try again shortly.")
+    _stats["in_flight"] += 1
+
+def _release_slot():
+    _stats["in_flight"] -= 1
+    _stats["served"] += 1
+    _slots.release()
+
+async def _run(fn, *args, **kwargs):
+    """
+    Run a blocking engine call in the thread pool under the concurrency limit.
+    """
+    await _acquire_slot()
+    try:
+        return await run_in_threadpool(fn, *args, **kwargs)
+    except Exception as e:
+        _stats["errors"] += 1
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        _release_slot()
+
+def _sse(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "rss_mb": round(process_rss_mb(), 1), "max_concurrency": MAX_CONCURRENT_REQUESTS, **_stats}
+
+@app.get("/usage")
+async def usage(session_id: Optional[str] = None):
+    return engine.get_token_usage(session_id)
+
+@app.post("/rag/stream")
+async def rag_stream(req: RagRequest):
+    """
+    Stream a chat, roadmap or research answer as server-sent events:
+    `data: {"token": ...}` per chunk, then `event: done` (or `event: error`).
+    """
+    await _acquire_slot()
+
+    async def events():
+        try:
+            stream = await run_in_threadpool(
+                engine.get_rag_response,
+                req.query,
+                role=req.role,
+                ai_literacy_level=req.ai_literacy_level,
+                generation_mode=req.generation_mode,
+                session_id=req.session_id,
+            )
+            async for token in iterate_in_threadpool(stream):
+                yield _sse({"token": token})
+            yield _sse({}, event="done")
+        except Exception as e:
+            _stats["errors"] += 1
+            yield _sse({"error": str(e)}, event="error")
+        finally:
+            # Runs on completion, errors and client disconnects (background tasks are skipped on disconnect)
+            _release_slot()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/quiz")
+async def quiz(req: ProfileRequest):
+    return await _run(engine.generate_quiz_questions, req.role, req.level)
+
+@app.post("/scenario")
+async def scenario(req: ProfileRequest):
+    return await _run(engine.generate_scenario, req.role, req.level)
+
+@app.post("/scenario/evaluate")
+async def evaluate(req: EvaluateRequest):
+    return {"feedback": await _run(engine.evaluate_scenario, req.scenario, req.response)}
+
+@app.post("/flashcards")
+async def flashcards(req: FlashcardRequest):
+    return await _run(engine.generate_flashcards, topic=req.topic)
+
+@app.post("/skill-web")
+async def skill_web(req: SkillWebRequest):
+    return {"mermaid": await _run(engine.generate_skill_web, req.role, refresh=req.refresh)}
+
+@app.get("/resources")
+async def resources(role: str):
+    # Local file read only, no slot needed
+    return {"markdown": engine.search_learning_resources(role)}
+
+def main():
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Run the shared engine as a local HTTP service.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    args = parser.parse_args()
+    # One process: the model and index are loaded once and shared by all requests
+    uvicorn.run(app, host=args.host, port=args.port, workers=1)
+
+if __name__ == "__main__":
+    main()
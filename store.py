@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import atexit
+import sqlite3
+import threading
+
+# Configuration
+STORE_PATH = os.environ.get("PROGRESS_STORE_PATH", "progress.db")
+WRITE_BATCH_SIZE = 50          # flush once this many writes are pending
+WRITE_FLUSH_INTERVAL = 2.0     # ...or after this many seconds
+CHAT_WINDOW = 20               # chat messages kept in the Streamlit session
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    role TEXT,
+    ai_literacy INTEGER,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS quiz_attempts (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    role TEXT,
+    level INTEGER,
+    score INTEGER,
+    total INTEGER,
+    created_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_quiz_user ON quiz_attempts (user_id, created_at);
+CREATE TABLE IF NOT EXISTS roadmaps (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    role TEXT,
+    level INTEGER,
+    text TEXT,
+    created_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_roadmap_user ON roadmaps (user_id, created_at);
+CREATE TABLE IF NOT EXISTS scenario_attempts (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    role TEXT,
+    level INTEGER,
+    scenario TEXT,
+    response TEXT,
+    feedback TEXT,
+    created_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_scenario_user ON scenario_attempts (user_id, created_at);
+CREATE TABLE IF NOT EXISTS flashcards (
+    user_id TEXT NOT NULL,
+    term TEXT NOT NULL,
+    definition TEXT,
+    reviews INTEGER DEFAULT 0,
+    last_reviewed REAL,
+    PRIMARY KEY (user_id, term)
+);
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    speaker TEXT,
+    content TEXT,
+    created_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_user ON chat_messages (user_id, id);
+"""
+
+class ProgressStore:
+    """
+    Per-user profile and progress in embedded SQLite.
+    Writes are queued and committed in batches; reads flush first so callers
+    always see their own writes. Large artifacts are fetched by id on demand.
+    """
+
+    def __init__(self, path=STORE_PATH, batch_size=WRITE_BATCH_SIZE, flush_interval=WRITE_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self.stats = {"writes": 0, "flushes": 0, "failed_flushes": 0}
+        # Commits a partial batch once it has waited flush_interval seconds
+        self._closed = threading.Event()
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+        atexit.register(self.close)
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+                    self._try_flush()
+
+    def _try_flush(self):
+        try:
+            self.flush()
+        except Exception as e:
+            # The batch stays queued; the next write or the flush loop retries it
+            self.stats["failed_flushes"] += 1
+            print(f"Progress store: flush of {len(self._pending)} writes failed, will retry: {e}")
+
+    def _queue(self, sql, params):
+        with self._lock:
+            self._pending.append((sql, params))
+            self.stats["writes"] += 1
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+            if len(self._pending) >= self.batch_size or due:
+                self._try_flush()
+
+    def flush(self):
+        """
+        Commit all pending writes in one transaction.
+        On failure the transaction is rolled back and the writes stay queued.
+        """
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            try:
+                with self._conn:
+                    for sql, params in pending:
+                        self._conn.execute(sql, params)
+            except Exception:
+                self._pending = pending + self._pending
+                raise
+            self.stats["flushes"] += 1
+
+    def save_profile(self, user_id, role, ai_literacy):
+        self._queue(
+            "INSERT INTO profiles (user_id, role, ai_literacy, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET role=excluded.role, ai_literacy=excluded.ai_literacy, "
+            "updated_at=excluded.updated_at",
+            (user_id, role, ai_literacy, time.time()),
+        )
+
+    def record_quiz_attempt(self, user_id, role, level, score, total):
+        self._queue(
+            "INSERT INTO quiz_attempts (user_id, role, level, score, total, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, role, level, score, total, time.time()),
+        )
+
+    def add_chat_message(self, user_id, speaker, content):
+        self._queue(
+            "INSERT INTO chat_messages (user_id, speaker, content, created_at) VALUES (?, ?, ?, ?)",
+            (user_id, speaker, content, time.time()),
+        )
+
+    def save_flashcards(self, user_id, cards):
+        """
+        Add a generated deck; existing cards keep their review history.
+        """
+        for card in cards:
+            self._queue(
+                "INSERT INTO flashcards (user_id, term, definition) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id, term) DO UPDATE SET definition=excluded.definition",
+                (user_id, card["term"], card["definition"]),
+            )
+
+    def record_flashcard_review(self, user_id, term):
+        self._queue(
+            "UPDATE flashcards SET reviews = reviews + 1, last_reviewed = ? WHERE user_id = ? AND term = ?",
+            (time.time(), user_id, term),
+        )
+
+    def save_roadmap(self, user_id, role, level, text):
+        """
+        Store a roadmap immediately and return its id, so the session only keeps the id.
+        """
+        with self._lock:
+            self.flush()
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO roadmaps (user_id, role, level, text, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (user_id, role, level, text, time.time()),
+                )
+            return cursor.lastrowid
+
+    def record_scenario_attempt(self, user_id, role, level, scenario, response, feedback):
+        self._queue(
+            "INSERT INTO scenario_attempts (user_id, role, level, scenario, response, feedback, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (user_id, role, level, json.dumps(scenario), response, feedback, time.time()),
+        )
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            self.flush()
+            return self._conn.execute(sql, params).fetchall()
+
+    def get_profile(self, user_id):
+        rows = self._query("SELECT role, ai_literacy FROM profiles WHERE user_id = ?", (user_id,))
+        return {"role": rows[0][0], "ai_literacy": rows[0][1]} if rows else None
+
+    def latest_quiz_attempt(self, user_id):
+        rows = self._query(
+            "SELECT role, level, score, total, created_at FROM quiz_attempts "
+            "WHERE user_id = ? ORDER BY created_at DESC LIMIT 1", (user_id,))
+        return dict(zip(("role", "level", "score", "total", "created_at"), rows[0])) if rows else None
+
+    def quiz_history(self, user_id, limit=20):
+        rows = self._query(
+            "SELECT role, level, score, total, created_at FROM quiz_attempts "
+            "WHERE user_id = ? ORDER BY created_at DESC LIMIT ?", (user_id, limit))
+        return [dict(zip(("role", "level", "score", "total", "created_at"), r)) for r in rows]
+
+    def latest_roadmap_id(self, user_id):
+        rows = self._query(
+            "SELECT id FROM roadmaps WHERE user_id = ? ORDER BY created_at DESC LIMIT 1", (user_id,))
+        return rows[0][0] if rows else None
+
+    def get_roadmap(self, roadmap_id):
+        if roadmap_id is None:
+            return None
+        rows = self._query("SELECT text FROM roadmaps WHERE id = ?", (roadmap_id,))
+        return rows[0][0] if rows else None
+
+    def chat_page(self, user_id, limit=CHAT_WINDOW, offset=0):
+        """
+        Up to `limit` messages, skipping the `offset` most recent, oldest first.
+        """
+        rows = self._query(
+            "SELECT speaker, content FROM chat_messages WHERE user_id = ? "
+            "ORDER BY id DESC LIMIT ? OFFSET ?", (user_id, limit, offset))
+        return [{"role": speaker, "content": content} for speaker, content in reversed(rows)]
+
+    def flashcard_deck(self, user_id, limit=10):
+        """
+        Least-reviewed cards first.
+        """
+        rows = self._query(
+            "SELECT term, definition, reviews FROM flashcards WHERE user_id = ? "
+            "ORDER BY reviews ASC, last_reviewed ASC LIMIT ?", (user_id, limit))
+        return [{"term": t, "definition": d, "reviews": r} for t, d, r in rows]
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            try:
+                self.flush()
+            except sqlite3.ProgrammingError:
+                return  # already closed
+            except sqlite3.Error as e:
+                print(f"Progress store: {len(self._pending)} writes not saved at shutdown: {e}")
+            self._conn.close()
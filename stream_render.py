@@ -0,0 +1,142 @@
+import os
+import re
+import time
+
+# Configuration
+RENDER_INTERVAL_S = float(os.environ.get("RENDER_INTERVAL_S", 0.1))  # at most ~10 UI updates per second
+RENDER_MAX_PENDING_CHARS = 400   # ...unless this much new text has piled up
+CURSOR = "▌"
+
+_FENCE_RE = re.compile(r"^[ \t]*```[ \t]*(\w*)", re.MULTILINE)
+_MERMAID_OPEN_RE = re.compile(r"```[ \t]*mermaid[ \t]*\r?\n", re.IGNORECASE)
+_MERMAID_BLOCK_RE = re.compile(r"```[ \t]*mermaid[ \t]*\r?\n(.*?)(?:\r?\n)?```[ \t]*", re.DOTALL | re.IGNORECASE)
+
+def split_complete_blocks(text):
+    """
+    Split streamed Markdown into (complete blocks, unfinished tail).
+    A block ends at a blank line outside a code fence, once the next block has
+    started with a non-indented character (an indented one may continue a list item).
+    """
+    blocks, start, pos, in_fence = [], 0, 0, False
+    for line in text.splitlines(keepends=True):
+        end = pos + len(line)
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+        elif not in_fence and not line.strip() and end < len(text) and text[end] not in " \t\r\n":
+            block = text[start:pos].strip("\n")
+            if block.strip():
+                blocks.append(block)
+            start = end
+        pos = end
+    return blocks, text[start:]
+
+class StreamRenderer:
+    """
+    Incremental Markdown renderer for streamed LLM answers.
+    Tokens are coalesced and flushed every RENDER_INTERVAL_S (or RENDER_MAX_PENDING_CHARS).
+    Finished blocks are rendered once into their own element and never re-sent; only the
+    trailing block is re-rendered. Mermaid blocks are pulled out of the text as their
+    closing fence arrives and passed to `on_mermaid(code)`.
+    """
+
+    def __init__(self, container=None, on_mermaid=None, interval=RENDER_INTERVAL_S,
+                 max_pending=RENDER_MAX_PENDING_CHARS, cursor=CURSOR, clock=time.monotonic):
+        if container is None:
+            import streamlit as st
+            container = st.container()
+        self.container = container
+        self.on_mermaid = on_mermaid
+        self.interval = interval
+        self.max_pending = max_pending
+        self.cursor = cursor
+        self.clock = clock
+        self.text = ""              # everything received
+        self.mermaid = []           # extracted diagram sources, in order
+        self._tail = ""             # text not yet committed to a finished element
+        self._tail_element = None
+        self._pending = 0
+        self._last_flush = clock()
+        self.stats = {"updates": 0, "bytes_sent": 0, "render_s": 0.0, "blocks": 0}
+
+    def _render(self, element, text):
+        start = time.perf_counter()
+        element.markdown(text)
+        self.stats["render_s"] += time.perf_counter() - start
+        self.stats["updates"] += 1
+        self.stats["bytes_sent"] += len(text.encode("utf-8"))
+
+    def _element(self):
+        if self._tail_element is None:
+            self._tail_element = self.container.empty()
+        return self._tail_element
+
+    def _take_mermaid(self):
+        for match in list(_MERMAID_BLOCK_RE.finditer(self._tail)):
+            code = match.group(1).strip()
+            self.mermaid.append(code)
+            if self.on_mermaid:
+                self.on_mermaid(code)
+        self._tail = _MERMAID_BLOCK_RE.sub("", self._tail)
+
+    def write(self, chunk):
+        self.text += chunk
+        self._tail += chunk
+        self._pending += len(chunk)
+        if self._pending >= self.max_pending or self.clock() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self, final=False):
+        self._pending = 0
+        self._last_flush = self.clock()
+        self._take_mermaid()
+        blocks, self._tail = split_complete_blocks(self._tail)
+        for block in blocks:
+            # The tail element becomes the finished block; later text gets a new element below it
+            self._render(self._element(), block)
+            self._tail_element = None
+            self.stats["blocks"] += 1
+
+        visible = self._tail
+        open_diagram = _MERMAID_OPEN_RE.search(visible)
+        if final and open_diagram:
+            # Stream ended inside a diagram: extract it anyway, like utils.extract_mermaid
+            code = visible[open_diagram.end():].strip()
+            self.mermaid.append(code)
+            if self.on_mermaid:
+                self.on_mermaid(code)
+            visible = self._tail = visible[:open_diagram.start()]
+        elif open_diagram:
+            # Don't show diagram source while it streams in
+            visible = visible[:open_diagram.start()]
+
+        shown = visible.strip("\n")
+        if shown or not final:
+            self._render(self._element(), shown if final else shown + self.cursor)
+        elif self._tail_element is not None:
+            self._tail_element.empty()
+
+    def feed(self, stream):
+        """
+        Render a whole token stream; returns the full text.
+        """
+        for chunk in stream:
+            self.write(chunk)
+        self.close()
+        return self.text
+
+    def close(self):
+        """
+        Render the remaining text without the cursor.
+        """
+        self.flush(final=True)
+        return self.text
+
+    def clean_text(self):
+        """
+        The full response without its Mermaid blocks, including an unterminated last one.
+        """
+        text = _MERMAID_BLOCK_RE.sub("", self.text)
+        open_diagram = _MERMAID_OPEN_RE.search(text)
+        if open_diagram:
+            text = text[:open_diagram.start()]
+        return text.strip()
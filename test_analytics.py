@@ -0,0 +1,90 @@
+import os
+import time
+
+import numpy as np
+
+from analytics import AnalyticsStore, competency_levels, parse_grade, MAX_LEVEL, PRIOR_WEIGHT
+from utils import COMPETENCIES
+
+QUESTIONS = [
+    {"question": "Which KPI dashboard shows OTIF?", "competency": "Data Literacy", "correct_answer": 1},
+    {"question": "How should a supplier contract handle allocation?", "correct_answer": 0},  # tagged by keywords
+]
+
+def test_competency_levels_shrink_towards_prior():
+    correct = np.array([[0.0, 0.0], [8.0, 0.0], [96.0, 0.0]])
+    counts = np.array([[0.0, 0.0], [8.0, 8.0], [96.0, 96.0]])
+    levels = competency_levels(correct, counts, [3, 3, 3])
+    # No answers: the self-assessed level
+    assert np.allclose(levels[0], [3, 3])
+    # Some answers: between the prior and the observed accuracy
+    assert np.allclose(levels[1], [(PRIOR_WEIGHT * 3 + MAX_LEVEL * 8) / (PRIOR_WEIGHT + 8), PRIOR_WEIGHT * 3 / 12])
+    # Many answers: the observed accuracy dominates
+    assert levels[2][0] > 4.8 and levels[2][1] < 0.2
+    # A scalar prior applies to every learner
+    assert np.allclose(competency_levels(correct, counts, 3), levels)
+
+def test_parse_grade():
+    assert parse_grade("Grade: PASS. Good use of buffer stock.") == 1.0
+    assert parse_grade("This answer fails to address the supplier.") == 0.0
+    assert parse_grade("Passage of time matters") is None and parse_grade(None) is None
+
+def test_user_vector_and_cohort_summary(tmp_path):
+    store = AnalyticsStore(str(tmp_path / "analytics"), flush_interval=60)
+    assert store.user_vector("nobody", 2)["levels"] == {c: 2.0 for c in COMPETENCIES}
+
+    store.record_quiz("u1", "Logistics Manager", 2, QUESTIONS, [1, 0])        # both right
+    store.record_quiz("u2", "Procurement Specialist", 4, QUESTIONS, [0, None])  # both wrong
+    assert store.record_scenario("u1", "Logistics Manager", 2, {"competency": "Safety"}, "Result: Pass")
+    assert not store.record_scenario("u1", "Logistics Manager", 2, {"competency": "Safety"}, "No verdict")
+
+    vector = store.user_vector("u1", 2)
+    assert vector["answers"] == {"Data Literacy": 1, "Logistics Ops": 0, "AI Strategy": 0, "Safety": 1, "Procurement": 1}
+    assert vector["levels"]["Safety"] == round((PRIOR_WEIGHT * 2 + MAX_LEVEL) / (PRIOR_WEIGHT + 1), 1)
+    assert vector["levels"]["Logistics Ops"] == 2.0
+
+    summary = store.cohort_summary()
+    assert summary["learners"] == 2
+    assert summary["answers"]["Data Literacy"] == 2 and summary["accuracy"]["Data Literacy"] == 0.5
+    # Each learner's prior is the highest level they recorded
+    assert summary["mean"]["Logistics Ops"] == 3.0
+    role = store.cohort_summary("Procurement Specialist")
+    assert role["learners"] == 1 and role["accuracy"]["Procurement"] == 0.0
+    assert store.cohort_summary(since="2999-01-01")["learners"] == 0
+
+    # Cached results are dropped by the next write
+    store.record_quiz("u2", "Procurement Specialist", 4, QUESTIONS[:1], [1])
+    assert store.cohort_summary()["answers"]["Data Literacy"] == 3
+    store.close()
+
+def test_failed_flush_keeps_events(tmp_path):
+    path = str(tmp_path / "analytics")
+    with open(path, "w") as f:   # a file where the dataset directory should be: every write fails
+        f.write("")
+    store = AnalyticsStore(path, batch_size=2, flush_interval=60)
+    store.record_quiz("u1", "Logistics Manager", 2, QUESTIONS, [1, 0])
+    assert store.stats["failed_flushes"] == 1 and len(store._pending) == 2
+
+    os.remove(path)
+    store.record_quiz("u1", "Logistics Manager", 2, QUESTIONS[:1], [0])
+    assert store.cohort_summary()["answers"]["Data Literacy"] == 2
+    assert store.stats["files"] == 1
+    store.close()
+
+def test_flush_loop_survives_errors(tmp_path):
+    path = str(tmp_path / "analytics")
+    with open(path, "w") as f:
+        f.write("")
+    store = AnalyticsStore(path, flush_interval=0.05)
+    store.record_quiz("u1", "Logistics Manager", 2, QUESTIONS[:1], [1])
+    time.sleep(0.3)
+    with store._lock:
+        assert store.stats["failed_flushes"] >= 2 and store._pending
+
+    os.remove(path)
+    deadline = time.time() + 5
+    while not store.stats["files"] and time.time() < deadline:
+        time.sleep(0.02)
+    with store._lock:
+        assert store.stats["files"] == 1 and not store._pending
+    store.close()
@@ -0,0 +1,49 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from dedup import shingles, MinHasher, near_duplicate_clusters, deduplicate_chunks
+
+BASE = ("Automated material handling systems move wafer carriers between process tools in the fab. "
+        "Predictive maintenance on the overhead hoist transport reduces unplanned downtime and keeps "
+        "cycle time stable when demand spikes across the quarter.")
+NEAR_COPY = BASE.replace("the quarter", "the fiscal quarter") + " Page 4"
+OTHER = ("Supplier qualification for photoresist covers audits, sample lots and change notification "
+         "agreements, so procurement can react before a material change reaches production.")
+
+def jaccard(a, b):
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+def test_shingles_are_normalized():
+    assert shingles("Wafer  DEMAND, forecasting!") == shingles("wafer demand forecasting")
+    assert shingles("") == set()
+    assert len(shingles("two words")) == 1
+
+def test_signature_estimates_jaccard():
+    hasher = MinHasher()
+    sig_a, sig_b = hasher.signature(BASE), hasher.signature(NEAR_COPY)
+    estimate = np.mean(sig_a == sig_b)
+    print(f"true Jaccard {jaccard(BASE, NEAR_COPY):.2f}, MinHash estimate {estimate:.2f}")
+    assert abs(estimate - jaccard(BASE, NEAR_COPY)) < 0.15
+    # Same seed, same signature
+    assert np.array_equal(MinHasher().signature(BASE), sig_a)
+
+def test_clusters_near_duplicates_only():
+    texts = [OTHER, BASE, "unrelated short note", NEAR_COPY, BASE]
+    clusters = near_duplicate_clusters(texts)
+    assert clusters == [[1, 3, 4]], clusters
+    assert near_duplicate_clusters([BASE, NEAR_COPY], threshold=0.99) == []
+    assert near_duplicate_clusters([]) == []
+
+def test_deduplicate_keeps_first():
+    chunks = [Document(page_content=t, metadata={"i": i}) for i, t in enumerate([BASE, OTHER, NEAR_COPY])]
+    kept, removed = deduplicate_chunks(chunks)
+    assert [c.metadata["i"] for c in kept] == [0, 1]
+    assert [c.metadata["i"] for c in removed] == [2]
+
+if __name__ == "__main__":
+    test_shingles_are_normalized()
+    test_signature_estimates_jaccard()
+    test_clusters_near_duplicates_only()
+    test_deduplicate_keeps_first()
+    print("SUCCESS - MinHash/LSH near-duplicate detection behaves as expected")
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from flat_index import FlatIndex, quantize_int8, dequantize_int8, quantize_binary
+
+@pytest.fixture(scope="module")
+def corpus():
+    """
+    Clustered, non-zero-mean vectors, roughly like sentence embeddings, and queries near them.
+    """
+    n, dim = 2000, 64
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, dim)) + 0.5
+    vectors = centers[rng.integers(0, 20, size=n)] + 0.3 * rng.normal(size=(n, dim))
+    queries = vectors[rng.integers(0, n, size=50)] + 0.1 * rng.normal(size=(50, dim))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+def recall(index, exact, queries, k=10):
+    hits = 0
+    for q in queries:
+        truth = {row for row, _ in exact.search(q, k)}
+        hits += len(truth & {row for row, _ in index.search(q, k)})
+    return hits / (k * len(queries))
+
+def test_int8_roundtrip(corpus):
+    vectors = corpus[0][:200]
+    codes, scale, offset = quantize_int8(vectors)
+    assert codes.dtype == np.int8
+    error = np.abs(dequantize_int8(codes, scale, offset) - vectors).max(axis=0)
+    assert np.all(error <= scale / 2 + 1e-6)
+
+def test_binary_codes_are_packed(corpus):
+    vectors = corpus[0][:100]
+    packed, center = quantize_binary(vectors)
+    assert packed.shape == (100, 8) and packed.dtype == np.uint8
+    assert center.shape == (64,)
+
+def test_quantized_search_recall_and_exact_scores(corpus):
+    vectors, queries = corpus
+    ids = [f"id{i}" for i in range(len(vectors))]
+    exact = FlatIndex.from_arrays(vectors, ids)
+    for mode, floor in (("int8", 0.95), ("binary", 0.8)):
+        index = FlatIndex.from_arrays(vectors, ids, quantization=mode)
+        r = recall(index, exact, queries)
+        print(f"{mode}: recall@10 {r:.3f}, scan bytes {index.memory_footprint()} vs {exact.memory_footprint()}")
+        assert r >= floor
+        assert index.memory_footprint() < exact.memory_footprint()
+        # Returned scores are re-ranked at full precision, so they match the exact index
+        exact_scores = dict(exact.search(queries[0], 50))
+        for row, score in index.search(queries[0], 5):
+            if row in exact_scores:
+                assert abs(score - exact_scores[row]) < 1e-5
+
+def test_filter_and_edge_cases(corpus):
+    vectors, queries = corpus[0][:300], corpus[1]
+    metadatas = [{"folder_name": "A" if i % 3 else "B"} for i in range(len(vectors))]
+    for mode in ("none", "int8", "binary"):
+        index = FlatIndex.from_arrays(vectors, list(range(len(vectors))), metadatas, quantization=mode)
+        results = index.search(queries[0], 5, where={"folder_name": "B"})
+        assert len(results) == 5 and all(metadatas[row]["folder_name"] == "B" for row, _ in results)
+        assert index.search(queries[0], 5, where={"folder_name": "missing"}) == []
+        # k larger than the index returns everything
+        assert len(index.search(queries[0], 1000)) == len(vectors)
+
+    empty = FlatIndex.from_arrays(np.zeros((0, 8), dtype=np.float32), [])
+    assert empty.search(np.ones(8), 3) == []
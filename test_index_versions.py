@@ -0,0 +1,71 @@
+import os
+import time
+
+import pytest
+
+import index_versions
+from index_versions import activate, current_version, gc, list_versions, new_version, write_manifest
+
+def build(root, digest="abc12345", chunks=10):
+    version, path = new_version(digest, str(root))
+    write_manifest(path, chunks=chunks)
+    return version
+
+def test_corpus_hash_tracks_paths_and_contents(tmp_path):
+    (tmp_path / "a.txt").write_text("wafer demand")
+    (tmp_path / "b.txt").write_text("supplier lead time")
+    files = index_versions.corpus_files([str(tmp_path)])
+    assert [os.path.basename(f) for f in files] == ["a.txt", "b.txt"]
+    digest = index_versions.corpus_hash(files)
+    assert index_versions.corpus_hash(files) == digest
+    (tmp_path / "b.txt").write_text("supplier lead times")
+    assert index_versions.corpus_hash(files) != digest
+
+def test_builds_in_the_same_second_get_distinct_versions(tmp_path):
+    versions = [build(tmp_path) for _ in range(3)]
+    assert len(set(versions)) == 3
+    assert all(os.path.isdir(index_versions.version_path(v, str(tmp_path))) for v in versions)
+
+def test_activate_swaps_the_pointer(tmp_path):
+    root = str(tmp_path)
+    assert current_version(root) is None
+    old, new = build(tmp_path), build(tmp_path)
+    activate(old, root)
+    assert current_version(root) == old
+    activate(new, root)
+    assert current_version(root) == new
+    assert not os.path.exists(os.path.join(root, f"{index_versions.CURRENT_FILE}.tmp"))
+
+def test_activate_refuses_unfinished_builds(tmp_path):
+    root = str(tmp_path)
+    done = build(tmp_path)
+    activate(done, root)
+    partial, _ = new_version("abc12345", root)   # no manifest yet
+    with pytest.raises(ValueError):
+        activate(partial, root)
+    with pytest.raises(ValueError):
+        activate("no-such-version", root)
+    assert current_version(root) == done
+
+def test_gc_keeps_active_and_newest_builds(tmp_path):
+    root = str(tmp_path)
+    versions = [build(tmp_path) for _ in range(5)]
+    activate(versions[0], root)
+    removed = gc(root, keep=2)
+    # The oldest inactive builds go; the active one stays even though it is the oldest
+    assert removed == versions[1:3]
+    assert [v for v, _ in list_versions(root)] == [versions[0]] + versions[3:]
+    assert gc(root, keep=2) == []
+
+def test_gc_removes_only_abandoned_partial_builds(tmp_path):
+    root = str(tmp_path)
+    active = build(tmp_path)
+    activate(active, root)
+    fresh, _ = new_version("abc12345", root)
+    stale, stale_path = new_version("abc12345", root)
+    old = time.time() - index_versions.PARTIAL_BUILD_MAX_AGE_S - 60
+    os.utime(stale_path, (old, old))
+    # A build still being written is left alone
+    assert gc(root) == [stale]
+    assert sorted(os.listdir(root)) == sorted([active, fresh, index_versions.CURRENT_FILE])
+    assert gc(str(tmp_path / "missing")) == []
@@ -0,0 +1,147 @@
+import os
+import time
+import threading
+import zlib
+
+import numpy as np
+import pytest
+from langchain_chroma import Chroma
+
+import ingest
+import index_versions
+
+WORDS = ("wafer demand forecast supplier lead time fab capacity inventory buffer lot "
+         "yield planning logistics carrier customs freight tooling maintenance spare").split()
+
+def passage(seed, length=80):
+    rng = np.random.default_rng(seed)
+    return " ".join(rng.choice(WORDS, length))
+
+PASSAGE = passage(1)
+OTHER = passage(2)
+
+class HashEmbeddings:
+    """
+    Deterministic bag-of-words vectors, so the test needs no embedding model.
+    """
+
+    def __init__(self, model_name=None):
+        pass
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        vector = np.zeros(32)
+        for word in text.lower().split():
+            vector[zlib.crc32(word.encode("utf-8")) % 32] += 1
+        return (vector / (np.linalg.norm(vector) or 1)).tolist()
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ingest, "HuggingFaceEmbeddings", HashEmbeddings)
+    for folder in ingest.get_directories():
+        os.makedirs(folder)
+    return tmp_path
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+def chunk_ids(version):
+    path = os.path.join(index_versions.version_path(version), index_versions.CHROMA_DIR)
+    return sorted(Chroma(persist_directory=path, embedding_function=HashEmbeddings()).get(include=[])["ids"])
+
+def sources(version):
+    path = os.path.join(index_versions.version_path(version), index_versions.CHROMA_DIR)
+    metadatas = Chroma(persist_directory=path, embedding_function=HashEmbeddings()).get(include=["metadatas"])["metadatas"]
+    return sorted(m["source_file"] for m in metadatas)
+
+def update(changed=(), removed=()):
+    # Builds are kept: Chroma caches clients by path, and a rebuilt corpus can reuse a version name
+    result = ingest.update_index({os.path.abspath(p) for p in changed}, {os.path.abspath(p) for p in removed},
+                                 keep=100)
+    full = ingest.build_index(activate=False)
+    # The patched build holds exactly the chunks a full rebuild of the same corpus would
+    assert chunk_ids(result["version"]) == chunk_ids(full)
+    return result
+
+def test_incremental_update_matches_full_rebuild(corpus):
+    write("Job Descriptions/a.txt", PASSAGE)
+    write("Job Descriptions/b.txt", PASSAGE + " customs freight")   # near-copy, dropped in favour of a.txt
+    write("Industry Reports/c.txt", OTHER)
+    version = ingest.build_index()
+    assert sources(version) == ["a.txt", "c.txt"]
+
+    # Adding a near-copy of an unchanged file's chunk does not bring the duplicate back
+    write("Training Curricula/d.txt", OTHER + " spare tooling")
+    result = update(changed=["Training Curricula/d.txt"])
+    assert sources(result["version"]) == ["a.txt", "c.txt"] and result["chunks_added"] == 0
+
+    # a.txt held the kept copy: once the passage leaves it, b.txt's copy takes its place
+    write("Job Descriptions/a.txt", passage(3))
+    result = update(changed=["Job Descriptions/a.txt"])
+    assert sources(result["version"]) == ["a.txt", "b.txt", "c.txt"]
+
+    # A new file earlier in corpus order becomes the survivor, and the copy it replaces is removed
+    write("Job Descriptions/0.txt", PASSAGE)
+    result = update(changed=["Job Descriptions/0.txt"])
+    assert sources(result["version"]) == ["0.txt", "a.txt", "c.txt"] and result["chunks_removed"] == 1
+
+    os.remove("Job Descriptions/0.txt")
+    result = update(removed=["Job Descriptions/0.txt"])
+    assert sources(result["version"]) == ["a.txt", "b.txt", "c.txt"]
+
+def test_update_without_dedup_state_rebuilds(corpus):
+    write("Job Descriptions/a.txt", PASSAGE)
+    version = ingest.build_index()
+    os.remove(os.path.join(index_versions.version_path(version), index_versions.DEDUP_FILE))
+    result = ingest.update_index(set(), set())
+    assert result["chunks_added"] is None and result["version"] != version
+
+def test_watcher_debounces_changes(corpus):
+    watcher = ingest.CorpusWatcher(debounce=5, max_delay=60, metrics_path=None, update=None)
+    watcher.poll()
+    assert not watcher.due()
+
+    write("Job Descriptions/a.txt", PASSAGE)
+    watcher.poll()
+    path = os.path.abspath("Job Descriptions/a.txt")
+    assert watcher.pending == {path: "changed"}
+    assert not watcher.due(watcher.last_change + 4)
+    assert watcher.due(watcher.last_change + 5)
+    # A steady stream of changes is still picked up after max_delay
+    watcher.last_change = watcher.first_change + 59
+    assert not watcher.due(watcher.first_change + 58)
+    assert watcher.due(watcher.first_change + 60)
+
+    os.remove("Job Descriptions/a.txt")
+    watcher.poll()
+    assert watcher.pending == {path: "removed"}
+
+def test_watcher_retries_failed_updates(corpus):
+    calls = []
+
+    def flaky_update(changed, removed, keep):
+        calls.append((set(changed), set(removed)))
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return {"version": "v2", "files": len(changed) + len(removed), "chunks_added": 3, "chunks_removed": 1}
+
+    watcher = ingest.CorpusWatcher(metrics_path=None, update=flaky_update)
+    threading.Thread(target=watcher._work, daemon=True).start()
+    write("Job Descriptions/a.txt", PASSAGE)
+    watcher.poll()
+
+    for expected in ({"failures": 1, "updates": 0}, {"failures": 1, "updates": 1}):
+        watcher.dispatch()
+        deadline = time.time() + 5
+        while watcher._busy.is_set() and time.time() < deadline:
+            time.sleep(0.01)
+        assert {k: watcher.metrics[k] for k in expected} == expected
+
+    # The failed batch was queued again and went into the second update
+    assert calls[0] == calls[1] == ({os.path.abspath("Job Descriptions/a.txt")}, set())
+    assert watcher.pending == {} and watcher.metrics["last_version"] == "v2"
+    assert watcher.metrics["chunks_added"] == 3
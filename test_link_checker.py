@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from validate_links import check_links, refresh_link_status
+from resources import get_resources, load_link_status, save_link_status, LEARNING_RESOURCES
+
+class ResourceSiteHandler(BaseHTTPRequestHandler):
+    """
+    A local resource site:
+    /ok (ETag-aware), /gone (404), /no-head (405 on HEAD), /slow (sleeps).
+    """
+    ETAG = '"v1"'
+
+    def _respond(self):
+        path = self.path.split("?")[0]
+        if path == "/ok":
+            if self.headers.get("If-None-Match") == self.ETAG:
+                self.send_response(304)
+            else:
+                self.send_response(200)
+                self.send_header("ETag", self.ETAG)
+        elif path == "/gone":
+            self.send_response(404)
+        elif path == "/no-head" and self.command == "HEAD":
+            self.send_response(405)
+        elif path == "/slow":
+            time.sleep(0.5)
+            self.send_response(200)
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._respond()
+
+    def do_GET(self):
+        self._respond()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ResourceSiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+def test_link_states(site):
+    urls = [f"{site}/ok", f"{site}/gone", f"{site}/no-head", "http://127.0.0.1:1/refused"]
+    results = asyncio.run(check_links(urls, timeout=2))
+    assert results[f"{site}/ok"]["state"] == "ok"
+    assert results[f"{site}/gone"]["state"] == "dead"
+    assert results[f"{site}/no-head"]["state"] == "ok"
+    # A refused connection is only "unknown" at first; it takes repeated refusals to mark it dead
+    assert results["http://127.0.0.1:1/refused"]["state"] == "unknown"
+    again = asyncio.run(check_links(["http://127.0.0.1:1/refused"], previous=results))
+    assert again["http://127.0.0.1:1/refused"]["state"] == "dead"
+
+    # Conditional request: second check gets a 304 and keeps the previous state
+    again = asyncio.run(check_links([f"{site}/ok"], previous=results))
+    assert again[f"{site}/ok"].get("not_modified") is True
+    assert again[f"{site}/ok"]["state"] == "ok"
+
+def test_timeouts_never_mark_a_link_dead(site):
+    slow = asyncio.run(check_links([f"{site}/slow"], timeout=0.1))
+    assert slow[f"{site}/slow"]["state"] == "unknown"
+
+def test_per_host_limit(site):
+    # 4 slow requests with max_per_host=2 take two rounds
+    start = time.perf_counter()
+    asyncio.run(check_links([f"{site}/slow?{i}" for i in range(4)], max_per_host=2))
+    assert time.perf_counter() - start >= 0.9
+
+def test_status_store_hides_dead_links(site, tmp_path):
+    status_path = str(tmp_path / "link_status.json")
+    # Results are persisted for the app to read
+    refresh_link_status([f"{site}/gone"], path=status_path)
+    assert load_link_status(status_path)[f"{site}/gone"]["state"] == "dead"
+
+    # Dead links from the persisted store are hidden without any network I/O
+    role = "Warehouse Supervisor"
+    dead_url = LEARNING_RESOURCES[role][0][1]
+    save_link_status({dead_url: {"state": "dead"}}, status_path)
+    visible = [url for _, url in get_resources(role, status_path=status_path)]
+    assert dead_url not in visible
+    assert len(visible) == len(LEARNING_RESOURCES[role]) - 1
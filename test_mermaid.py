@@ -0,0 +1,60 @@
+from utils import parse_mermaid, validate_mermaid, repair_mermaid, prepare_mermaid, extract_mermaid
+
+def test_parse_valid_diagram():
+    code = 'graph LR\n    A["Start"] --> B(Plan) -->|next| C{Decide}\n    C --> D & E'
+    result = parse_mermaid(code)
+    assert result["errors"] == [], result["errors"]
+    assert result["direction"] == "LR"
+    assert result["nodes"]["A"] == "Start"
+    assert ("B", "C", "next") in result["edges"]
+    assert ("C", "D", None) in result["edges"] and ("C", "E", None) in result["edges"]
+    assert prepare_mermaid(code) == code
+
+def test_validation_errors():
+    assert validate_mermaid("") == ["empty diagram"]
+    assert any("header" in e for e in validate_mermaid("A --> B"))
+    assert any("mismatched" in e for e in validate_mermaid("graph TD\n    A[Start) --> B"))
+    assert any("subgraph" in e for e in validate_mermaid("graph TD\n    subgraph S\n    A --> B"))
+
+def test_quoted_label_with_parentheses_and_colon():
+    # Valid Mermaid syntax on paper, but these break the renderer even inside quotes
+    code = 'graph TD\n    A["Module 1 (Intro): Basics"] --> B["Module 2"]'
+    errors = validate_mermaid(code)
+    assert any("parentheses or colon" in e for e in errors), errors
+    prepared = prepare_mermaid(code)
+    print(prepared)
+    assert prepared is not None and not validate_mermaid(prepared)
+    assert "(" not in prepared and ":" not in prepared
+    assert "Module 1" in prepared and "Basics" in prepared
+
+def test_edge_label_with_parentheses():
+    prepared = prepare_mermaid('graph TD\n    A -->|phase (1)| B')
+    assert prepared is not None and "(" not in prepared
+
+def test_repair_common_llm_mistakes():
+    code = "```mermaid\nflowchart TD\n- Data Analysis -> Demand Forecasting\n- A -- trains --> B[Model (v2)]\n```"
+    repaired = repair_mermaid(code)
+    print(repaired)
+    assert not validate_mermaid(repaired)
+    assert repaired.startswith("graph TD")
+    assert 'Data_Analysis["Data Analysis"] --> Demand_Forecasting["Demand Forecasting"]' in repaired
+    assert "-->|trains|" in repaired
+
+def test_repair_balances_subgraphs():
+    repaired = repair_mermaid("graph TD\nsubgraph Phase1\nA --> B\nend\nend\nsubgraph Phase2\nC --> D")
+    assert not validate_mermaid(repaired)
+    assert repaired.count("subgraph") == repaired.count("end")
+
+def test_unsalvageable_diagram():
+    assert prepare_mermaid(None) is None
+    assert prepare_mermaid("graph TD\n%% only a comment") is None
+
+def test_extract_unterminated_block():
+    code, rest = extract_mermaid("Intro\n```mermaid\ngraph TD\n    A --> B")
+    assert code == "graph TD\n    A --> B" and rest == "Intro"
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+    print("SUCCESS - Mermaid parsing and repair behave as expected")
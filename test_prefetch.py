@@ -0,0 +1,132 @@
+import time
+import threading
+from types import SimpleNamespace
+from concurrent.futures import CancelledError
+
+import pytest
+
+import prefetch
+from prefetch import Prefetcher
+from utils import build_roadmap_query
+
+ROLE = "Logistics Manager"
+
+class Backend:
+    """
+    Records retrieval and generation calls. `gate` holds each retrieval, and `token_gate`
+    each generated token, until the test releases it.
+    """
+
+    def __init__(self):
+        self.contexts = []
+        self.generations = []
+        self.gate = None
+        self.token_gate = None
+        self.started = threading.Event()
+
+    def build_context(self, query, generation_mode=None):
+        self.contexts.append(query)
+        self.started.set()
+        if self.gate:
+            self.gate.wait(timeout=5)
+        return f"context for {query}"
+
+    def get_rag_response(self, query, role, level, generation_mode=None, context=None, session_id=None):
+        self.generations.append((query, context))
+        for token in ("Week 1", " Week 2", " Week 3"):
+            self.started.set()
+            if self.token_gate:
+                self.token_gate.wait(timeout=5)
+            yield token
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = Backend()
+    monkeypatch.setattr(prefetch, "build_context", backend.build_context)
+    monkeypatch.setattr(prefetch, "get_rag_response", backend.get_rag_response)
+    return backend
+
+@pytest.fixture
+def prefetcher():
+    prefetcher = Prefetcher(ttl=60)
+    yield prefetcher
+    prefetcher.shutdown()
+
+def test_prefetched_context_is_used(backend, prefetcher):
+    prefetcher.schedule("s1", ROLE, 3).result(timeout=5)
+    assert "".join(prefetcher.roadmap_stream("s1", ROLE, 3)) == "Week 1 Week 2 Week 3"
+    query = build_roadmap_query(ROLE, 3)
+    assert backend.contexts == [query]
+    assert backend.generations == [(query, f"context for {query}")]
+    assert prefetcher.stats["context_hits"] == 1
+
+    # Other settings than the prefetched ones: retrieval happens in get_rag_response
+    list(prefetcher.roadmap_stream("s1", ROLE, 4))
+    assert backend.generations[-1] == (build_roadmap_query(ROLE, 4), None)
+    assert prefetcher.stats["misses"] == 1
+
+def test_rescheduling_cancels_queued_work(backend, prefetcher):
+    backend.gate = threading.Event()
+    prefetcher.schedule("s1", ROLE, 1)          # occupies the only worker
+    assert backend.started.wait(timeout=5)
+    queued = prefetcher.schedule("s2", ROLE, 2)
+    latest = prefetcher.schedule("s2", ROLE, 3)
+    assert queued.cancelled() and prefetcher.stats["cancelled"] == 1
+    backend.gate.set()
+    latest.result(timeout=5)
+    # The superseded settings were never retrieved
+    assert backend.contexts == [build_roadmap_query(ROLE, 1), build_roadmap_query(ROLE, 3)]
+
+def test_stale_token_skips_work_that_already_started(backend, prefetcher):
+    backend.gate = threading.Event()
+    prefetcher.schedule("s0", ROLE, 1)
+    assert backend.started.wait(timeout=5)
+    stale = prefetcher.schedule("s1", ROLE, 2)
+    # A newer token without a cancel, as when settings change just as the worker picks the job up
+    with prefetcher._lock:
+        prefetcher._tokens["s1"] += 1
+    backend.gate.set()
+    assert stale.result(timeout=5) is None
+    assert prefetcher.stats["superseded"] == 1
+    assert build_roadmap_query(ROLE, 2) not in backend.contexts
+
+def test_prefetched_generation_stops_when_superseded(backend):
+    prefetcher = Prefetcher(ttl=60, generate=True)
+    prefetcher.schedule("s1", ROLE, 1).result(timeout=5)
+    # A finished generation is served from the buffer without calling the model again
+    assert "".join(prefetcher.roadmap_stream("s1", ROLE, 1)) == "Week 1 Week 2 Week 3"
+    assert prefetcher.stats["stream_hits"] == 1 and len(backend.generations) == 1
+
+    backend.token_gate = threading.Event()
+    running = prefetcher.schedule("s1", ROLE, 2)
+    query = build_roadmap_query(ROLE, 2)
+    # Wait until generation is underway, then change the settings again
+    deadline = time.time() + 5
+    while not (backend.generations[-1:] and backend.generations[-1][0] == query) and time.time() < deadline:
+        time.sleep(0.01)
+    with prefetcher._lock:
+        stream = prefetcher._streams[("s1", query)][1]
+    prefetcher.schedule("s1", ROLE, 3)
+    backend.token_gate.set()
+    running.result(timeout=5)
+    assert prefetcher.stats["superseded"] == 1
+    with pytest.raises(CancelledError):
+        list(stream)
+    # The stale stream was dropped, not handed to the next click
+    assert ("s1", query) not in prefetcher._streams
+    prefetcher.shutdown()
+
+def test_idle_sessions_are_forgotten(backend, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prefetch, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    prefetcher = Prefetcher(ttl=60)
+    prefetcher.schedule("s1", ROLE, 1).result(timeout=5)
+    now[0] += 61
+    prefetcher.schedule("s2", ROLE, 1).result(timeout=5)
+    assert set(prefetcher._tokens) == {"s2"} and set(prefetcher._futures) == {"s2"}
+    # Expired contexts are not served
+    list(prefetcher.roadmap_stream("s2", ROLE, 2))
+    now[0] += 61
+    list(prefetcher.roadmap_stream("s2", ROLE, 1))
+    assert prefetcher.stats["context_hits"] == 0 and prefetcher.stats["misses"] == 2
+    prefetcher.shutdown()
@@ -0,0 +1,101 @@
+import time
+import sqlite3
+
+from store import ProgressStore
+
+def test_writes_are_batched(tmp_path):
+    store = ProgressStore(str(tmp_path / "progress.db"), batch_size=10, flush_interval=60)
+    for i in range(25):
+        store.add_chat_message("u1", "user", f"message {i}")
+    assert (store.stats["writes"], store.stats["flushes"]) == (25, 2)
+    assert len(store._pending) == 5
+    # Reads flush first, so the caller sees its own writes
+    assert len(store.chat_page("u1", limit=100)) == 25
+    assert store.stats["flushes"] == 3
+    store.close()
+
+def test_writes_survive_reopen(tmp_path):
+    path = str(tmp_path / "progress.db")
+    store = ProgressStore(path, flush_interval=60)
+    store.save_profile("u1", "Logistics Manager", 3)
+    store.save_profile("u1", "Procurement Lead", 4)
+    store.record_quiz_attempt("u1", "Procurement Lead", 4, 7, 10)
+    roadmap_id = store.save_roadmap("u1", "Procurement Lead", 4, "# Plan")
+    store.close()
+
+    store = ProgressStore(path)
+    assert store.get_profile("u1") == {"role": "Procurement Lead", "ai_literacy": 4}
+    assert store.latest_quiz_attempt("u1")["score"] == 7
+    assert store.latest_roadmap_id("u1") == roadmap_id
+    assert store.get_roadmap(roadmap_id) == "# Plan"
+    assert store.get_profile("nobody") is None and store.get_roadmap(None) is None
+    store.close()
+
+def test_chat_paging(tmp_path):
+    store = ProgressStore(str(tmp_path / "progress.db"))
+    for i in range(7):
+        store.add_chat_message("u1", "user" if i % 2 == 0 else "assistant", f"m{i}")
+    store.add_chat_message("u2", "user", "other user")
+    # Most recent window, oldest first
+    assert [m["content"] for m in store.chat_page("u1", limit=3)] == ["m4", "m5", "m6"]
+    assert [m["content"] for m in store.chat_page("u1", limit=3, offset=3)] == ["m1", "m2", "m3"]
+    assert [m["content"] for m in store.chat_page("u1", limit=3, offset=6)] == ["m0"]
+    assert store.chat_page("u1", limit=3)[0] == {"role": "user", "content": "m4"}
+    store.close()
+
+def test_flashcards_keep_review_history(tmp_path):
+    store = ProgressStore(str(tmp_path / "progress.db"))
+    store.save_flashcards("u1", [{"term": "OTIF", "definition": "On time in full"},
+                                 {"term": "MRP", "definition": "Material requirements planning"}])
+    store.record_flashcard_review("u1", "OTIF")
+    store.save_flashcards("u1", [{"term": "OTIF", "definition": "On-time, in-full delivery"}])
+    deck = store.flashcard_deck("u1")
+    # Least-reviewed first; regenerating a card keeps its review count
+    assert [c["term"] for c in deck] == ["MRP", "OTIF"]
+    assert deck[1] == {"term": "OTIF", "definition": "On-time, in-full delivery", "reviews": 1}
+    store.close()
+
+def lock_database(path):
+    """
+    A second connection holding the write lock, like another process mid-transaction.
+    """
+    other = sqlite3.connect(path)
+    other.execute("BEGIN EXCLUSIVE")
+    return other
+
+def test_failed_flush_keeps_the_batch(tmp_path):
+    path = str(tmp_path / "progress.db")
+    store = ProgressStore(path, batch_size=3, flush_interval=60)
+    store._conn.execute("PRAGMA busy_timeout = 50")
+    other = lock_database(path)
+    for i in range(3):
+        store.add_chat_message("u1", "user", f"m{i}")   # the third write triggers a flush, which fails
+    assert store.stats["failed_flushes"] == 1
+    assert len(store._pending) == 3
+
+    store.add_chat_message("u1", "user", "m3")
+    other.rollback()
+    other.close()
+    assert [m["content"] for m in store.chat_page("u1")] == ["m0", "m1", "m2", "m3"]
+    store.close()
+
+def test_flush_loop_survives_errors(tmp_path):
+    path = str(tmp_path / "progress.db")
+    store = ProgressStore(path, flush_interval=0.05)
+    store._conn.execute("PRAGMA busy_timeout = 10")
+    other = lock_database(path)
+    store.add_chat_message("u1", "user", "queued while locked")
+    time.sleep(0.3)
+    with store._lock:
+        assert store.stats["failed_flushes"] >= 2 and store._pending
+
+    other.rollback()
+    other.close()
+    # The background thread is still running and commits the batch on its own
+    deadline = time.time() + 5
+    while not store.stats["flushes"] and time.time() < deadline:
+        time.sleep(0.02)
+    with store._lock:
+        assert store.stats["flushes"] == 1 and not store._pending
+    assert sqlite3.connect(path).execute("SELECT content FROM chat_messages").fetchall() == [("queued while locked",)]
+    store.close()
@@ -0,0 +1,53 @@
+import threading
+import time
+
+from engine import RateLimiter
+
+def test_disabled_limits_never_wait():
+    limiter = RateLimiter()
+    start = time.monotonic()
+    for _ in range(100):
+        limiter.acquire(10_000)
+    assert time.monotonic() - start < 0.5
+    assert limiter.stats["acquired"] == 100
+
+def test_request_limit_wait_time():
+    limiter = RateLimiter(requests_per_minute=2)
+    limiter._window = [(100.0, 0), (110.0, 0)]
+    # The third request must wait until the first leaves the 60 s window
+    assert limiter._wait_time(0, 120.0) == 40.0
+    assert limiter._wait_time(0, 160.0) == 0.0  # first call expired; one slot free
+    limiter = RateLimiter(requests_per_minute=3)
+    limiter._window = [(100.0, 0), (110.0, 0)]
+    assert limiter._wait_time(0, 120.0) == 0.0
+
+def test_token_limit_wait_time():
+    limiter = RateLimiter(tokens_per_minute=1000)
+    limiter._window = [(100.0, 400), (110.0, 400), (115.0, 100)]
+    assert limiter._wait_time(100, 120.0) == 0.0          # 1000 tokens fit exactly
+    assert limiter._wait_time(300, 120.0) == 40.0         # the first call's 400 must expire
+    assert limiter._wait_time(600, 120.0) == 50.0         # ...and the second call's
+    # Old entries are pruned from the window
+    assert limiter._wait_time(0, 500.0) == 0.0 and limiter._window == []
+
+def test_waiters_are_released_in_time():
+    limiter = RateLimiter(requests_per_minute=1)
+    # A call 59.8 s ago holds the only slot for another ~0.2 s
+    limiter._window = [(time.monotonic() - 59.8, 0)]
+    done = []
+    worker = threading.Thread(target=lambda: (limiter.acquire(), done.append(time.monotonic())))
+    start = time.monotonic()
+    worker.start()
+    worker.join(timeout=5)
+    assert done, "acquire never returned"
+    waited = done[0] - start
+    print(f"waited {waited:.2f}s for the window to free up")
+    assert 0.1 <= waited < 2.0
+    assert limiter.stats["waited_s"] >= 0.1
+
+if __name__ == "__main__":
+    test_disabled_limits_never_wait()
+    test_request_limit_wait_time()
+    test_token_limit_wait_time()
+    test_waiters_are_released_in_time()
+    print("SUCCESS - rate limiter waits exactly as long as the limits require")
@@ -0,0 +1,44 @@
+from utils import parse_roadmap_markdown, generate_pdf_report
+
+ROADMAP = """# Training Path
+Intro paragraph with **bold** and a [link](https://example.com).
+
+| Module | Topic |
+|---|---|
+| Module 1 | Data basics |
+| Module 2 |
+
+- First step
+- Second step
+
+```mermaid
+graph TD
+    A --> B
+```
+"""
+
+def test_parse_blocks():
+    blocks = parse_roadmap_markdown(ROADMAP)
+    kinds = [kind for kind, _ in blocks]
+    assert kinds == ["heading", "paragraph", "table", "bullet", "bullet", "note"], kinds
+    assert blocks[1][1] == "Intro paragraph with bold and a link (https://example.com)."
+    # Short rows are padded to the table width
+    assert blocks[2][1] == [["Module", "Topic"], ["Module 1", "Data basics"], ["Module 2", ""]]
+
+def test_empty_tables_are_skipped():
+    for text in ("|---|---|", "| | |\n|---|---|\n|  |  |", "Before\n|---|\nAfter"):
+        blocks = parse_roadmap_markdown(text)
+        assert all(kind != "table" for kind, _ in blocks), blocks
+
+def test_pdf_survives_malformed_table():
+    pdf = generate_pdf_report("Logistics Manager", 3, None, "# Plan\n|---|---|\n\nText")
+    if pdf is None:
+        print("fpdf2 not installed; skipped the PDF check")
+        return
+    assert pdf.startswith(b"%PDF")
+
+if __name__ == "__main__":
+    test_parse_blocks()
+    test_empty_tables_are_skipped()
+    test_pdf_survives_malformed_table()
+    print("SUCCESS - roadmap Markdown parsing handles malformed tables")
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+from langchain_core.documents import Document
+
+from rerank import CrossEncoderReranker
+
+class OverlapCrossEncoder:
+    """
+    Scores a pair by query-word overlap and sleeps delay_ms per pair, so tests need no model download.
+    """
+
+    def __init__(self, delay_ms=0.0):
+        self.delay_ms = delay_ms
+        self.pairs = 0
+
+    def predict(self, pairs, batch_size=32):
+        self.pairs += len(pairs)
+        time.sleep(self.delay_ms * len(pairs) / 1000)
+        return [len(set(q.lower().split()) & set(t.lower().split())) for q, t in pairs]
+
+@pytest.fixture
+def reranker():
+    reranker = CrossEncoderReranker()
+    reranker._model = OverlapCrossEncoder()
+    return reranker
+
+DOCS = [Document(page_content=text) for text in (
+    "office floor plans",
+    "wafer demand forecasting",
+    "AI demand forecasting for wafer starts",
+    "supplier contracts",
+)]
+
+def test_reorders_by_score(reranker):
+    top = reranker.rerank("AI wafer demand forecasting", DOCS, 2)
+    assert [d.page_content for d in top] == [DOCS[2].page_content, DOCS[1].page_content]
+
+def test_cache_avoids_rescoring(reranker):
+    reranker.rerank("wafer demand", DOCS, 2)
+    scored = reranker._model.pairs
+    reranker.rerank("wafer demand", DOCS, 2)
+    assert reranker._model.pairs == scored
+    assert reranker.stats["cache_hits"] == len(DOCS)
+
+def test_skips_when_over_budget():
+    reranker = CrossEncoderReranker(budget_ms=30)
+    reranker._model = OverlapCrossEncoder(delay_ms=20)
+    reranker.rerank("first query", DOCS, 2)          # measures ~20 ms per pair
+    before = reranker._model.pairs
+    top = reranker.rerank("another query", DOCS, 2)  # predicted ~80 ms > 30 ms budget
+    assert reranker.stats["skipped"] == 1
+    assert reranker._model.pairs == before
+    assert top == DOCS[:2]  # retriever order kept
+
+def test_trivial_inputs(reranker):
+    assert reranker.rerank("q", [], 3) == []
+    assert reranker.rerank("q", DOCS[:1], 3) == DOCS[:1]
+    assert reranker._model.pairs == 0
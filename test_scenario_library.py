@@ -0,0 +1,76 @@
+import pytest
+
+from scenario_library import ScenarioLibrary
+
+ROLE = "Logistics Manager"
+
+# Scenario name -> embedding; a scenario's text starts with its name
+VECTORS = {
+    "flood": [1.0, 0.0, 0.0],
+    "flood-again": [0.95, 0.31, 0.0],   # cosine 0.95 with "flood": a duplicate
+    "outage": [0.8, 0.6, 0.0],          # cosine 0.8 with "flood": different enough
+    "strike": [0.0, 0.0, 1.0],
+}
+
+def embed(texts):
+    return [VECTORS[text.split()[0]] for text in texts]
+
+def scenario(name, competency=None):
+    return {"scenario": f"{name} at the fab", "question": "What do you do?", "competency": competency}
+
+@pytest.fixture
+def library(tmp_path):
+    library = ScenarioLibrary(str(tmp_path / "scenarios.db"), embed=embed, generate=lambda role, level, count: [])
+    yield library
+    library.close()
+
+def test_near_duplicates_are_skipped(library, tmp_path):
+    assert library.add(ROLE, 2, [scenario("flood"), scenario("flood-again"), scenario("outage")]) == 2
+    assert library.stats["duplicates"] == 1
+    # Checked against what is already stored, per (role, level)
+    assert library.add(ROLE, 2, [scenario("flood-again")]) == 0
+    assert library.add(ROLE, 3, [scenario("flood-again")]) == 1
+    assert library.count(ROLE, 2) == 2
+
+    # Stored embeddings are reloaded after a restart
+    reopened = ScenarioLibrary(str(tmp_path / "scenarios.db"), embed=embed)
+    assert reopened.add(ROLE, 2, [scenario("flood-again"), scenario("strike")]) == 1
+    reopened.close()
+
+def test_threshold_is_inclusive_and_configurable(tmp_path):
+    strict = ScenarioLibrary(str(tmp_path / "strict.db"), embed=embed, threshold=0.99)
+    assert strict.add(ROLE, 2, [scenario("flood"), scenario("flood-again")]) == 2
+    strict.close()
+    loose = ScenarioLibrary(str(tmp_path / "loose.db"), embed=embed, threshold=0.8)
+    assert loose.add(ROLE, 2, [scenario("flood"), scenario("outage")]) == 1
+    loose.close()
+
+def test_pick_order(library):
+    library.add(ROLE, 2, [scenario("flood", "Safety"), scenario("outage", "Logistics Ops"),
+                          scenario("strike", "Safety")])
+    # The requested competency first, while any are unseen
+    served = [library.next_scenario("u1", ROLE, 2, "Safety")["scenario"] for _ in range(2)]
+    assert sorted(served) == ["flood at the fab", "strike at the fab"]
+    # ...then any unseen scenario
+    assert library.next_scenario("u1", ROLE, 2, "Safety")["scenario"] == "outage at the fab"
+    # ...then the one this user saw longest ago
+    assert library.next_scenario("u1", ROLE, 2, "Safety")["scenario"] == served[0]
+    assert library.next_scenario("u1", ROLE, 2)["scenario"] == served[1]
+    # Views are per user
+    assert library.unseen_count("u1", ROLE, 2) == 0 and library.unseen_count("u2", ROLE, 2) == 3
+
+def test_empty_library_fills_live(tmp_path):
+    batches = []
+
+    def generate(role, level, count):
+        batches.append((role, level, count))
+        return [scenario("flood"), scenario("strike")]
+
+    library = ScenarioLibrary(str(tmp_path / "scenarios.db"), embed=embed, generate=generate, batch_size=2)
+    first = library.next_scenario("u1", ROLE, 4)
+    assert first is not None and library.stats["live_fills"] == 1
+    assert batches[0] == (ROLE, 4, 2)
+    library.close()
+    # Below the refill threshold a background batch is queued; it only adds duplicates here
+    assert library.stats["refills"] >= 1 and library.stats["generated"] == 2
+    assert library.stats["duplicates"] == 2 * (len(batches) - 1)
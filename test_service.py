@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import engine
+import service
+
+@pytest.fixture
+def client(monkeypatch):
+    # A fresh limiter per test, with room for two requests
+    monkeypatch.setattr(service, "_slots", asyncio.Semaphore(2))
+    monkeypatch.setattr(service, "_stats", {"in_flight": 0, "served": 0, "rejected": 0, "errors": 0})
+    monkeypatch.setattr(engine, "get_chroma_db", lambda: None)
+    # One event loop for every request, as under uvicorn
+    with TestClient(service.app) as client:
+        yield client
+
+def events(response):
+    return [block for block in response.text.split("\n\n") if block]
+
+def test_stream_releases_its_slot(client, monkeypatch):
+    monkeypatch.setattr(engine, "get_rag_response", lambda query, **kwargs: iter(["Hello", " there"]))
+    for _ in range(3):   # more requests than slots: each one must give its slot back
+        response = client.post("/rag/stream", json={"query": "hi"})
+        assert response.status_code == 200
+        assert events(response) == ['data: {"token": "Hello"}', 'data: {"token": " there"}',
+                                    "event: done\ndata: {}"]
+    assert service._slots._value == 2
+    assert client.get("/health").json()["in_flight"] == 0 and service._stats["served"] == 3
+
+def test_stream_error_releases_its_slot(client, monkeypatch):
+    def failing(query, **kwargs):
+        yield "Partial"
+        raise RuntimeError("model went away")
+
+    monkeypatch.setattr(engine, "get_rag_response", failing)
+    response = client.post("/rag/stream", json={"query": "hi"})
+    assert events(response)[-1] == 'event: error\ndata: {"error": "model went away"}'
+    assert service._slots._value == 2
+    assert service._stats["errors"] == 1 and service._stats["in_flight"] == 0
+
+def test_queue_timeout_returns_503(client, monkeypatch):
+    monkeypatch.setattr(service, "_slots", asyncio.Semaphore(0))   # every slot taken
+    monkeypatch.setattr(service, "QUEUE_TIMEOUT", 0.05)
+    monkeypatch.setattr(engine, "get_rag_response", lambda query, **kwargs: iter(["never"]))
+    response = client.post("/rag/stream", json={"query": "hi"})
+    assert response.status_code == 503
+    assert client.post("/quiz", json={"role": "Logistics Manager", "level": 2}).status_code == 503
+    assert service._stats["rejected"] == 2 and service._stats["in_flight"] == 0
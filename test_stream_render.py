@@ -0,0 +1,118 @@
+import pytest
+
+from stream_render import split_complete_blocks, StreamRenderer, CURSOR
+
+class RecordingElement:
+    """
+    Records what st.empty() would have shown: every Markdown string it was sent.
+    """
+
+    def __init__(self):
+        self.sent = []
+
+    def markdown(self, text):
+        self.sent.append(text)
+
+    def empty(self):
+        self.sent.append("")
+
+    @property
+    def shown(self):
+        return self.sent[-1] if self.sent else ""
+
+class RecordingContainer:
+    def __init__(self):
+        self.elements = []
+
+    def empty(self):
+        self.elements.append(RecordingElement())
+        return self.elements[-1]
+
+    def page(self):
+        return [e.shown for e in self.elements if e.shown]
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def container():
+    return RecordingContainer()
+
+@pytest.fixture
+def clock():
+    return VirtualClock()
+
+@pytest.fixture
+def diagrams():
+    return []
+
+@pytest.fixture
+def renderer(container, clock, diagrams):
+    return StreamRenderer(container, on_mermaid=diagrams.append, interval=0.1, clock=clock)
+
+def test_split_complete_blocks():
+    assert split_complete_blocks("One\n\nTwo\n\nThr") == (["One", "Two"], "Thr")
+    # The last blank line only closes a block once the next one has started
+    assert split_complete_blocks("One\n\n") == ([], "One\n\n")
+    # Blank lines inside a code fence don't split it
+    fenced = "```python\na = 1\n\nb = 2\n```\n\nAfter"
+    assert split_complete_blocks(fenced) == (["```python\na = 1\n\nb = 2\n```"], "After")
+    # An indented line continues the list item above it
+    listed = "- item\n\n  more of the item\n\nNext"
+    assert split_complete_blocks(listed) == (["- item\n\n  more of the item"], "Next")
+
+def test_throttles_updates(renderer, container, clock):
+    renderer.max_pending = 1000
+    for _ in range(50):
+        clock.now += 0.01
+        renderer.write("word ")
+    renderer.close()
+    # 0.5 s of tokens at 0.1 s intervals, plus the final render
+    assert renderer.stats["updates"] <= 6, renderer.stats
+    assert [text.strip() for text in container.page()] == [("word " * 50).strip()]
+
+def test_flushes_when_text_piles_up(renderer):
+    renderer.max_pending = 20
+    renderer.write("x" * 25)   # no time has passed, but the backlog is over max_pending
+    assert renderer.stats["updates"] == 1
+
+def test_finished_blocks_are_sent_once(renderer, container, clock):
+    for chunk in ("# Title\n\n", "First para", "graph\n\nSecond ", "para\n\nThird"):
+        clock.now += 1
+        renderer.write(chunk)
+    assert container.elements[0].sent == ["# Title" + CURSOR, "# Title"]
+    assert container.elements[1].sent == ["First para" + CURSOR, "First paragraph"]
+    assert container.page()[-1] == "Third" + CURSOR
+    renderer.close()
+    assert container.page() == ["# Title", "First paragraph", "Second para", "Third"]
+    assert renderer.stats["blocks"] == 3
+
+def test_mermaid_is_extracted_not_shown(renderer, container, clock, diagrams):
+    for chunk in ("Plan:\n\n```mermaid\ngraph TD\n", "    A --> B\n", "```\n\nDone"):
+        clock.now += 1
+        renderer.write(chunk)
+        assert not any("graph TD" in text for e in container.elements for text in e.sent)
+    renderer.close()
+    assert diagrams == ["graph TD\n    A --> B"]
+    assert container.page() == ["Plan:", "Done"]
+    assert renderer.clean_text() == "Plan:\n\n\n\nDone"
+
+def test_stream_ends_inside_mermaid_fence(renderer, container, clock, diagrams):
+    for chunk in ("Roadmap\n\n", "```mermaid\ngraph TD\n", "    A --> B"):
+        clock.now += 1
+        renderer.write(chunk)
+    assert diagrams == []
+    renderer.close()
+    # The unterminated diagram is still extracted, and its source never reaches the page
+    assert diagrams == ["graph TD\n    A --> B"]
+    assert container.page() == ["Roadmap"]
+    assert not any("mermaid" in text for e in container.elements for text in e.sent)
+    assert renderer.clean_text() == "Roadmap"
+
+def test_empty_stream(renderer, container, diagrams):
+    assert renderer.feed(iter([])) == ""
+    assert container.page() == [] and diagrams == []
@@ -1,4 +1,9 @@
 import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
 import streamlit as st
 
 def load_config():
@@ -20,6 +25,15 @@ def get_directories():
         "Training Curricula"
     ]
 
+def build_roadmap_query(role, ai_literacy_level):
+    """
+    Build the query the Learning Path tab sends in "roadmap" mode.
+    """
+    return f"Create a comprehensive learning roadmap for a {role} with AI literacy level {ai_literacy_level} in the semiconductor industry. Include a mermaid chart."
+
+# Competency axes shown on the radar and used to tag scenarios
+COMPETENCIES = ['Data Literacy', 'Logistics Ops', 'AI Strategy', 'Safety', 'Procurement']
+
 def ensure_directory_exists(path):
     """
     Ensure that a directory exists.
@@ -27,77 +41,528 @@ def ensure_directory_exists(path):
     if not os.path.exists(path):
         os.makedirs(path)
 
-# NEW: PDF Report Generator
-def generate_pdf_report(role, literacy_level, quiz_score, roadmap_text=None):
+def process_rss_mb():
     """
-    Generates a PDF report for the user.
-    Returns bytes content of the PDF.
+    Resident set size of this process in MB (Linux /proc, else ru_maxrss peak).
     """
     try:
-        from fpdf import FPDF
-    except ImportError:
-        return None
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# NEW: PDF Report Generator
+REPORT_TITLE = "Semiconductor Logistics AI-Upskiller | Career Report"
+REPORT_CACHE_SIZE = 32
+REPORT_MIN_FPDF_VERSION = (2, 7)  # pdf.table(); the legacy PyFPDF (1.7) shares the "fpdf" module name
+
+# Unicode TTF fonts, first match wins. REPORT_FONT_PATH overrides the search.
+REPORT_FONT_CANDIDATES = [
+    ("fonts/DejaVuSans.ttf", "fonts/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/dejavu/DejaVuSans.ttf", "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf"),
+    ("C:/Windows/Fonts/arial.ttf", "C:/Windows/Fonts/arialbd.ttf"),
+]
+
+# Used only when no Unicode font is available and we must fall back to latin-1 core fonts
+_LATIN1_REPLACEMENTS = {
+    "\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"',
+    "\u2013": "-", "\u2014": "-", "\u2022": "-", "\u2026": "...",
+    "\u2192": "->", "\u2190": "<-", "\u2265": ">=", "\u2264": "<=", "\u00a0": " ",
+}
+
+_MERMAID_BLOCK_RE = re.compile(r"```mermaid.*?```", re.DOTALL)
+_FENCE_RE = re.compile(r"^```")
+_TABLE_SEPARATOR_RE = re.compile(r"^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?$")
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+_BULLET_RE = re.compile(r"^\s*(?:[-*+]|\d+\.)\s+(.*)$")
+_LINK_RE = re.compile(r"\[([^\]]+)\]\(([^)]+)\)")
+_INLINE_MARKUP_RE = re.compile(r"(\*\*|__|`)")
+
+_report_cache = OrderedDict()
+_report_cache_lock = threading.Lock()
+
+def _find_report_font():
+    """
+    Return (regular_path, bold_path) for a Unicode TTF font, or None.
+    """
+    override = os.environ.get("REPORT_FONT_PATH")
+    candidates = [(override, override)] if override else []
+    candidates += REPORT_FONT_CANDIDATES
+    for regular, bold in candidates:
+        if regular and os.path.exists(regular):
+            return regular, bold if bold and os.path.exists(bold) else regular
+    return None
+
+def _clean_inline(text):
+    """
+    Strip inline Markdown (bold, code, links) that the PDF cannot render.
+    """
+    text = _LINK_RE.sub(r"\1 (\2)", text)
+    return _INLINE_MARKUP_RE.sub("", text).strip()
+
+def _parse_table_row(line):
+    return [_clean_inline(cell) for cell in line.strip().strip("|").split("|")]
+
+def parse_roadmap_markdown(text):
+    """
+    Split roadmap Markdown into renderable blocks.
+    Returns a list of (kind, payload) where kind is one of
+    "heading", "bullet", "table", "paragraph" or "note".
+    """
+    blocks = []
+    text = _MERMAID_BLOCK_RE.sub("\n[[MERMAID]]\n", text)
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i].rstrip()
+        stripped = line.strip()
+
+        if not stripped or _FENCE_RE.match(stripped):
+            i += 1
+            continue
+
+        if stripped == "[[MERMAID]]":
+            blocks.append(("note", "Visual roadmap diagram available in the Learning Path tab."))
+            i += 1
+            continue
+
+        if stripped.startswith("|"):
+            rows = []
+            while i < len(lines) and lines[i].strip().startswith("|"):
+                row_line = lines[i].strip()
+                if not _TABLE_SEPARATOR_RE.match(row_line):
+                    row = _parse_table_row(row_line)
+                    if any(row):
+                        rows.append(row)
+                i += 1
+            # Malformed LLM tables (only a separator, only empty cells) are dropped
+            if rows:
+                width = max(len(r) for r in rows)
+                rows = [r + [""] * (width - len(r)) for r in rows]
+                blocks.append(("table", rows))
+            continue
+
+        heading = _HEADING_RE.match(stripped)
+        if heading:
+            blocks.append(("heading", _clean_inline(heading.group(2))))
+        elif _BULLET_RE.match(line):
+            blocks.append(("bullet", _clean_inline(_BULLET_RE.match(line).group(1))))
+        else:
+            blocks.append(("paragraph", _clean_inline(stripped)))
+        i += 1
+    return blocks
+
+def _build_report_pdf(role, literacy_level, quiz_score, roadmap_text, competencies=None):
+    """
+    Lay out the career report and return the FPDF document.
+    Raises ImportError if fpdf2 is not installed, and RuntimeError if the
+    legacy PyFPDF package (or an fpdf2 older than 2.7) is installed instead.
+    """
+    import fpdf
+    version = tuple(int(p) for p in re.findall(r"\d+", getattr(fpdf, "FPDF_VERSION", "0"))[:2])
+    if version < REPORT_MIN_FPDF_VERSION:
+        raise RuntimeError(
+            f"PDF reports need fpdf2 >= {'.'.join(map(str, REPORT_MIN_FPDF_VERSION))}, but 'fpdf' "
+            f"{getattr(fpdf, 'FPDF_VERSION', '?')} is installed. Run: pip uninstall fpdf && pip install fpdf2"
+        )
+    from fpdf import FPDF
+    from fpdf.enums import XPos, YPos
+
+    font = _find_report_font()
+    family = "ReportSans" if font else "Helvetica"
+
+    def txt(value):
+        value = str(value)
+        if font:
+            return value
+        for src, dst in _LATIN1_REPLACEMENTS.items():
+            value = value.replace(src, dst)
+        return value.encode("latin-1", "replace").decode("latin-1")
 
     class ReportPDF(FPDF):
         def header(self):
-            self.set_font('Arial', 'B', 15)
-            self.cell(0, 10, 'Semiconductor Logistics AI-Upskiller | Career Report', 0, 1, 'C')
+            self.set_font(family, 'B', 15)
+            self.cell(0, 10, txt(REPORT_TITLE), align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             self.ln(10)
 
         def footer(self):
             self.set_y(-15)
-            self.set_font('Arial', 'I', 8)
-            self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
+            self.set_font(family, '', 8)
+            self.cell(0, 10, f'Page {self.page_no()}', align='C')
 
     pdf = ReportPDF()
+    if font:
+        pdf.add_font(family, "", font[0])
+        pdf.add_font(family, "B", font[1])
+    pdf.set_auto_page_break(auto=True, margin=20)
     pdf.add_page()
-    
+
+    def line(text, h=10, style='', size=11):
+        pdf.set_font(family, style, size)
+        pdf.cell(0, h, txt(text), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    def section(title):
+        pdf.ln(5)
+        line(title, style='B', size=12)
+        pdf.set_font(family, '', 11)
+
     # 1. Profile Summary
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "1. Professional Profile", 0, 1)
-    pdf.set_font("Arial", '', 11)
-    pdf.cell(0, 10, f"Target Role: {role}", 0, 1)
-    pdf.cell(0, 10, f"Current AI Literacy Level: {literacy_level}/5", 0, 1)
-    
-    # 2. Competency Gap Analysis (Simulated based on Role logic)
-    pdf.ln(5)
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "2. Competency Gap Analysis", 0, 1)
-    pdf.set_font("Arial", '', 11)
-    
-    # Replicate the logic from main.py
-    base_val = literacy_level
-    if role == "Logistics Manager":
-        skills = {"Logistics Ops": base_val+1, "Procurement": base_val-1}
-    elif role == "Supply Chain Analyst":
-        skills = {"Data Literacy": base_val+2, "AI Strategy": base_val+1}
-    else:
-        skills = {"General Operations": base_val}
-        
+    line("1. Professional Profile", style='B', size=12)
+    line(f"Target Role: {role}")
+    line(f"Current AI Literacy Level: {literacy_level}/5")
+
+    # 2. Competency Gap Analysis (from graded quiz/scenario results; self-assessment without them)
+    section("2. Competency Gap Analysis")
+    skills = competencies or {c: literacy_level for c in COMPETENCIES}
+    weakest = min(skills, key=skills.get)
     for skill, val in skills.items():
-        pdf.cell(0, 7, f"- {skill}: Level {min(val, 5)}/5", 0, 1)
-        
+        marker = "  (focus area)" if skill == weakest and competencies else ""
+        line(f"- {skill}: Level {min(val, 5):g}/5{marker}", h=7)
+
     # 3. Assessment Results
-    pdf.ln(5)
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "3. Quiz Performance", 0, 1)
-    pdf.set_font("Arial", '', 11)
+    section("3. Quiz Performance")
     if quiz_score is not None:
-        pdf.cell(0, 10, f"Make-A-Quiz Score: {quiz_score}/5", 0, 1)
+        line(f"Make-A-Quiz Score: {quiz_score}/5")
     else:
-        pdf.cell(0, 10, "No quiz attempted yet.", 0, 1)
-        
-    # 4. Roadmap Summary
-    pdf.ln(5)
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "4. Recommended Action Plan", 0, 1)
-    pdf.set_font("Arial", '', 11)
-    if roadmap_text:
-        # Simple cleanup to remove markdown bolding for PDF
-        clean_text = roadmap_text.replace('**', '').replace('###', '')
-        # Multi-cell for wrapping text
-        pdf.multi_cell(0, 6, clean_text[:2000] + ("..." if len(clean_text) > 2000 else ""))
+        line("No quiz attempted yet.")
+
+    # 4. Roadmap (full text, tables rendered as tables)
+    section("4. Recommended Action Plan")
+    if not roadmap_text:
+        line("Please generate a roadmap in the 'Learning Path' tab to see it here.")
+        return pdf
+
+    bullet = "\u2022" if font else "-"
+    for kind, payload in parse_roadmap_markdown(roadmap_text):
+        if kind == "heading":
+            pdf.ln(2)
+            pdf.set_font(family, 'B', 11)
+            pdf.multi_cell(0, 7, txt(payload), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        elif kind == "bullet":
+            pdf.set_font(family, '', 10)
+            pdf.set_x(pdf.l_margin + 4)
+            pdf.multi_cell(0, 6, txt(f"{bullet} {payload}"), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        elif kind == "table":
+            pdf.ln(2)
+            pdf.set_font(family, '', 9)
+            with pdf.table(text_align="LEFT", line_height=5) as table:
+                for row in payload:
+                    table_row = table.row()
+                    for cell in row:
+                        table_row.cell(txt(cell))
+            pdf.ln(2)
+        elif kind == "note":
+            pdf.set_font(family, '', 9)
+            pdf.multi_cell(0, 6, txt(f"[{payload}]"), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        else:
+            pdf.set_font(family, '', 10)
+            pdf.multi_cell(0, 6, txt(payload), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    return pdf
+
+def _report_cache_key(role, literacy_level, quiz_score, roadmap_text, competencies=None):
+    payload = json.dumps([role, literacy_level, quiz_score, roadmap_text or "", competencies or {}], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def generate_pdf_report(role, literacy_level, quiz_score, roadmap_text=None, output=None, competencies=None):
+    """
+    Generates a PDF report for the user.
+    Without `output`, returns the PDF as bytes; results are cached on the report inputs.
+    With `output` (a file path or binary stream), the PDF is written there
+    directly without touching the cache, and `output` is returned.
+    `competencies` ({competency: level}, e.g. from analytics.py) fills the gap analysis;
+    without it every competency is shown at the self-assessed literacy level.
+    Returns None if fpdf2 is not installed; raises RuntimeError for the legacy PyFPDF.
+    """
+    key = _report_cache_key(role, literacy_level, quiz_score, roadmap_text, competencies)
+    with _report_cache_lock:
+        cached = _report_cache.get(key)
+        if cached is not None:
+            _report_cache.move_to_end(key)
+
+    if cached is None:
+        try:
+            pdf = _build_report_pdf(role, literacy_level, quiz_score, roadmap_text, competencies)
+        except ImportError:
+            return None
+
+        if output is not None:
+            if isinstance(output, (str, os.PathLike)):
+                pdf.output(output)
+            else:
+                output.write(pdf.output())
+            return output
+
+        cached = bytes(pdf.output())
+        with _report_cache_lock:
+            _report_cache[key] = cached
+            while len(_report_cache) > REPORT_CACHE_SIZE:
+                _report_cache.popitem(last=False)
+
+    if output is None:
+        return cached
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, "wb") as f:
+            f.write(cached)
     else:
-        pdf.cell(0, 10, "Please generate a roadmap in the 'Learning Path' tab to see it here.", 0, 1)
+        output.write(cached)
+    return output
+
+# NEW: Mermaid validation and repair
+MERMAID_DIRECTIONS = ("TD", "TB", "BT", "LR", "RL")
+
+_MERMAID_FENCE_RE = re.compile(r"```[ \t]*mermaid[ \t]*\r?\n(.*?)(?:\r?\n)?```", re.DOTALL | re.IGNORECASE)
+_MERMAID_OPEN_FENCE_RE = re.compile(r"```[ \t]*mermaid[ \t]*\r?\n(.*)$", re.DOTALL | re.IGNORECASE)
+_ANY_FENCE_RE = re.compile(r"```[ \t]*\w*")
+_MERMAID_HEADER_RE = re.compile(r"^(graph|flowchart)(?:\s+(\w+))?\s*;?$", re.IGNORECASE)
+_MERMAID_PASSTHROUGH_RE = re.compile(r"^(style|classDef|class|linkStyle|click|direction)\b")
+_MERMAID_SUBGRAPH_RE = re.compile(r"^subgraph\b")
+_MERMAID_EDGE_RE = re.compile(r"\s*(-->|---|-\.->|-\.-|==>|===)\s*(?:\|([^|]*)\|)?\s*")
+_MERMAID_TEXT_EDGE_RE = re.compile(r"\s--\s*([^->|][^-]*?)\s*-->\s*")
+_MERMAID_SHORT_ARROW_RE = re.compile(r"(?<![-=.])->")
+_MERMAID_ID_RE = re.compile(r"^[A-Za-z0-9_]+$")
+_MERMAID_NODE_RE = re.compile(
+    r"^([A-Za-z0-9_]+)\s*"
+    r"(\[\[|\[\(|\(\[|\(\(|\{\{|\[|\(|\{|>)"
+    r"(.*)"
+    r"(\]\]|\)\]|\]\)|\)\)|\}\}|\]|\)|\})$"
+)
+_MERMAID_SHAPES = {
+    "[": "]", "(": ")", "{": "}", ">": "]",
+    "[[": "]]", "[(": ")]", "([": "])", "((": "))", "{{": "}}",
+}
+_MERMAID_LIST_MARKER_RE = re.compile(r"^(?:[-*+]|\d+\.)\s+")
+_MERMAID_UNSAFE_LABEL_RE = re.compile(r'["\[\](){}|<>]')
+# Parentheses and colons break older Mermaid renderers even inside quotes (see _clean_label)
+_MERMAID_FRAGILE_LABEL_RE = re.compile(r"[():]")
+
+def strip_code_fences(text):
+    """
+    Remove Markdown code fences (```mermaid, ```json, ```) from LLM output.
+    """
+    return _ANY_FENCE_RE.sub("", text).strip()
+
+def extract_mermaid(text):
+    """
+    Find the first Mermaid block in a Markdown response.
+    Returns (mermaid_code, text_without_block); mermaid_code is None when absent.
+    An unterminated trailing block (e.g. a truncated stream) is also extracted.
+    """
+    match = _MERMAID_FENCE_RE.search(text)
+    if not match:
+        match = _MERMAID_OPEN_FENCE_RE.search(text)
+    if not match:
+        return None, text
+    return match.group(1).strip(), (text[:match.start()] + text[match.end():]).strip()
+
+def _split_node_group(expr):
+    # "A & B" declares several nodes on one side of an edge
+    return [part.strip() for part in expr.split("&")]
+
+def _parse_node(expr):
+    """
+    Parse `id`, `id["label"]`, `id(label)` etc.
+    Returns (node_id, label, shape_open) or raises ValueError.
+    """
+    if _MERMAID_ID_RE.match(expr):
+        return expr, None, None
+    match = _MERMAID_NODE_RE.match(expr)
+    if not match:
+        raise ValueError(f"invalid node '{expr}'")
+    node_id, opener, label, closer = match.groups()
+    if _MERMAID_SHAPES.get(opener) != closer:
+        raise ValueError(f"mismatched brackets in node '{expr}'")
+    label = label.strip()
+    if len(label) >= 2 and label[0] == label[-1] == '"':
+        if '"' in label[1:-1]:
+            raise ValueError(f"nested quotes in label of '{node_id}'")
+    elif _MERMAID_UNSAFE_LABEL_RE.search(label):
+        raise ValueError(f"unquoted special characters in label of '{node_id}'")
+    if _MERMAID_FRAGILE_LABEL_RE.search(label):
+        raise ValueError(f"parentheses or colon in label of '{node_id}'")
+    return node_id, label, opener
+
+def _split_statements(code):
+    for line_no, raw in enumerate(code.splitlines(), start=1):
+        for statement in raw.split(";"):
+            statement = statement.strip()
+            if statement and not statement.startswith("%%"):
+                yield line_no, statement
+
+def parse_mermaid(code):
+    """
+    Lightweight parser for flowchart (`graph TD`) syntax.
+    Returns a dict with "direction", "nodes" (id -> label), "edges"
+    ([(src, dst, label)]) and "errors" ([(line_no, message)]).
+    """
+    result = {"direction": None, "nodes": {}, "edges": [], "errors": []}
+    depth = 0
+    header_seen = False
+
+    for line_no, statement in _split_statements(code):
+        if not header_seen:
+            header = _MERMAID_HEADER_RE.match(statement)
+            if not header:
+                result["errors"].append((line_no, "missing 'graph TD' header"))
+            else:
+                # A bare `graph` defaults to top-down
+                direction = (header.group(2) or "TD").upper()
+                if direction not in MERMAID_DIRECTIONS:
+                    result["errors"].append((line_no, f"invalid direction '{header.group(2)}'"))
+                result["direction"] = direction
+                header_seen = True
+                continue
+            header_seen = True
+
+        if _MERMAID_SUBGRAPH_RE.match(statement):
+            depth += 1
+            continue
+        if statement == "end":
+            depth -= 1
+            if depth < 0:
+                result["errors"].append((line_no, "'end' without 'subgraph'"))
+                depth = 0
+            continue
+        if _MERMAID_PASSTHROUGH_RE.match(statement):
+            continue
+
+        parts = _MERMAID_EDGE_RE.split(statement)
+        # parts = [nodes, op, label, nodes, op, label, nodes, ...]
+        try:
+            groups = [[_parse_node(n) for n in _split_node_group(expr)] for expr in parts[0::3]]
+        except ValueError as e:
+            result["errors"].append((line_no, str(e)))
+            continue
 
-    return pdf.output(dest='S').encode('latin-1', 'replace')
+        for group in groups:
+            for node_id, label, _ in group:
+                if label is not None or node_id not in result["nodes"]:
+                    result["nodes"][node_id] = label.strip('"') if label else result["nodes"].get(node_id)
+        for i in range(len(groups) - 1):
+            edge_label = parts[3 * i + 2]
+            if edge_label and _MERMAID_FRAGILE_LABEL_RE.search(edge_label):
+                result["errors"].append((line_no, f"parentheses or colon in edge label '{edge_label}'"))
+            for src, _, _ in groups[i]:
+                for dst, _, _ in groups[i + 1]:
+                    result["edges"].append((src, dst, edge_label))
+
+    if not header_seen:
+        result["errors"].append((0, "empty diagram"))
+    elif not result["nodes"]:
+        result["errors"].append((0, "diagram has no nodes"))
+    if depth > 0:
+        result["errors"].append((0, "unclosed 'subgraph'"))
+    return result
+
+def validate_mermaid(code):
+    """
+    Return a list of human-readable syntax errors; empty means valid.
+    """
+    return [f"line {n}: {msg}" if n else msg for n, msg in parse_mermaid(code)["errors"]]
+
+def _clean_label(label):
+    label = label.strip().strip('"').strip()
+    # Parentheses and colons break older Mermaid renderers even inside quotes
+    label = label.replace('(', ' - ').replace(')', '').replace(":", " -")
+    label = label.replace('"', "'").replace("[", "").replace("]", "")
+    label = label.replace("{", "").replace("}", "").replace("|", "/")
+    return re.sub(r"\s+", " ", label).strip()
+
+def _repair_node(expr):
+    """
+    Rewrite one node expression into `id["label"]` form.
+    Free text such as `Data Analysis` becomes `Data_Analysis["Data Analysis"]`.
+    """
+    expr = expr.strip()
+    if _MERMAID_ID_RE.match(expr):
+        return expr
+    match = re.match(r"^([A-Za-z0-9_]+)\s*(\[\[|\[\(|\(\[|\(\(|\{\{|\[|\(|\{|>)(.*)$", expr)
+    if match:
+        node_id, opener, rest = match.groups()
+        closer = _MERMAID_SHAPES[opener]
+        label = rest[:-len(closer)] if rest.endswith(closer) else rest.rstrip(")]}")
+        return f'{node_id}{opener}"{_clean_label(label)}"{closer}'
+    label = _clean_label(expr)
+    node_id = re.sub(r"\W+", "_", label).strip("_") or "Node"
+    if node_id[0].isdigit():
+        node_id = f"N{node_id}"
+    return f'{node_id}["{label}"]'
+
+def repair_mermaid(code):
+    """
+    Fix common LLM mistakes in flowchart code:
+    stray fences, list markers, missing/invalid header, `->` arrows,
+    `A -- text --> B` edges, unquoted labels with special characters
+    and free-text node names. Statements that still fail to parse are dropped.
+    """
+    code = strip_code_fences(code)
+    lines = []
+    header = None
+
+    for raw in code.splitlines():
+        line = _MERMAID_LIST_MARKER_RE.sub("", raw.strip())
+        if not line or line.lower() == "mermaid":
+            continue
+        if line.startswith("%%"):
+            lines.append(line)
+            continue
+
+        if header is None:
+            match = _MERMAID_HEADER_RE.match(line)
+            if match:
+                direction = (match.group(2) or "TD").upper()
+                header = f"graph {direction if direction in MERMAID_DIRECTIONS else 'TD'}"
+                continue
+            header = "graph TD"
+
+        if (_MERMAID_SUBGRAPH_RE.match(line) or line == "end"
+                or _MERMAID_PASSTHROUGH_RE.match(line)):
+            lines.append(line)
+            continue
+
+        line = line.rstrip(";")
+        line = _MERMAID_TEXT_EDGE_RE.sub(lambda m: f" -->|{_clean_label(m.group(1))}| ", line)
+        line = _MERMAID_SHORT_ARROW_RE.sub("-->", line)
+
+        parts = _MERMAID_EDGE_RE.split(line)
+        rebuilt = []
+        for i in range(0, len(parts), 3):
+            rebuilt.append(" & ".join(_repair_node(n) for n in _split_node_group(parts[i]) if n))
+            if i + 1 < len(parts):
+                op, edge_label = parts[i + 1], parts[i + 2]
+                rebuilt.append(f" {op}|{_clean_label(edge_label)}| " if edge_label else f" {op} ")
+        candidate = "".join(rebuilt).strip()
+        if candidate and not parse_mermaid(f"graph TD\n{candidate}")["errors"]:
+            lines.append(candidate)
+
+    # Balance subgraph/end pairs
+    depth = 0
+    balanced = []
+    for line in lines:
+        if _MERMAID_SUBGRAPH_RE.match(line):
+            depth += 1
+        elif line == "end":
+            if depth == 0:
+                continue
+            depth -= 1
+        balanced.append(line)
+    balanced.extend(["end"] * depth)
+
+    return "\n".join([header or "graph TD"] + ["    " + l for l in balanced])
+
+def prepare_mermaid(code):
+    """
+    Validate Mermaid code, repairing it if needed.
+    Returns renderable code, or None if the diagram cannot be salvaged.
+    """
+    if not code:
+        return None
+    if not validate_mermaid(code):
+        return code
+    repaired = repair_mermaid(code)
+    return None if validate_mermaid(repaired) else repaired
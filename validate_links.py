@@ -1,50 +1,182 @@
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from resources import (
+    LEARNING_RESOURCES,
+    LINK_STATUS_PATH,
+    all_resource_urls,
+    load_link_status,
+    save_link_status,
+)
+
+# Configuration
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+TIMEOUT = 5
+MAX_CONCURRENCY = 16
+MAX_PER_HOST = 2
+
+# Only these mean the resource is gone; 403/429/999 usually mean bot blocking
+DEAD_STATUS_CODES = {404, 410}
+# A refused connection marks a link dead only once it repeats on this many consecutive checks
+DEAD_AFTER_REFUSALS = 2
+
+def make_session(pool_size=MAX_CONCURRENCY):
+    """
+    Create a requests session with a shared, pooled connection adapter.
+    """
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def classify(status_code):
+    """
+    Map an HTTP status code to "ok", "dead" or "unknown".
+    """
+    if status_code < 400:
+        return "ok"
+    if status_code in DEAD_STATUS_CODES:
+        return "dead"
+    return "unknown"
+
+def connection_refused(error):
+    """
+    True if the server actively refused the connection (as opposed to DNS
+    failures, unreachable networks or timeouts on the checker's side).
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, ConnectionRefusedError):
+            return True
+        nested = [a for a in getattr(error, "args", ()) if isinstance(a, BaseException)]
+        error = error.__cause__ or error.__context__ or getattr(error, "reason", None) or (nested[0] if nested else None)
+    return False
+
+def check_url(session, url, previous=None, timeout=TIMEOUT):
+    """
+    Check a single URL (blocking). Sends ETag/Last-Modified validators
+    from the previous result so unchanged pages answer 304.
+    Returns a status record.
+    """
+    previous = previous or {}
+    headers = {}
+    if previous.get("etag"):
+        headers["If-None-Match"] = previous["etag"]
+    if previous.get("last_modified"):
+        headers["If-Modified-Since"] = previous["last_modified"]
+
+    record = {"checked_at": time.time()}
+    start = time.perf_counter()
+    try:
+        r = session.head(url, headers=headers, timeout=timeout, allow_redirects=True)
+        if r.status_code == 405: # Some sites block HEAD
+            r.close()
+            r = session.get(url, headers=headers, timeout=timeout, stream=True)
+        r.close()
+
+        if r.status_code == 304 and previous.get("state"):
+            record.update(state=previous["state"], status_code=previous.get("status_code"), not_modified=True)
+        else:
+            record.update(state=classify(r.status_code), status_code=r.status_code)
+        record["etag"] = r.headers.get("ETag") or previous.get("etag")
+        record["last_modified"] = r.headers.get("Last-Modified") or previous.get("last_modified")
+    except requests.exceptions.Timeout as e:
+        # Includes ConnectTimeout (a ConnectionError subclass): not proof that the link is dead
+        record.update(state="unknown", error=str(e))
+    except requests.exceptions.ConnectionError as e:
+        if connection_refused(e):
+            refusals = previous.get("refusals", 0) + 1
+            record.update(state="dead" if refusals >= DEAD_AFTER_REFUSALS else "unknown",
+                          refusals=refusals, error=str(e))
+        else:
+            # DNS failures and outages on the checker's side look like this too
+            record.update(state="unknown", error=str(e))
+    except requests.exceptions.RequestException as e:
+        record.update(state="unknown", error=str(e))
+
+    record["elapsed"] = round(time.perf_counter() - start, 3)
+    return record
+
+async def check_links(urls, previous=None, session=None,
+                      max_concurrency=MAX_CONCURRENCY, max_per_host=MAX_PER_HOST, timeout=TIMEOUT):
+    """
+    Check many URLs concurrently over one pooled session.
+    At most `max_concurrency` requests run at once and at most
+    `max_per_host` against any single host.
+    Returns {url: status record}.
+    """
+    previous = previous or {}
+    own_session = session is None
+    session = session or make_session(max_concurrency)
+
+    global_limit = asyncio.Semaphore(max_concurrency)
+    host_limits = defaultdict(lambda: asyncio.Semaphore(max_per_host))
+
+    async def check(url):
+        async with host_limits[urlsplit(url).netloc], global_limit:
+            return url, await asyncio.to_thread(check_url, session, url, previous.get(url), timeout)
+
+    try:
+        results = await asyncio.gather(*(check(url) for url in urls))
+    finally:
+        if own_session:
+            session.close()
+    return dict(results)
+
+def refresh_link_status(urls=None, path=LINK_STATUS_PATH, **kwargs):
+    """
+    Check the registry's URLs (or `urls`) and persist the merged results.
+    """
+    urls = urls or all_resource_urls()
+    statuses = dict(load_link_status(path))
+    statuses.update(asyncio.run(check_links(urls, previous=statuses, **kwargs)))
+    save_link_status(statuses, path)
+    return statuses
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate curated learning resource links.")
+    parser.add_argument("--status-file", default=LINK_STATUS_PATH, help="Where link status is persisted")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument("--per-host", type=int, default=MAX_PER_HOST)
+    parser.add_argument("--timeout", type=float, default=TIMEOUT)
+    args = parser.parse_args()
+
+    print("Validating Resource Links...")
+    print("-" * 60)
+
+    start = time.perf_counter()
+    statuses = refresh_link_status(
+        path=args.status_file,
+        max_concurrency=args.concurrency,
+        max_per_host=args.per_host,
+        timeout=args.timeout,
+    )
+    elapsed = time.perf_counter() - start
+
+    for role, links in LEARNING_RESOURCES.items():
+        print(f"\nChecking ROLE: {role}")
+        for title, url in links:
+            record = statuses[url]
+            label = record["state"].upper()
+            if record.get("status_code"):
+                label += f" ({record['status_code']})"
+            if record.get("not_modified"):
+                label += " [304]"
+            if record.get("error"):
+                label += f": {record['error'][:80]}"
+            print(f"[{label}] {title}\n      {url}")
+
+    print("-" * 60)
+    print(f"Checked {len(all_resource_urls())} URLs in {elapsed:.2f}s -> {args.status_file}")
 
-RESOURCES = {
-    "Logistics Manager": [
-        ("Coursera: Supply Chain Management (Rutgers/Google)", "https://www.coursera.org/search?query=supply%20chain%20management"),
-        ("edX: Supply Chain MicroMasters (MIT)", "https://www.edx.org/school/mitx"),
-        ("ASCM: CSCP Certification (Official)", "https://www.ascm.org/learning-development/certifications-credentials/cscp/"),
-        ("IEEE Xplore: Semiconductor Logistics", "https://ieeexplore.ieee.org/Xplore/home.jsp"),
-        ("LinkedIn Learning: Logistics & Supply Chain", "https://www.linkedin.com/learning/topics/logistics-and-supply-chain-management"),
-    ],
-    "Supply Chain Analyst": [
-        ("Coursera: Supply Chain Analytics", "https://www.coursera.org/search?query=supply%20chain%20analytics"),
-        ("MIT OpenCourseWare: Supply Chain", "https://ocw.mit.edu/search/?q=supply+chain"),
-        ("Gartner: Supply Chain Insight", "https://www.gartner.com/en/supply-chain"),
-        ("Udemy: Supply Chain Data Science", "https://www.udemy.com/courses/business/Data-and-Analytics/"),
-        ("ASCM: CPIM Certification (Official)", "https://www.ascm.org/learning-development/certifications-credentials/cpim/"),
-    ],
-    "Warehouse Supervisor": [
-        ("LinkedIn Learning: Warehouse Management", "https://www.linkedin.com/learning/topics/warehouse-management"),
-        ("Coursera: Warehouse Operations", "https://www.coursera.org/search?query=warehouse%20management"),
-        ("OSHA: Warehousing Safety Standards", "https://www.osha.gov/warehousing"),
-        ("WERC: Warehousing Education & Research", "https://werc.org/"),
-        ("ASCM: Principles of Inventory Management", "https://www.ascm.org/learning-development/certificates/inventory-management/"),
-    ],
-    "Procurement Specialist": [
-        ("Coursera: Procurement & Sourcing", "https://www.coursera.org/search?query=procurement"),
-        ("CIPS: Global Standard for Procurement", "https://www.cips.org/"),
-        ("SIA: Semiconductor Industry Resources", "https://www.semiconductors.org/"),
-        ("LinkedIn Learning: Strategic Sourcing", "https://www.linkedin.com/learning/topics/procurement"),
-        ("Harvard Online: Negotiation", "https://online.hbs.edu/subjects/negotiation/"),
-    ]
-}
-
-print("Validating Resource Links...")
-print("-" * 60)
-
-headers = {'User-Agent': 'Mozilla/5.0'}
-
-for role, links in RESOURCES.items():
-    print(f"\nChecking ROLE: {role}")
-    for title, url in links:
-        try:
-            r = requests.head(url, headers=headers, timeout=5, allow_redirects=True)
-            if r.status_code == 405: # Some sites block HEAD
-                r = requests.get(url, headers=headers, timeout=5, stream=True)
-            
-            status = "OK" if r.status_code < 400 else f"FAIL ({r.status_code})"
-            print(f"[{status}] {title}\n      {url}")
-        except Exception as e:
-            print(f"[ERROR] {title}: {str(e)}")
+if __name__ == "__main__":
+    main()